@@ -1,8 +1,8 @@
 import os
 
-import pandas as pd
 import streamlit as st
-from streamlit import session_state as ss
+
+from input_store import ensure_store
 
 st.set_page_config(
     layout='wide',
@@ -10,31 +10,8 @@ st.set_page_config(
     page_icon=os.path.join(os.path.dirname(__file__), 'img',  'page_icon_ZNES.png')
     )
 
-@st.cache_data
-def read_input_data():
-    '''Read in input data all at once.'''
-    inputpath = os.path.abspath(os.path.join(
-        os.path.dirname(__file__), 'input'
-        ))
-    all_heat_load = pd.read_csv(
-        os.path.join(inputpath, 'heat_load.csv'),
-        sep=';', index_col=0, parse_dates=True
-        )
-    eco_data = pd.read_csv(
-        os.path.join(inputpath, 'eco_data.csv'),
-        sep=';', index_col=0, parse_dates=True
-        )
-
-    return all_heat_load, eco_data
-
-if 'eco_data' not in ss:
-    ss.all_heat_load, ss.eco_data = read_input_data()
-
-    ss.all_el_prices = ss.eco_data['el_spot_price'].to_frame()
-    ss.all_el_emissions = ss.eco_data['ef_om'].to_frame()
-    ss.all_gas_prices = ss.eco_data['gas_price'].to_frame()
-    ss.all_co2_prices = ss.eco_data['co2_price'].to_frame()
-    ss.all_solar_heat_flow = ss.eco_data['solar_heat_flow'].to_frame()
+# Split the bundled input data into year partitions on the first start
+ensure_store()
 
 # %% Sidebar
 with st.sidebar:
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+PERIOD_LENGTHS = {'day': 24, 'week': 168}
+
+
+class TimeSeriesAggregation():
+    """Cluster the input time series into typical periods.
+
+    The hourly input data is cut into periods of equal length (days or
+    weeks), which are grouped with a k-means clustering. Each cluster is
+    represented by its medoid, i.e. the original period closest to the
+    cluster center. The periods holding the maximum of the peak columns are
+    kept as additional typical periods of their own.
+
+    Parameters
+    ----------
+
+    data : pandas.DataFrame
+        Hourly input data of the energy system.
+
+    n_typical : int
+        Number of clustered typical periods (without peak periods).
+
+    period : str
+        Length of the typical periods. Either 'day' or 'week'.
+
+    peak_columns : list
+        Columns whose peak period is kept unclustered.
+
+    seed : int
+        Seed of the random number generator used for the initialization.
+    """
+
+    def __init__(self, data, n_typical, period='day',
+                 peak_columns=('heat_demand',), seed=42):
+        self.data = data
+        self.period_length = PERIOD_LENGTHS[period]
+        self.n_steps = len(data.index)
+
+        L = self.period_length
+        self.n_periods = int(np.ceil(self.n_steps / L))
+        if n_typical < 1 or n_typical >= self.n_periods:
+            raise ValueError(
+                f'Number of typical periods ({n_typical}) has to be between '
+                + '1 and the number of periods in the data '
+                + f'({self.n_periods - 1}).'
+                )
+
+        values = data.to_numpy(dtype=float)
+        padding = self.n_periods * L - self.n_steps
+        self._periods = np.pad(
+            values, ((0, padding), (0, 0)), mode='edge'
+            ).reshape(self.n_periods, L, -1)
+
+        vmin = values.min(axis=0)
+        span = values.max(axis=0) - vmin
+        span[span == 0] = 1
+        features = ((self._periods - vmin) / span).reshape(self.n_periods, -1)
+
+        peak_periods = []
+        for col in peak_columns:
+            if col in data.columns:
+                peak = int(np.argmax(data[col].to_numpy()) // L)
+                if peak not in peak_periods:
+                    peak_periods.append(peak)
+        peak_periods = peak_periods[:self.n_periods - n_typical]
+        other_periods = [
+            p for p in range(self.n_periods) if p not in peak_periods
+            ]
+
+        labels, medoids = kmedoids(
+            features[other_periods], n_typical, seed=seed
+            )
+
+        self.order = np.empty(self.n_periods, dtype=int)
+        self.order[other_periods] = labels
+        self.representatives = [other_periods[m] for m in medoids]
+        for p in peak_periods:
+            self.order[p] = len(self.representatives)
+            self.representatives.append(p)
+        self.n_typical = len(self.representatives)
+
+        # Count the original time steps each typical time step stands for
+        valid = (
+            np.arange(self.n_periods * L) < self.n_steps
+            ).reshape(self.n_periods, L)
+        weights = np.zeros((self.n_typical, L))
+        np.add.at(weights, self.order, valid)
+
+        index = pd.date_range(
+            data.index[0], periods=self.n_typical * L, freq='h'
+            )
+        self.typical_data = pd.DataFrame(
+            self._periods[self.representatives].reshape(-1, values.shape[1]),
+            index=index, columns=data.columns
+            )
+        self.weights = pd.Series(weights.reshape(-1), index=index)
+
+    def expand(self, df):
+        """Map results of the typical periods back onto the original index.
+
+        Parameters
+        ----------
+
+        df : pandas.DataFrame
+            Data with one row per typical time step. Additional rows (e.g.
+            the final storage time point) are ignored.
+        """
+        L = self.period_length
+        values = df.iloc[:self.n_typical * L].to_numpy(dtype=float)
+        values = values.reshape(self.n_typical, L, -1)[self.order]
+        return pd.DataFrame(
+            values.reshape(-1, values.shape[-1])[:self.n_steps],
+            index=self.data.index, columns=df.columns
+            )
+
+    def error_report(self):
+        """Compare the expanded typical periods with the original data.
+
+        Returns a DataFrame with the root mean square error normalized to the
+        value range and the ratio of the preserved maximum for each column.
+        """
+        expanded = self.expand(self.typical_data)
+        report = pd.DataFrame(index=self.data.columns)
+        span = (self.data.max() - self.data.min()).replace(0, 1)
+        report['nrmse'] = (
+            ((expanded - self.data)**2).mean()**0.5 / span
+            )
+        report['peak_ratio'] = (
+            expanded.max() / self.data.max().replace(0, np.nan)
+            )
+        return report
+
+
+def kmedoids(features, k, seed=42, max_iter=100):
+    """Cluster feature vectors with k-means and return cluster medoids.
+
+    Parameters
+    ----------
+
+    features : numpy.ndarray
+        Two dimensional array with one feature vector per row.
+
+    k : int
+        Number of clusters.
+
+    Returns
+    -------
+
+    labels : numpy.ndarray
+        Cluster number of each feature vector.
+
+    medoids : list
+        Row index of the medoid of each cluster.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(features)
+
+    # k-means++ initialization
+    centers = [features[rng.integers(n)]]
+    for _ in range(1, k):
+        dist = np.min(
+            ((features[:, None, :] - np.array(centers)[None])**2).sum(axis=2),
+            axis=1
+            )
+        if dist.sum() > 0:
+            centers.append(features[rng.choice(n, p=dist/dist.sum())])
+        else:
+            centers.append(features[rng.integers(n)])
+    centers = np.array(centers)
+
+    for _ in range(max_iter):
+        dist = ((features[:, None, :] - centers[None])**2).sum(axis=2)
+        labels = dist.argmin(axis=1)
+        new_centers = np.array([
+            features[labels == j].mean(axis=0) if (labels == j).any()
+            else centers[j]
+            for j in range(k)
+            ])
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+
+    dist = ((features[:, None, :] - centers[None])**2).sum(axis=2)
+    labels = dist.argmin(axis=1)
+
+    # Drop empty clusters and renumber the remaining ones
+    medoids = []
+    relabel = np.full(k, -1)
+    for j in range(k):
+        members = np.flatnonzero(labels == j)
+        if len(members) == 0:
+            continue
+        relabel[j] = len(medoids)
+        medoids.append(int(members[np.argmin(dist[members, j])]))
+
+    return relabel[labels], medoids
@@ -0,0 +1,373 @@
+"""Benchmark suite of model build, solve and postprocessing.
+
+Runs reference energy systems built from the unit types of
+'input/param_units.json' over several time horizons and solvers, records
+build, solve and postprocessing times, peak memory and model size and
+compares them with a stored baseline.
+
+Examples
+--------
+
+Run the default suite with HiGHS and compare with the stored baseline::
+
+    python benchmark.py --solvers HiGHS
+
+Store the results as new baseline::
+
+    python benchmark.py --solvers HiGHS --save-baseline
+
+Scaling curve of 2 to 16 units over one month::
+
+    python benchmark.py --scaling 2 4 8 16 --scaling-hours 720
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+INPUT_PATH = os.path.join(os.path.dirname(__file__), 'input')
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), 'benchmarks', 'baseline.json'
+    )
+
+REFERENCE_SYSTEMS = {
+    'hp': ['hp'],
+    'chp_tes': ['ccet', 'plb', 'tes'],
+    'full_mix': ['hp', 'ccet', 'ice', 'plb', 'eb', 'sol', 'exhs', 'tes']
+    }
+MODES = ['dispatch', 'invest']
+HORIZONS = {'week': 168, 'month': 720, 'year': 8760}
+
+# Unit types distributed over the units of synthetic scaling systems
+SCALING_UNITS = ['hp', 'plb', 'ccet', 'eb', 'tes']
+
+BUILD_STAGES = ['generate_buses', 'generate_sources', 'generate_sinks',
+                'generate_components', 'build_model']
+SOLVE_STAGES = ['run_solver']
+POSTPROCESSING_STAGES = ['get_results', 'calc_econ_params',
+                         'calc_ecol_params']
+COMPARED_METRICS = ['build_time', 'solve_time', 'postprocessing_time',
+                    'peak_rss_mb', 'variables', 'constraints', 'nonzeros']
+
+
+def synthetic_data(hours, seed=42, start='2023-01-01'):
+    """Generate hourly input data with seasonal and daily patterns.
+
+    Parameters
+    ----------
+
+    hours : int
+        Number of time steps.
+
+    seed : int
+        Seed of the random noise, so that the data is reproducible.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(hours)
+    day = 2 * np.pi * (t % 24) / 24
+    year = 2 * np.pi * t / 8760
+
+    heat_demand = (
+        150 + 90 * np.cos(year) + 20 * np.sin(day - np.pi / 2)
+        + rng.normal(0, 5, hours)
+        ).clip(min=20)
+    el_spot_price = (
+        80 + 30 * np.sin(day - np.pi / 2) + rng.normal(0, 15, hours)
+        )
+    solar_heat_flow = (
+        np.sin(day - np.pi / 2).clip(min=0) * (0.6 - 0.4 * np.cos(year))
+        * 5e-4
+        )
+
+    return pd.DataFrame(
+        {
+            'heat_demand': heat_demand,
+            'el_spot_price': el_spot_price,
+            'ef_om': 0.4 + 0.1 * np.sin(day) + rng.normal(0, 0.02, hours),
+            'gas_price': 40 + rng.normal(0, 2, hours),
+            'co2_price': np.full(hours, 80.0),
+            'solar_heat_flow': solar_heat_flow
+            },
+        index=pd.date_range(start, periods=hours, freq='h')
+        )
+
+
+def reference_units(unit_cats, invest=False):
+    """Build unit parameters from the shipped unit type templates.
+
+    Parameters
+    ----------
+
+    unit_cats : list
+        Unit type of each unit, e.g. ['hp', 'hp', 'tes']. Units of the same
+        type are numbered consecutively.
+
+    invest : bool
+        Optimize the capacities of all units instead of only their dispatch.
+    """
+    with open(os.path.join(INPUT_PATH, 'param_units.json'), 'r',
+              encoding='utf-8') as file:
+        templates = json.load(file)
+
+    param_units = {}
+    counts = {}
+    for unit_cat in unit_cats:
+        counts[unit_cat] = counts.get(unit_cat, 0) + 1
+        unit_params = deepcopy(templates[unit_cat])
+        unit_params['invest_mode'] = invest
+        param_units[f'{unit_cat}{counts[unit_cat]}'] = unit_params
+    return param_units
+
+
+def scaling_units(n_units, invest=False):
+    """Unit parameters of a synthetic system with n units."""
+    return reference_units(
+        [SCALING_UNITS[i % len(SCALING_UNITS)] for i in range(n_units)],
+        invest=invest
+        )
+
+
+def benchmark_param_opt(solver, time_limit=None):
+    """Optimization parameters of benchmark runs.
+
+    Warm starts are disabled, so that every run starts from scratch.
+    """
+    with open(os.path.join(INPUT_PATH, 'param_opt.json'), 'r',
+              encoding='utf-8') as file:
+        param_opt = json.load(file)
+    param_opt['Solver'] = solver
+    param_opt['warm_start'] = False
+    if time_limit is not None:
+        param_opt['TimeLimit'] = time_limit
+    return param_opt
+
+
+def run_case(case):
+    """Run a single benchmark case and return its measurements."""
+    # Imported here, so that the model is only loaded in the workers
+    from model import EnergySystem
+    from workspace import Workspace
+
+    record = {
+        key: value for key, value in case.items()
+        if key not in ['param_units', 'param_opt']
+        }
+    record['units'] = len(case['param_units'])
+
+    data = synthetic_data(case['hours'])
+    try:
+        with Workspace(prefix='benchmark') as workspace:
+            energy_system = EnergySystem(
+                data, case['param_units'], case['param_opt'],
+                workspace=workspace
+                )
+            energy_system.run_model()
+            energy_system.run_postprocessing()
+            size = energy_system.calc_model_size()
+    except Exception as e:
+        record['error'] = repr(e)
+        return record
+
+    stages = energy_system.profile.stages
+
+    def stage_time(names):
+        return sum(
+            stages[name]['wall_time'] for name in names if name in stages
+            )
+
+    record['build_time'] = stage_time(BUILD_STAGES)
+    record['solve_time'] = stage_time(SOLVE_STAGES)
+    record['postprocessing_time'] = stage_time(POSTPROCESSING_STAGES)
+    record['total_time'] = (
+        record['build_time'] + record['solve_time']
+        + record['postprocessing_time']
+        )
+    record['peak_rss_mb'] = energy_system.profile.totals()['peak_rss_mb']
+    record.update(size)
+    record['LCOH'] = energy_system.key_params['LCOH']
+    return record
+
+
+def suite_cases(systems, modes, horizons, solvers, time_limit=None):
+    """Benchmark cases of the reference systems."""
+    cases = []
+    for solver in solvers:
+        param_opt = benchmark_param_opt(solver, time_limit)
+        for system in systems:
+            for mode in modes:
+                for horizon in horizons:
+                    cases.append({
+                        'case': f'{system}-{mode}-{horizon}-{solver}',
+                        'system': system,
+                        'mode': mode,
+                        'horizon': horizon,
+                        'hours': HORIZONS[horizon],
+                        'solver': solver,
+                        'param_units': reference_units(
+                            REFERENCE_SYSTEMS[system],
+                            invest=(mode == 'invest')
+                            ),
+                        'param_opt': param_opt
+                        })
+    return cases
+
+
+def scaling_cases(n_units, hours, modes, solvers, time_limit=None):
+    """Benchmark cases of synthetic systems with n units x T hours."""
+    cases = []
+    for solver in solvers:
+        param_opt = benchmark_param_opt(solver, time_limit)
+        for n in n_units:
+            for mode in modes:
+                for T in hours:
+                    cases.append({
+                        'case': f'scaling{n}-{mode}-{T}h-{solver}',
+                        'system': f'scaling{n}',
+                        'mode': mode,
+                        'horizon': f'{T}h',
+                        'hours': T,
+                        'solver': solver,
+                        'param_units': scaling_units(
+                            n, invest=(mode == 'invest')
+                            ),
+                        'param_opt': param_opt
+                        })
+    return cases
+
+
+def run_benchmark(cases):
+    """Run the cases one after another in fresh worker processes.
+
+    Each case runs in a new process, so that the peak memory of a case is
+    not hidden by the ones of earlier cases.
+    """
+    records = []
+    context = multiprocessing.get_context('spawn')
+    for case in cases:
+        print(f'Running {case["case"]}...')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            records.append(pool.submit(run_case, case).result())
+    return pd.DataFrame(records).set_index('case')
+
+
+def compare(results, baseline, tolerance=0.1):
+    """Compare benchmark results with a baseline.
+
+    Returns the ratio of result to baseline for the compared metrics of all
+    cases in both and a column 'regression' listing the metrics that grew
+    by more than `tolerance`.
+    """
+    cases = results.index.intersection(baseline.index)
+    metrics = [
+        m for m in COMPARED_METRICS
+        if m in results.columns and m in baseline.columns
+        ]
+    ratios = (
+        results.loc[cases, metrics].astype(float)
+        / baseline.loc[cases, metrics].astype(float).replace(0, np.nan)
+        )
+    ratios['regression'] = ratios.apply(
+        lambda row: ', '.join(m for m in metrics if row[m] > 1 + tolerance),
+        axis=1
+        )
+    return ratios
+
+
+def write_results(results, path):
+    """Write benchmark results including the environment to a JSON file."""
+    import oemof.solph
+    import pyomo
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'oemof.solph': oemof.solph.__version__,
+            'pyomo': pyomo.__version__,
+            'cpu_count': os.cpu_count()
+            },
+        'results': json.loads(results.reset_index().to_json(orient='records'))
+        }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(payload, file, indent=4)
+
+
+def read_results(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        payload = json.load(file)
+    return pd.DataFrame(payload['results']).set_index('case')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--systems', nargs='+', default=list(REFERENCE_SYSTEMS),
+        choices=list(REFERENCE_SYSTEMS)
+        )
+    parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    parser.add_argument(
+        '--horizons', nargs='+', default=['week', 'month'],
+        choices=list(HORIZONS)
+        )
+    parser.add_argument(
+        '--solvers', nargs='+', default=['HiGHS'],
+        choices=['HiGHS', 'Gurobi']
+        )
+    parser.add_argument(
+        '--scaling', nargs='+', type=int, default=None,
+        help='Run synthetic systems with these numbers of units instead.'
+        )
+    parser.add_argument(
+        '--scaling-hours', nargs='+', type=int, default=[168],
+        help='Time steps of the synthetic systems.'
+        )
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument(
+        '--save-baseline', action='store_true',
+        help='Store the results as new baseline.'
+        )
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        cases = scaling_cases(
+            args.scaling, args.scaling_hours, args.modes, args.solvers,
+            args.time_limit
+            )
+    else:
+        cases = suite_cases(
+            args.systems, args.modes, args.horizons, args.solvers,
+            args.time_limit
+            )
+
+    results = run_benchmark(cases)
+    write_results(results, args.output)
+    print(results.to_string())
+
+    if args.save_baseline:
+        write_results(results, args.baseline)
+        print(f'Baseline written to {args.baseline}.')
+    elif os.path.exists(args.baseline):
+        comparison = compare(
+            results, read_results(args.baseline), args.tolerance
+            )
+        print('\nRatio to baseline:')
+        print(comparison.round(2).to_string())
+        if comparison['regression'].astype(bool).any():
+            return 1
+    else:
+        print(f'No baseline found at {args.baseline}.')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
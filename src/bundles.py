@@ -0,0 +1,133 @@
+import io
+import json
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+
+RESULT_FILES = {
+    'data_all': 'Ergebnisse_Zeitreihen',
+    'caps': 'Ergebnisse_Kapazitäten',
+    'key_params': 'Ergebnisse_Allgemein'
+    }
+
+
+def frame_to_arrow(df, compression='zstd'):
+    """Serialize a DataFrame including its index to Arrow IPC file bytes.
+
+    Parameters
+    ----------
+
+    df : pandas.DataFrame
+        Data to serialize. Column names are converted to strings.
+
+    compression : str
+        Buffer compression of the IPC file ('zstd', 'lz4' or None).
+    """
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def arrow_to_frame(source):
+    """Read a DataFrame from Arrow IPC file bytes, a buffer or a file path.
+
+    Uncompressed columns without missing values are converted without
+    copying the data.
+    """
+    if isinstance(source, str):
+        source = pa.memory_map(source, 'r')
+    elif not isinstance(source, pa.NativeFile):
+        source = pa.BufferReader(source)
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def write_bundle(frames, jsons=None, fmt='arrow'):
+    """Assemble DataFrames and JSON objects into an in-memory zip archive.
+
+    Parameters
+    ----------
+
+    frames : dict
+        DataFrames keyed by their file name without extension.
+
+    jsons : dict
+        JSON serializable objects keyed by their file name without extension.
+
+    fmt : str
+        Format of the DataFrames, either 'arrow' or 'csv'.
+
+    Returns
+    -------
+
+    bundle : bytes
+        Content of the zip archive.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, df in frames.items():
+            if fmt == 'arrow':
+                # Arrow buffers are compressed already
+                z.writestr(
+                    f'{name}.arrow', frame_to_arrow(df).to_pybytes(),
+                    compress_type=zipfile.ZIP_STORED
+                    )
+            else:
+                z.writestr(
+                    f'{name}.csv',
+                    df.to_csv(sep=';').encode('utf-8-sig')
+                    )
+        for name, obj in (jsons or {}).items():
+            z.writestr(
+                f'{name}.json', json.dumps(obj, indent=4, sort_keys=True)
+                )
+    return buffer.getvalue()
+
+
+def read_bundle_frame(z, name):
+    """Read a DataFrame stored as Arrow or semicolon CSV from a zip archive."""
+    files = z.namelist()
+    if f'{name}.arrow' in files:
+        return arrow_to_frame(z.read(f'{name}.arrow'))
+    if f'{name}.csv' in files:
+        with z.open(f'{name}.csv') as file:
+            return pd.read_csv(file, sep=';', index_col=0, parse_dates=True)
+    raise KeyError(f'"{name}" is not part of the archive.')
+
+
+def energy_system_bundle(data, param_opt, param_units, fmt='arrow'):
+    """Zip the input data and parameters of an energy system in memory."""
+    return write_bundle(
+        {'data_input': data},
+        {'param_opt': param_opt, 'param_units': param_units},
+        fmt=fmt
+        )
+
+
+def read_energy_system_bundle(file):
+    """Read input data and parameters from an energy system zip archive.
+
+    Archives with the input data as Arrow IPC file or as semicolon CSV are
+    accepted.
+    """
+    with zipfile.ZipFile(file, 'r') as z:
+        data = read_bundle_frame(z, 'data_input')
+        param_opt = json.loads(z.read('param_opt.json'))
+        param_units = json.loads(z.read('param_units.json'))
+    return data, param_opt, param_units
+
+
+def results_bundle(data_all, caps, key_params, fmt='arrow'):
+    """Zip time series, capacities and key parameters of a run in memory."""
+    return write_bundle(
+        {
+            RESULT_FILES['data_all']: data_all,
+            RESULT_FILES['caps']: caps,
+            RESULT_FILES['key_params']: key_params
+            },
+        fmt=fmt
+        )
@@ -0,0 +1,328 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+from matrix_backend import MatrixModel, build_matrix_model
+from presolve import capacity_bounds
+
+# Month numbers of the periods a year is decomposed into
+PERIODS = {
+    'month': {month: month for month in range(1, 13)},
+    'season': {month: (month - 1) // 3 + 1 for month in range(1, 13)}
+    }
+
+# Cost of heat demand that the capacities of a subproblem cannot cover
+SHORTFALL_COST = 1e4
+
+# Data and subproblems of a worker process, set up by `init_worker`
+_WORKER = {}
+
+
+def split_periods(data, period='month'):
+    """Split the input data into the months or seasons of its time index."""
+    keys = data.index.month.map(PERIODS[period])
+    return [data[keys == key] for key in pd.unique(keys)]
+
+
+def invest_units(param_units):
+    return [
+        unit for unit, unit_params in param_units.items()
+        if unit_params['invest_mode']
+        ]
+
+
+def build_subproblem(data, param_units, param_opt):
+    """Build the relaxed dispatch of a period with fixed capacities.
+
+    The investment variables of the units become columns whose bounds are
+    set to the capacities of the master problem and whose cost is part of
+    the master problem only. A penalized shortfall of the heat supply keeps
+    the subproblem feasible for too small capacities.
+    """
+    # Imported here to avoid a circular import with model
+    from model import EnergySystem
+
+    energy_system = EnergySystem(data, param_units, param_opt)
+    energy_system.generate_buses()
+    energy_system.generate_sources()
+    energy_system.generate_sinks()
+    energy_system.generate_components()
+    mm = build_matrix_model(energy_system.es, energy_system.periods)
+    mm.relax()
+
+    invest_cols = {}
+    for unit in invest_units(param_units):
+        if unit.rstrip('0123456789') == 'tes':
+            invest_cols[unit] = mm.storage_invest_cols[unit]
+        else:
+            invest_cols[unit] = mm.flow_invest_cols[(unit, 'heat network')]
+    mm.set_cost(list(invest_cols.values()), 0)
+
+    rows = mm.bus_rows['heat network']
+    shortfall = mm.add_variables(len(rows), cost=SHORTFALL_COST)
+    mm.add_coefficients(rows, shortfall, 1)
+
+    return mm, invest_cols, shortfall
+
+
+def init_worker(periods, param_units, param_opt):
+    """Pass the data of all periods to a worker process once."""
+    _WORKER.clear()
+    _WORKER.update({
+        'periods': periods,
+        'param_units': param_units,
+        'param_opt': param_opt,
+        'subproblems': {}
+        })
+
+
+def solve_subproblem(k, caps):
+    """Solve the subproblem of period k and return its cut at the capacities.
+
+    The subproblem is built from the data passed by `init_worker` on the
+    first call in a worker process and reused afterwards.
+
+    Returns the objective, its derivative with respect to each capacity
+    (the reduced cost of the fixed investment) and the heat shortfall.
+    """
+    param_opt = _WORKER['param_opt']
+    subproblems = _WORKER['subproblems']
+    if k not in subproblems:
+        subproblems[k] = build_subproblem(
+            _WORKER['periods'][k], _WORKER['param_units'], param_opt
+            )
+    mm, invest_cols, shortfall = subproblems[k]
+
+    for unit, col in invest_cols.items():
+        mm.fix(col, caps[unit])
+    options = {
+        'time_limit': param_opt['TimeLimit'],
+        'threads': 1,
+        'options': param_opt.get('solver_options')
+        }
+    if param_opt['Solver'] == 'Gurobi':
+        mm.solve_gurobi(**options)
+    else:
+        mm.solve_highs(**options)
+
+    return {
+        'objective': mm.objective_value,
+        'gradient': {
+            unit: float(mm.reduced_costs[col])
+            for unit, col in invest_cols.items()
+            },
+        'shortfall': float(mm.values(shortfall).sum())
+        }
+
+
+def solve_master(bounds, invest_costs, cuts, nr_periods):
+    """Solve the master problem over the capacities with all cuts so far.
+
+    Returns the capacities and the objective, the estimate of the master
+    problem for the relaxed subproblems.
+    """
+    units = list(bounds)
+    master = MatrixModel()
+    cap_cols = master.add_variables(
+        len(units),
+        lower=[bounds[unit][0] for unit in units],
+        upper=[bounds[unit][1] for unit in units],
+        cost=[invest_costs[unit] for unit in units]
+        )
+    theta = master.add_variables(nr_periods, lower=-np.inf, cost=1)
+
+    for k, caps, cut in cuts:
+        gradient = np.array([cut['gradient'][unit] for unit in units])
+        point = np.array([caps[unit] for unit in units])
+        master.add_constraints(
+            [(theta[k], 1)] + [
+                (col, -g) for col, g in zip(cap_cols, gradient)
+                ],
+            cut['objective'] - gradient @ point, np.inf
+            )
+
+    master.solve_highs()
+    caps = {
+        unit: float(value)
+        for unit, value in zip(units, master.values(cap_cols))
+        }
+    return caps, master.objective_value
+
+
+def solve_subproblems(pool, nr_periods, caps, stop_requested):
+    """Solve the subproblems of all periods in the worker pool.
+
+    Only the capacities are sent to the workers, the data of the periods is
+    passed once by `init_worker`. Returns the results in the order of the
+    periods or None if a stop was requested in the meantime. Pending
+    subproblems are cancelled then.
+    """
+    futures = [
+        pool.submit(solve_subproblem, k, caps) for k in range(nr_periods)
+        ]
+    pending = set(futures)
+    while pending:
+        _, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+        if pending and stop_requested():
+            for future in pending:
+                future.cancel()
+            return None
+    return [future.result() for future in futures]
+
+
+def benders(energy_system, period='month', gap=0.01, max_iterations=50,
+            workers=None):
+    """Optimize the capacities by Benders decomposition into periods.
+
+    The master problem holds the capacities of the units in invest mode and
+    one cost estimate per period. The subproblems optimize the dispatch of
+    each month or season with the binaries relaxed and return optimality
+    cuts from the reduced costs of the fixed capacities. They are solved in
+    parallel worker processes. The iterations stop when the gap between the
+    master objective and the best evaluated solution is below `gap`.
+
+    The storage content is not linked between periods, each period starts
+    at the initial storage level and is balanced on its own. Together with
+    the relaxed binaries, the master objective and the evaluated costs are
+    only estimates of the cost of the full problem and not bounds of it.
+    They bound the decomposed, relaxed problem and their gap measures the
+    convergence of the iterations. A valid upper bound is the MILP dispatch
+    of the full horizon at the resulting capacities.
+
+    The estimates of each iteration are recorded in the solver progress of the
+    energy system, if it has one. An early stop requested through it ends
+    the iterations with the best evaluated capacities. The master problem
+    and the subproblems are recorded as stages of the run profile.
+
+    Parameters
+    ----------
+
+    energy_system : model.EnergySystem
+        Energy system with units in invest mode.
+
+    period : str
+        Length of the subproblems, either 'month' or 'season'.
+
+    gap : float
+        Relative gap at which the iterations stop.
+
+    max_iterations : int
+        Maximum number of master iterations.
+
+    workers : int
+        Number of worker processes. Defaults to the number of periods or
+        cores, whichever is smaller.
+
+    Returns
+    -------
+
+    caps : dict
+        Optimized capacities keyed by unit.
+
+    report : dict
+        Master estimate, evaluated estimate and their gap of each iteration.
+    """
+    data = (
+        energy_system.data_full if energy_system.tsa is not None
+        else energy_system.data
+        )
+    periods = split_periods(data, period)
+    param_units = energy_system.param_units
+    param_opt = deepcopy(energy_system.param_opt)
+    param_opt.update({
+        'solve_strategy': None, 'aggregation': None, 'backend': 'matrix',
+        # Bounds are tightened with the full data and the capacities of
+        # the master are not ordered
+        'tighten_bounds': False, 'symmetry_breaking': False
+        })
+
+    invest_costs = energy_system.invest_costs()
+    bounds = {}
+    for unit in invest_units(param_units):
+        lower, upper = capacity_bounds(unit.rstrip('0123456789'))
+        bounds[unit] = (param_units[unit][lower], param_units[unit][upper])
+    caps = {unit: upper for unit, (_, upper) in bounds.items()}
+
+    if workers is None:
+        workers = min(len(periods), os.cpu_count() or 1)
+
+    progress = energy_system.progress
+    profile = energy_system.profile
+    if progress is not None:
+        progress.start(None, 'Benders')
+
+    def stop_requested():
+        # The first iteration is always completed, as its capacities at
+        # the upper bounds are the fallback solution
+        return (
+            progress is not None and progress.stop_requested
+            and 'caps' in best
+            )
+
+    cuts = []
+    history = []
+    best = {'estimate': np.inf}
+    start = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=init_worker,
+        initargs=(periods, param_units, param_opt)
+        )
+    with pool:
+        for iteration in range(max_iterations):
+            with profile.stage('benders_subproblems'):
+                results = solve_subproblems(
+                    pool, len(periods), caps, stop_requested
+                    )
+            if results is None:
+                break
+
+            estimate = sum(
+                invest_costs[unit] * cap for unit, cap in caps.items()
+                ) + sum(result['objective'] for result in results)
+            if estimate < best['estimate']:
+                best = {
+                    'estimate': estimate,
+                    'caps': caps,
+                    'shortfall': sum(r['shortfall'] for r in results)
+                    }
+            cuts += [(k, caps, result) for k, result in enumerate(results)]
+
+            with profile.stage('benders_master'):
+                caps, master_estimate = solve_master(
+                    bounds, invest_costs, cuts, len(periods)
+                    )
+            rel_gap = (
+                (best['estimate'] - master_estimate) / abs(best['estimate'])
+                )
+            history.append({
+                'iteration': iteration + 1,
+                'master_estimate': master_estimate,
+                'evaluated_estimate': best['estimate'],
+                'gap': rel_gap,
+                'time': time.perf_counter() - start
+                })
+            if progress is not None:
+                progress.record(
+                    best['estimate'], master_estimate, rel_gap * 100,
+                    elapsed=history[-1]['time']
+                    )
+            if rel_gap <= gap or stop_requested():
+                break
+
+    report = {
+        'period': period,
+        'nr_periods': len(periods),
+        'iterations': history,
+        'master_estimate': history[-1]['master_estimate'],
+        'evaluated_estimate': best['estimate'],
+        'gap': history[-1]['gap'],
+        'shortfall': best['shortfall'],
+        'stopped': stop_requested()
+        }
+    return best['caps'], report
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+COST_ROWS = ['invest', 'op_cost_fix', 'op_cost_var', 'op_cost']
+ENERGY_COLUMNS = ['H_source', 'P_source', 'P_internal', 'P_spotmarket',
+                  'Q_demand']
+
+
+def LCOH(invest, cost, Q, revenue=0, i=0.05, n=20):
+    """Konstantin 2013, Markus [29].
+
+    LCOH        Wärmegestehungskosten
+    invest:     Investitionsausgaben zum Zeitpunkt t=0
+    bwsf:       Barwert Summenfaktor
+    cashflow:   Differenz aller Einnahmen und Ausgaben (Zahlungsströme)
+                innerhalb des betrachteten Jahres
+    Q:          Gesamte bereitgestellte Wärmemenge pro Jahr
+    i:          Kalkulationszinssatz
+    n:          Betrachtungsdauer
+    """
+    q = 1 + i
+    bwsf = (q**n - 1)/(q**n * (q - 1))
+
+    LCOH = (invest + bwsf * (cost - revenue))/(bwsf * Q)
+    return LCOH
+
+
+class Economics():
+    """Economic evaluation of optimization results as array operations.
+
+    The unit specific cost parameters are collected once into arrays, so
+    that the unit costs, the energy costs and the revenues of one or many
+    result sets are calculated in a single pass.
+
+    Parameters
+    ----------
+
+    param_units : dict
+        Parameters of the units in the energy system.
+
+    param_opt : dict
+        Optimization parameters.
+    """
+
+    def __init__(self, param_units, param_opt):
+        self.param_opt = param_opt
+        self.units = list(param_units.keys())
+
+        energy_labels = []
+        cap_factor = []
+        inv_spez = []
+        op_cost_fix = []
+        op_cost_var = []
+        for unit, unit_params in param_units.items():
+            unit_cat = unit.rstrip('0123456789')
+
+            factor = 1
+            add_cost = 0
+            if unit_cat == 'plb':
+                add_cost = param_opt['energy_tax']
+                energy_labels.append(f'Q_{unit}')
+            elif unit_cat == 'hp':
+                energy_labels.append(f'Q_out_{unit}')
+            elif unit_cat == 'tes':
+                energy_labels.append(f'Q_in_{unit}')
+            elif unit_cat in ['ccet', 'ice']:
+                # Specific costs of chp units relate to the electrical power
+                energy_labels.append(f'P_{unit}')
+                factor = unit_params['eta_el'] / unit_params['eta_th']
+            else:
+                energy_labels.append(f'Q_{unit}')
+
+            cap_factor.append(factor)
+            inv_spez.append(unit_params['inv_spez'])
+            op_cost_fix.append(unit_params['op_cost_fix'])
+            op_cost_var.append(unit_params['op_cost_var'] + add_cost)
+
+        self.columns = energy_labels + ENERGY_COLUMNS
+        self.cap_factor = np.array(cap_factor, dtype=float)
+        self.inv_spez = np.array(inv_spez, dtype=float)
+        self.op_cost_fix = np.array(op_cost_fix, dtype=float)
+        self.op_cost_var = np.array(op_cost_var, dtype=float)
+
+    def prices(self, data):
+        """Stack the price time series of the input data.
+
+        Returns an array of shape (runs, 3, time steps) holding the gas price
+        including the CO2 price, the grid electricity price and the spot
+        market revenue price.
+        """
+        if isinstance(data, pd.DataFrame):
+            data = [data]
+        return np.stack([
+            np.stack([
+                df['gas_price'].to_numpy(dtype=float)
+                + df['co2_price'].to_numpy(dtype=float)
+                * self.param_opt['ef_gas'],
+                df['el_spot_price'].to_numpy(dtype=float)
+                + self.param_opt['elec_consumer_charges_grid'],
+                df['el_spot_price'].to_numpy(dtype=float)
+                + self.param_opt['vNNE']
+                ])
+            for df in data
+            ])
+
+    def evaluate(self, data_all, data_caps, data):
+        """Calculate unit costs and key parameters of one or many runs.
+
+        Parameters
+        ----------
+
+        data_all : pandas.DataFrame or list
+            Time series results of each run as returned by
+            `EnergySystem.get_results`. Missing columns count as zero.
+
+        data_caps : pandas.DataFrame or list
+            Unit capacities with one row per run.
+
+        data : pandas.DataFrame or list
+            Input data of each run. A single DataFrame is used for all runs.
+
+        Returns
+        -------
+
+        cost : numpy.ndarray
+            Unit costs of shape (runs, len(COST_ROWS), units).
+
+        key_params : pandas.DataFrame
+            Economic key parameters with one row per run.
+        """
+        if isinstance(data_all, pd.DataFrame):
+            data_all = [data_all]
+        if not isinstance(data_caps, pd.DataFrame):
+            data_caps = pd.concat(data_caps, ignore_index=True)
+
+        prices = self.prices(data)
+        n_steps = prices.shape[-1]
+        flows = np.stack([
+            df.reindex(columns=self.columns, fill_value=0).iloc[:n_steps]
+            .to_numpy(dtype=float)
+            for df in data_all
+            ])
+        n_units = len(self.units)
+        units = flows[:, :, :n_units]
+        H_source, P_source, P_internal, P_spotmarket, Q_demand = (
+            flows[:, :, n_units + j] for j in range(len(ENERGY_COLUMNS))
+            )
+
+        caps = data_caps[[f'cap_{unit}' for unit in self.units]].to_numpy(
+            dtype=float
+            )
+        E_N = caps * self.cap_factor
+
+        cost = np.empty((len(flows), len(COST_ROWS), n_units))
+        cost[:, 0] = self.inv_spez * E_N
+        cost[:, 1] = self.op_cost_fix * E_N
+        cost[:, 2] = self.op_cost_var * np.nansum(units, axis=1)
+        cost[:, 3] = cost[:, 1] + cost[:, 2]
+
+        key_params = {}
+        key_params['op_cost_total'] = cost[:, 3].sum(axis=1)
+        key_params['invest_total'] = cost[:, 0].sum(axis=1)
+        key_params['cost_gas'] = np.nansum(H_source * prices[:, 0], axis=1)
+        key_params['cost_el_grid'] = np.nansum(
+            P_source * prices[:, 1], axis=1
+            )
+        key_params['cost_el_internal'] = (
+            np.nansum(P_internal, axis=1)
+            * self.param_opt['elec_consumer_charges_self']
+            )
+        key_params['cost_el'] = (
+            key_params['cost_el_grid'] + key_params['cost_el_internal']
+            )
+        key_params['cost_total'] = (
+            key_params['op_cost_total'] + key_params['cost_gas']
+            + key_params['cost_el']
+            )
+
+        total_heat_demand = np.nansum(Q_demand, axis=1)
+        key_params['revenues_spotmarket'] = np.nansum(
+            P_spotmarket * prices[:, 2], axis=1
+            )
+        key_params['revenues_heat'] = (
+            total_heat_demand * self.param_opt['heat_price']
+            )
+        key_params['revenues_total'] = (
+            key_params['revenues_spotmarket'] + key_params['revenues_heat']
+            )
+        key_params['balance_total'] = (
+            key_params['revenues_total'] - key_params['cost_total']
+            )
+
+        key_params['LCOH'] = LCOH(
+            key_params['invest_total'], key_params['cost_total'],
+            total_heat_demand,
+            revenue=key_params['revenues_spotmarket'],
+            i=self.param_opt['capital_interest'], n=self.param_opt['lifetime']
+            )
+        key_params['total_heat_demand'] = total_heat_demand
+
+        return cost, pd.DataFrame(key_params)
+
+    def cost_frame(self, cost, run=0):
+        """Unit costs of a single run as DataFrame like `cost_df`."""
+        return pd.DataFrame(cost[run], index=COST_ROWS, columns=self.units)
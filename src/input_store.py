@@ -0,0 +1,187 @@
+"""Year partitioned store of the bundled input time series.
+
+The semicolon CSV files in 'input' are split once into one uncompressed
+Arrow IPC file per dataset and year. The files are memory-mapped when read,
+so that loading a column of a year neither parses text nor reads the other
+columns and years. The store is rebuilt when a CSV file changes.
+
+The mapped partitions are shared read-only by all sessions of a process.
+Reading returns DataFrames on these arrays without copying them, so the
+data has to be copied before its values are changed.
+"""
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+from workspace import atomic_write
+
+INPUT_PATH = os.path.join(os.path.dirname(__file__), 'input')
+STORE_PATH = os.path.join(os.path.dirname(__file__), 'cache', 'input_store')
+
+# Source file of each dataset in the store
+DATASETS = {'heat_load': 'heat_load.csv', 'eco_data': 'eco_data.csv'}
+
+# Name of the column holding the time index in the partition files
+INDEX_COLUMN = '__index__'
+
+# Manifests and mapped partition tables shared by all sessions of the
+# process, the tables are keyed by dataset and year
+_MANIFESTS = {}
+_TABLES = {}
+_LOCK = threading.Lock()
+
+
+def source_stamp(name):
+    """Modification time and size of the source file of a dataset."""
+    stat = os.stat(os.path.join(INPUT_PATH, DATASETS[name]))
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def partition_path(name, year):
+    return os.path.join(STORE_PATH, name, f'{year}.arrow')
+
+
+def frame_to_partition(df):
+    """Serialize a DataFrame to uncompressed Arrow IPC file bytes.
+
+    Missing values are kept as NaN instead of Arrow nulls, so that the
+    columns can be read without copying.
+    """
+    arrays = {INDEX_COLUMN: pa.array(df.index.to_numpy())}
+    for col in df.columns:
+        arrays[col] = pa.array(df[col].to_numpy(), from_pandas=False)
+    table = pa.table(arrays)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def build_store(name):
+    """Split the source file of a dataset into one partition per year.
+
+    Returns the manifest of the dataset with the stamp of the source file,
+    the name of the index, the columns and the years with data per column.
+    """
+    df = pd.read_csv(
+        os.path.join(INPUT_PATH, DATASETS[name]),
+        sep=';', index_col=0, parse_dates=True
+        )
+    df.columns = [str(col) for col in df.columns]
+    os.makedirs(os.path.join(STORE_PATH, name), exist_ok=True)
+
+    years = df.index.year
+    for year in years.unique():
+        atomic_write(
+            partition_path(name, year), frame_to_partition(df[years == year])
+            )
+
+    manifest = {
+        'source': source_stamp(name),
+        'index_name': df.index.name,
+        'columns': list(df.columns),
+        'years': sorted(int(year) for year in years.unique()),
+        'column_years': {
+            col: sorted(int(year) for year in years[df[col].notna()].unique())
+            for col in df.columns
+            }
+        }
+    atomic_write(
+        os.path.join(STORE_PATH, name, 'manifest.json'),
+        json.dumps(manifest, indent=4)
+        )
+    return manifest
+
+
+def read_manifest(name):
+    """Manifest of a dataset, which is built first if it is out of date."""
+    stamp = source_stamp(name)
+    manifest = _MANIFESTS.get(name)
+    if manifest is not None and manifest['source'] == stamp:
+        return manifest
+
+    with _LOCK:
+        manifest = None
+        filepath = os.path.join(STORE_PATH, name, 'manifest.json')
+        if os.path.exists(filepath):
+            with open(filepath, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        if manifest is None or manifest['source'] != stamp:
+            manifest = build_store(name)
+        # Partitions mapped before the store was rebuilt are outdated
+        for key in [key for key in _TABLES if key[0] == name]:
+            del _TABLES[key]
+        _MANIFESTS[name] = manifest
+    return manifest
+
+
+def ensure_store():
+    """Build the partitions of all datasets that are missing or outdated."""
+    for name in DATASETS:
+        read_manifest(name)
+
+
+def columns(name):
+    return read_manifest(name)['columns']
+
+
+def years(name, column=None):
+    """Years of a dataset or the years in which a column has data."""
+    manifest = read_manifest(name)
+    if column is None:
+        return manifest['years']
+    return manifest['column_years'][column]
+
+
+def partition_table(name, year):
+    """Arrow table of a partition, which is mapped once per process."""
+    key = (name, int(year))
+    table = _TABLES.get(key)
+    if table is None:
+        with _LOCK:
+            table = _TABLES.get(key)
+            if table is None:
+                source = pa.memory_map(partition_path(name, year), 'r')
+                table = pa.ipc.open_file(source).read_all()
+                _TABLES[key] = table
+    return table
+
+
+def read_only(values):
+    values.flags.writeable = False
+    return values
+
+
+def read(name, year, columns=None):
+    """Read columns of a dataset in a year from its memory-mapped partition.
+
+    The DataFrame is a new object on the shared read-only arrays of the
+    partition. Copy it before changing its values.
+
+    Parameters
+    ----------
+
+    name : str
+        Name of the dataset, e.g. 'heat_load' or 'eco_data'.
+
+    year : int
+        Year of the partition.
+
+    columns : list
+        Columns to read. Defaults to all columns of the dataset.
+    """
+    manifest = read_manifest(name)
+    if columns is None:
+        columns = manifest['columns']
+    table = partition_table(name, year)
+    index = pd.DatetimeIndex(
+        read_only(table.column(INDEX_COLUMN).to_numpy()),
+        name=manifest['index_name']
+        )
+    return pd.DataFrame(
+        {col: read_only(table.column(col).to_numpy()) for col in columns},
+        index=index, copy=False
+        )
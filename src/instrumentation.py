@@ -0,0 +1,224 @@
+import datetime as dt
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyomo.environ as po
+from pyomo.core.expr.visitor import identify_variables
+
+from workspace import atomic_write
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def current_rss():
+    """Current resident set size of the process in MB."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024**2
+    try:
+        with open('/proc/self/statm', 'r', encoding='utf-8') as file:
+            pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / 1024**2
+
+
+class RssSampler():
+    """Sample the resident set size of the process in a background thread.
+
+    Parameters
+    ----------
+
+    interval : float
+        Time between two samples in seconds.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start = None
+        self.peak = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start = current_rss()
+        if self.start is not None:
+            self.peak = self.start
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._done.set()
+            self._thread.join()
+            self._sample()
+
+    @property
+    def delta(self):
+        """Increase of the peak over the resident set size at the start."""
+        if self.start is None:
+            return None
+        return self.peak - self.start
+
+
+def model_size(model):
+    """Count variables, binaries, constraints and nonzeros of a pyomo model."""
+    nr_vars = 0
+    nr_binaries = 0
+    for var in model.component_data_objects(po.Var, active=True):
+        nr_vars += 1
+        if var.is_binary() or var.is_integer():
+            nr_binaries += 1
+
+    nr_constraints = 0
+    nr_nonzeros = 0
+    for con in model.component_data_objects(po.Constraint, active=True):
+        nr_constraints += 1
+        nr_nonzeros += sum(
+            1 for _ in identify_variables(con.body, include_fixed=False)
+            )
+
+    return {
+        'variables': nr_vars,
+        'binaries': nr_binaries,
+        'constraints': nr_constraints,
+        'nonzeros': nr_nonzeros
+        }
+
+
+class RunProfile():
+    """Record wall time, CPU time and peak memory of the pipeline stages.
+
+    Stages that run multiple times (e.g. the solver in the two-stage
+    strategy) are accumulated. Stages run within another stage, e.g.
+    'run_solver' within 'solve_model', record the enclosing stage as parent
+    and are excluded from the totals. The memory of a stage is sampled
+    while it runs: 'peak_rss_mb' is the peak resident set size of the
+    process during the stage and 'rss_delta_mb' the largest increase of the
+    peak over the resident set size at the start of a call. Memory of
+    solvers run as separate processes is not included.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.model_size = None
+        self._active = []
+
+    def _record(self, name, parent):
+        return self.stages.setdefault(
+            name, {
+                'parent': parent, 'calls': 0, 'wall_time': 0.0,
+                'cpu_time': 0.0, 'peak_rss_mb': None, 'rss_delta_mb': None
+                }
+            )
+
+    @staticmethod
+    def _update_memory(record, peak, delta):
+        if peak is not None:
+            record['peak_rss_mb'] = max(record['peak_rss_mb'] or 0, peak)
+        if delta is not None:
+            record['rss_delta_mb'] = max(record['rss_delta_mb'] or 0, delta)
+
+    @contextmanager
+    def stage(self, name):
+        parent = self._active[-1] if self._active else None
+        self._active.append(name)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            with RssSampler() as sampler:
+                yield
+        finally:
+            self._active.pop()
+            record = self._record(name, parent)
+            record['calls'] += 1
+            record['wall_time'] += time.perf_counter() - wall_start
+            record['cpu_time'] += time.process_time() - cpu_start
+            self._update_memory(record, sampler.peak, sampler.delta)
+
+    def merge(self, other, prefix):
+        """Accumulate the stages of a sub-run's profile under a prefix.
+
+        The top-level stages of the sub-run become children of the stage
+        running in this profile, if any.
+        """
+        enclosing = self._active[-1] if self._active else None
+        for name, other_record in other.stages.items():
+            if other_record['parent'] is None:
+                parent = enclosing
+            else:
+                parent = f'{prefix}.{other_record["parent"]}'
+            record = self._record(f'{prefix}.{name}', parent)
+            record['calls'] += other_record['calls']
+            record['wall_time'] += other_record['wall_time']
+            record['cpu_time'] += other_record['cpu_time']
+            self._update_memory(
+                record, other_record['peak_rss_mb'],
+                other_record['rss_delta_mb']
+                )
+
+    def totals(self):
+        """Wall and CPU time of the top-level stages and the overall peak."""
+        top_level = [
+            record for record in self.stages.values()
+            if record['parent'] is None
+            ]
+        peaks = [
+            record['peak_rss_mb'] for record in self.stages.values()
+            if record['peak_rss_mb'] is not None
+            ]
+        return {
+            'wall_time': sum(record['wall_time'] for record in top_level),
+            'cpu_time': sum(record['cpu_time'] for record in top_level),
+            'peak_rss_mb': max(peaks) if peaks else None
+            }
+
+    def to_frame(self):
+        return pd.DataFrame.from_dict(self.stages, orient='index')
+
+    def to_dict(self):
+        return {
+            'stages': self.stages, 'totals': self.totals(),
+            'model_size': self.model_size
+            }
+
+
+def instrumented(stage):
+    """Decorate an EnergySystem method to be recorded as pipeline stage."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.profile.stage(stage):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_run_record(energy_system, path):
+    """Write the profile of an energy system run to a JSON file."""
+    energy_system.calc_model_size()
+    record = {
+        'timestamp': dt.datetime.now().isoformat(timespec='seconds'),
+        'solver': energy_system.param_opt['Solver'],
+        'periods': energy_system.periods,
+        'units': sorted(energy_system.param_units.keys()),
+        **energy_system.profile.to_dict()
+        }
+    atomic_write(path, json.dumps(record, indent=4))
@@ -0,0 +1,329 @@
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import shutil
+import signal
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from copy import deepcopy
+
+from model import EnergySystem
+from progress import SolverProgress, read_progress
+from racing import terminate
+from result_cache import ResultCache
+from workspace import Workspace, atomic_write
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+JOB_STATES = ['queued', 'running', 'finished', 'failed', 'cancelled']
+
+
+def write_status(job_dir, **fields):
+    """Update the status file of a job atomically."""
+    status = read_status(job_dir) or {}
+    status.update(fields)
+    atomic_write(
+        os.path.join(job_dir, 'status.json'),
+        json.dumps(status, indent=4, default=str)
+        )
+
+
+def read_status(job_dir):
+    try:
+        with open(os.path.join(job_dir, 'status.json'), 'r',
+                  encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_pickle(filepath, obj):
+    atomic_write(
+        filepath, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+
+def read_pickle(filepath):
+    try:
+        with open(filepath, 'rb') as file:
+            return pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def run_job(job_dir):
+    """Optimize an energy system in a worker process and store the results.
+
+    The inputs are read from 'inputs.pkl' and the results payload is pickled
+    to 'results.pkl' and added to the result cache. The solver progress is
+    written to 'progress.jsonl' and an early stop is requested by creating
+    the file 'stop' in the job directory.
+    """
+    if hasattr(os, 'setpgrp'):
+        # Solver subprocesses join the process group of the worker, so that
+        # they are terminated together with the worker on a cancel
+        os.setpgrp()
+    data, param_units, param_opt = read_pickle(
+        os.path.join(job_dir, 'inputs.pkl')
+        )
+    write_status(
+        job_dir, state='running', started=time.time(), pid=os.getpid()
+        )
+    progress = SolverProgress(
+        path=os.path.join(job_dir, 'progress.jsonl'),
+        stop_path=os.path.join(job_dir, 'stop')
+        )
+    try:
+        energy_system = EnergySystem(
+            data, param_units, param_opt, workspace=Workspace(path=job_dir)
+            )
+        energy_system.progress = progress
+        energy_system.run_model()
+        energy_system.run_postprocessing()
+
+        payload = energy_system.result_payload()
+        ResultCache().store(energy_system.cache_key, payload)
+
+        write_pickle(os.path.join(job_dir, 'results.pkl'), payload)
+    except Exception as e:
+        write_status(
+            job_dir, state='failed', finished=time.time(), error=repr(e),
+            traceback=traceback.format_exc()
+            )
+    else:
+        write_status(
+            job_dir, state='finished', finished=time.time(),
+            logpath=energy_system.logpath
+            )
+    finally:
+        progress.finish()
+
+
+def process_exists(pid):
+    """Whether a process with the given id exists."""
+    if pid is None:
+        return False
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == 'nt':
+        # Signals other than CTRL events terminate the process on Windows.
+        # Without psutil, workers are assumed to have ended with the server.
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists, but belongs to another user
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def terminate_worker(process):
+    """Terminate a worker process including its solver subprocesses."""
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            # Worker has not become a process group leader yet
+            terminate(process)
+        else:
+            process.join()
+    else:
+        terminate(process)
+
+
+class JobManager():
+    """Queue of optimization jobs running in worker processes.
+
+    Jobs are identified by a unique id and keep their status, progress and
+    results in a directory of their own, so that only the id has to be held
+    by a session. At most `max_workers` jobs run at the same time, further
+    jobs wait in the queue until a worker is free. The queue is advanced
+    whenever the manager is queried.
+
+    The queue and the worker processes only exist in the manager, so jobs
+    left queued or running by an earlier server run are marked as failed
+    when a manager is created (see `fail_orphaned`).
+
+    Parameters
+    ----------
+
+    path : str
+        Directory of the job directories. Defaults to 'jobs' next to this
+        module.
+
+    max_workers : int
+        Maximum number of concurrently running jobs. Defaults to half the
+        number of cores.
+    """
+
+    def __init__(self, path=None, max_workers=None):
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), 'jobs')
+        self.path = os.path.abspath(path)
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 1) // 2)
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._processes = {}
+        self._context = multiprocessing.get_context('spawn')
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        self.fail_orphaned()
+
+    def job_dir(self, job_id):
+        if not re.fullmatch('[0-9a-f]{32}', str(job_id)):
+            raise ValueError(f'"{job_id}" is no valid job id.')
+        return os.path.join(self.path, job_id)
+
+    def exists(self, job_id):
+        try:
+            return os.path.exists(self.job_dir(job_id))
+        except ValueError:
+            return False
+
+    def submit(self, data, param_units, param_opt):
+        """Add an optimization to the queue and return its job id."""
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_dir(job_id)
+        os.makedirs(job_dir)
+
+        param_opt = deepcopy(param_opt)
+        param_opt.setdefault(
+            'Threads', max(1, (os.cpu_count() or 1) // self.max_workers)
+            )
+        write_pickle(
+            os.path.join(job_dir, 'inputs.pkl'),
+            (data, param_units, param_opt)
+            )
+        write_status(job_dir, state='queued', submitted=time.time())
+
+        with self._lock:
+            self._queue.append(job_id)
+        self._schedule()
+        return job_id
+
+    def _schedule(self):
+        with self._lock:
+            for job_id, process in list(self._processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del self._processes[job_id]
+                status = read_status(self.job_dir(job_id))
+                if status is not None and status['state'] == 'running':
+                    write_status(
+                        self.job_dir(job_id), state='failed',
+                        finished=time.time(),
+                        error=(
+                            'Worker process ended unexpectedly with exit '
+                            + f'code {process.exitcode}.'
+                            )
+                        )
+
+            while self._queue and len(self._processes) < self.max_workers:
+                job_id = self._queue.popleft()
+                process = self._context.Process(
+                    target=run_job, args=(self.job_dir(job_id),), daemon=True
+                    )
+                process.start()
+                self._processes[job_id] = process
+
+    def status(self, job_id):
+        """Status of a job as dict with at least the key 'state'."""
+        self._schedule()
+        status = read_status(self.job_dir(job_id))
+        if status is None:
+            return {'state': 'unknown'}
+        if status['state'] == 'queued':
+            with self._lock:
+                queued = list(self._queue)
+            if job_id in queued:
+                status['position'] = queued.index(job_id) + 1
+        return status
+
+    def progress(self, job_id):
+        """Solver progress records of a job as DataFrame."""
+        return read_progress(
+            os.path.join(self.job_dir(job_id), 'progress.jsonl')
+            )
+
+    def stop(self, job_id):
+        """Request a running job to stop early with its current incumbent."""
+        open(os.path.join(self.job_dir(job_id), 'stop'), 'w').close()
+
+    def cancel(self, job_id):
+        """Remove a queued job or terminate a running job and its solver."""
+        with self._lock:
+            self._queue = deque(job for job in self._queue if job != job_id)
+            process = self._processes.pop(job_id, None)
+        if process is not None:
+            terminate_worker(process)
+        status = read_status(self.job_dir(job_id))
+        if status is not None and status['state'] in ['queued', 'running']:
+            write_status(
+                self.job_dir(job_id), state='cancelled', finished=time.time()
+                )
+        self._schedule()
+
+    def inputs(self, job_id):
+        """Input data, unit and optimization parameters of a job or None."""
+        return read_pickle(os.path.join(self.job_dir(job_id), 'inputs.pkl'))
+
+    def result(self, job_id):
+        """Results payload of a finished job or None."""
+        return read_pickle(os.path.join(self.job_dir(job_id), 'results.pkl'))
+
+    def fail_orphaned(self):
+        """Mark queued or running jobs without a worker as failed.
+
+        Queued jobs are orphaned if they are not in the queue of this
+        manager. Running jobs are orphaned if they are not run by this
+        manager and their worker process does not exist anymore, e.g. after
+        a restart of the server.
+        """
+        with self._lock:
+            managed = set(self._queue) | set(self._processes)
+        for entry in os.scandir(self.path):
+            if not entry.is_dir() or entry.name in managed:
+                continue
+            status = read_status(entry.path)
+            if status is None:
+                continue
+            if status['state'] == 'queued':
+                error = 'The job was not started before the server stopped.'
+            elif status['state'] == 'running':
+                if process_exists(status.get('pid')):
+                    continue
+                error = 'The worker process of the job does not exist anymore.'
+            else:
+                continue
+            write_status(
+                entry.path, state='failed', finished=time.time(), error=error
+                )
+
+    def cleanup(self, max_age=24*3600):
+        """Delete directories of jobs that ended more than max_age ago."""
+        now = time.time()
+        for entry in os.scandir(self.path):
+            if not entry.is_dir():
+                continue
+            status = read_status(entry.path)
+            if status is None or status['state'] in ['queued', 'running']:
+                continue
+            if now - status.get('finished', now) > max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
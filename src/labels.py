@@ -0,0 +1,126 @@
+import logging
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+LABELDICT_PATH = os.path.join(
+    os.path.dirname(__file__), 'input', 'labeldict.csv'
+    )
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def read_labeldict(labeldictpath=LABELDICT_PATH):
+    """Read the label templates as tuple of (name_out, name_in, type, label)."""
+    labeldict_csv = pd.read_csv(labeldictpath, sep=';', na_filter=False)
+    return tuple(
+        labeldict_csv[['name_out', 'name_in', 'type', 'label']].itertuples(
+            index=False, name=None
+            )
+        )
+
+
+@lru_cache(maxsize=64)
+def compile_label_map(nodes, labeldictpath=LABELDICT_PATH):
+    """
+    Build the mapping of result keys to labels for an energy system topology.
+
+    Template rows of the labeldict use the unit category (e.g. 'hp') as node
+    name and '{unit}' as placeholder in the label. They are expanded to all
+    units of that category among the nodes. Units are the nodes with a
+    number appended to their category, the other end of a template row is a
+    bus like 'heat network'.
+
+    Parameters
+    ----------
+
+    nodes : frozenset
+        Labels of the nodes in the energy system.
+
+    labeldictpath : str
+        Path to the labeldict csv file. Defaults to the one in the input
+        directory.
+
+    Returns
+    -------
+
+    label_map : dict
+        Labels keyed by ((name_out, name_in), type). The returned dict is
+        shared between calls and must not be modified.
+    """
+    units = {}
+    for node in nodes:
+        unit_cat = node.rstrip('0123456789')
+        if unit_cat != node:
+            units.setdefault(unit_cat, []).append(node)
+
+    label_map = {}
+    for name_out, name_in, var_type, label in read_labeldict(labeldictpath):
+        if '{unit}' not in label:
+            label_map[((name_out, name_in), var_type)] = label
+            continue
+
+        # Expand the row from its unit side, not from the bus side
+        cat = name_out if name_out in units else name_in
+        for unit in units.get(cat, []):
+            key = (
+                (unit if name_out == cat else name_out,
+                 unit if name_in == cat else name_in),
+                var_type
+                )
+            label_map[key] = label.format(unit=unit)
+            # Storage scalars may be keyed by None instead of 'None'
+            if key[0][1] == 'None':
+                label_map[((key[0][0], None), var_type)] = (
+                    label.format(unit=unit)
+                    )
+
+    return label_map
+
+
+def result_keys_nodes(keys):
+    """Collect the node labels of result keys ((name_out, name_in), type)."""
+    nodes = set()
+    for key in keys:
+        if isinstance(key, tuple) and isinstance(key[0], tuple):
+            nodes.update(str(node) for node in key[0])
+    return frozenset(nodes)
+
+
+def relabel(df, label_map=None):
+    """
+    Relabel the columns (DataFrame) or index (Series) of oemof results.
+
+    Keys without a label are renamed to None and keys that are no result keys
+    are kept. Both are logged on debug level of the 'labels' logger.
+
+    Parameters
+    ----------
+
+    df : pandas.DataFrame or pandas.Series
+        Results whose column names should be relabeled in place.
+
+    label_map : dict
+        Compiled label map. If None, it is compiled for the nodes found in
+        the keys.
+    """
+    keys = df.columns if isinstance(df, pd.DataFrame) else df.index
+    if label_map is None:
+        label_map = compile_label_map(result_keys_nodes(keys))
+
+    labels = {}
+    for key in keys:
+        if not isinstance(key, tuple):
+            logger.debug('Key skipped while labeling', extra={'edge': key})
+            continue
+        label = label_map.get(key)
+        if label is None:
+            logger.debug('Key could not be labeled', extra={'edge': key})
+        labels[key] = label
+
+    if isinstance(df, pd.DataFrame):
+        df.rename(columns=labels, inplace=True)
+    else:
+        df.rename(index=labels, inplace=True)
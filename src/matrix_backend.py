@@ -0,0 +1,585 @@
+import numpy as np
+import oemof.solph as solph
+import pandas as pd
+from scipy import sparse
+
+
+def sequence_values(values, n, default):
+    """Values of a solph sequence, series or scalar as array of length n.
+
+    Shorter sequences are padded with their last value, e.g. the storage
+    levels of the time steps are also used for the last time point.
+    """
+    if isinstance(values, (pd.Series, pd.Index, np.ndarray, list, tuple)):
+        array = np.asarray(values, dtype=float)[:n]
+        if len(array) < n:
+            array = np.append(array, np.full(n - len(array), array[-1]))
+        return array
+    value = first_value(values)
+    return np.full(n, default if value is None else float(value))
+
+
+def first_value(value):
+    """Scalar value of a parameter that may be a solph sequence."""
+    if value is None or np.isscalar(value):
+        return value
+    try:
+        return value[0]
+    except (TypeError, IndexError, KeyError):
+        return value
+
+
+class MatrixModel():
+    """Mixed integer linear program in matrix form.
+
+    The program is `min cost @ x` subject to
+    `row_lower <= A @ x <= row_upper` and `lower <= x <= upper`. Variables
+    and constraints are added in blocks of one column or row per time step,
+    so that the constraint matrix is assembled from a few large arrays
+    instead of single expressions.
+    """
+
+    def __init__(self):
+        self.n_cols = 0
+        self.n_rows = 0
+        self._lower = []
+        self._upper = []
+        self._cost = []
+        self._integer = []
+        self._row_lower = []
+        self._row_upper = []
+        self._rows = []
+        self._cols = []
+        self._vals = []
+
+        # Columns of the result variables keyed by node labels
+        self.flow_cols = {}
+        # Values of fixed flows, which are constants instead of columns
+        self.fixed_flows = {}
+        self.objective_offset = 0
+        self.status_cols = {}
+        self.flow_invest_cols = {}
+        self.content_cols = {}
+        self.storage_invest_cols = {}
+        # Rows of the bus balances keyed by bus label
+        self.bus_rows = {}
+
+        self.solution = None
+        self.reduced_costs = None
+        self.objective_value = None
+        self.status = None
+
+    def add_variables(self, size, lower=0, upper=np.inf, cost=0,
+                      integer=False):
+        """Add a block of variables and return their column indices."""
+        cols = np.arange(self.n_cols, self.n_cols + size)
+        self._lower.append(np.broadcast_to(np.asarray(lower, float), size))
+        self._upper.append(np.broadcast_to(np.asarray(upper, float), size))
+        self._cost.append(np.broadcast_to(np.asarray(cost, float), size))
+        self._integer.append(np.full(size, integer))
+        self.n_cols += size
+        return cols
+
+    def add_constraints(self, terms, lower, upper):
+        """Add a block of constraints and return their row indices.
+
+        Parameters
+        ----------
+
+        terms : list
+            Tuples of columns and coefficients, one of each per row. Scalar
+            columns (e.g. an investment) are used in all rows of the block.
+
+        lower, upper : float or numpy.ndarray
+            Bounds of the rows. Use equal bounds for equality constraints.
+        """
+        size = max(np.size(cols) for cols, _ in terms)
+        rows = np.arange(self.n_rows, self.n_rows + size)
+        for cols, coefs in terms:
+            cols = np.broadcast_to(cols, size)
+            coefs = np.broadcast_to(np.asarray(coefs, float), size)
+            nonzero = coefs != 0
+            self._rows.append(rows[nonzero])
+            self._cols.append(cols[nonzero])
+            self._vals.append(coefs[nonzero])
+        self._row_lower.append(
+            np.broadcast_to(np.asarray(lower, float), size)
+            )
+        self._row_upper.append(
+            np.broadcast_to(np.asarray(upper, float), size)
+            )
+        self.n_rows += size
+        return rows
+
+    def add_coefficients(self, rows, cols, coefs):
+        """Add coefficients of (new) columns to existing rows."""
+        rows, cols, coefs = np.broadcast_arrays(rows, cols, coefs)
+        self._rows.append(np.asarray(rows).ravel())
+        self._cols.append(np.asarray(cols).ravel())
+        self._vals.append(np.asarray(coefs, float).ravel())
+
+    def fix(self, cols, values):
+        """Fix variables to values through their bounds."""
+        lower = np.concatenate(self._lower)
+        upper = np.concatenate(self._upper)
+        lower[cols] = values
+        upper[cols] = values
+        self._lower = [lower]
+        self._upper = [upper]
+
+    def set_cost(self, cols, values):
+        cost = np.concatenate(self._cost)
+        cost[cols] = values
+        self._cost = [cost]
+
+    def relax(self):
+        """Drop the integrality of all variables."""
+        self._integer = [np.zeros(self.n_cols, dtype=bool)]
+
+    @property
+    def lower(self):
+        return np.concatenate(self._lower)
+
+    @property
+    def upper(self):
+        return np.concatenate(self._upper)
+
+    @property
+    def cost(self):
+        return np.concatenate(self._cost)
+
+    @property
+    def integer(self):
+        return np.concatenate(self._integer)
+
+    @property
+    def row_lower(self):
+        return np.concatenate(self._row_lower)
+
+    @property
+    def row_upper(self):
+        return np.concatenate(self._row_upper)
+
+    def matrix(self):
+        """Constraint matrix in compressed sparse column format."""
+        return sparse.csc_matrix(
+            (
+                np.concatenate(self._vals),
+                (np.concatenate(self._rows), np.concatenate(self._cols))
+                ),
+            shape=(self.n_rows, self.n_cols)
+            )
+
+    def size(self):
+        """Size of the program like `instrumentation.model_size`."""
+        return {
+            'variables': self.n_cols,
+            'binaries': int(self.integer.sum()),
+            'constraints': self.n_rows,
+            'nonzeros': int(sum(len(vals) for vals in self._vals))
+            }
+
+    def solve_highs(self, mip_gap=None, time_limit=None, threads=None,
+                    logfile=None, options=None, progress=None):
+        """Pass the matrices to HiGHS and solve the program."""
+        import highspy
+
+        A = self.matrix()
+        lp = highspy.HighsLp()
+        lp.num_col_ = self.n_cols
+        lp.num_row_ = self.n_rows
+        lp.col_cost_ = self.cost
+        lp.col_lower_ = self.lower
+        lp.col_upper_ = self.upper
+        lp.row_lower_ = self.row_lower
+        lp.row_upper_ = self.row_upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.num_col_ = self.n_cols
+        lp.a_matrix_.num_row_ = self.n_rows
+        lp.a_matrix_.start_ = A.indptr
+        lp.a_matrix_.index_ = A.indices
+        lp.a_matrix_.value_ = A.data
+        integer = self.integer
+        if integer.any():
+            lp.integrality_ = [
+                highspy.HighsVarType.kInteger if i
+                else highspy.HighsVarType.kContinuous
+                for i in integer
+                ]
+
+        highs = highspy.Highs()
+        highs.setOptionValue('log_to_console', False)
+        if logfile is not None:
+            highs.setOptionValue('log_file', logfile)
+        if mip_gap is not None:
+            highs.setOptionValue('mip_rel_gap', mip_gap)
+        if time_limit is not None:
+            highs.setOptionValue('time_limit', float(time_limit))
+        if threads is not None:
+            highs.setOptionValue('threads', threads)
+        for option, value in (options or {}).items():
+            highs.setOptionValue(option, value)
+        highs.passModel(lp)
+        if progress is not None:
+            progress.attach_highs(highs)
+        highs.run()
+
+        self.status = highs.modelStatusToString(highs.getModelStatus())
+        solution = highs.getSolution()
+        if not solution.value_valid:
+            raise RuntimeError(f'HiGHS found no solution: {self.status}')
+        self.solution = np.array(solution.col_value)
+        if solution.dual_valid:
+            self.reduced_costs = np.array(solution.col_dual)
+        self.objective_value = (
+            highs.getInfo().objective_function_value + self.objective_offset
+            )
+
+    def solve_gurobi(self, mip_gap=None, time_limit=None, threads=None,
+                     logfile=None, options=None):
+        """Pass the matrices to Gurobi and solve the program."""
+        import gurobipy as gp
+        from gurobipy import GRB
+
+        A = self.matrix().tocsr()
+        row_lower = self.row_lower
+        row_upper = self.row_upper
+        equal = row_lower == row_upper
+        senses = [
+            (equal, GRB.EQUAL, row_upper),
+            (~equal & np.isfinite(row_upper), GRB.LESS_EQUAL, row_upper),
+            (~equal & np.isfinite(row_lower), GRB.GREATER_EQUAL, row_lower)
+            ]
+
+        with gp.Env(empty=True) as env:
+            env.setParam('LogToConsole', 0)
+            if logfile is not None:
+                env.setParam('LogFile', logfile)
+            env.start()
+            with gp.Model(env=env) as model:
+                x = model.addMVar(
+                    self.n_cols, lb=self.lower, ub=self.upper, obj=self.cost,
+                    vtype=np.where(self.integer, GRB.INTEGER, GRB.CONTINUOUS)
+                    )
+                for mask, sense, rhs in senses:
+                    if mask.any():
+                        model.addMConstr(A[mask], x, sense, rhs[mask])
+                if mip_gap is not None:
+                    model.Params.MIPGap = mip_gap
+                if time_limit is not None:
+                    model.Params.TimeLimit = time_limit
+                if threads is not None:
+                    model.Params.Threads = threads
+                for option, value in (options or {}).items():
+                    model.setParam(option, value)
+                model.optimize()
+
+                self.status = model.Status
+                if model.SolCount == 0:
+                    raise RuntimeError(
+                        f'Gurobi found no solution: status {model.Status}'
+                        )
+                self.solution = np.array(x.X)
+                if not model.IsMIP:
+                    self.reduced_costs = np.array(x.RC)
+                self.objective_value = model.ObjVal + self.objective_offset
+
+    def values(self, cols):
+        return self.solution[cols]
+
+    def flow_values(self, nodes):
+        """Solution of the flows from or to one of the nodes."""
+        values = {
+            (i, o): self.values(cols)
+            for (i, o), cols in self.flow_cols.items()
+            if i in nodes or o in nodes
+            }
+        values.update({
+            (i, o): fixed for (i, o), fixed in self.fixed_flows.items()
+            if i in nodes or o in nodes
+            })
+        return values
+
+    def flow_terms(self, coefficients):
+        """Split weighted flows into constraint terms and a constant.
+
+        Parameters
+        ----------
+
+        coefficients : list
+            Tuples of flow keys and their coefficients.
+        """
+        terms = []
+        constant = 0
+        for key, coef in coefficients:
+            if key in self.fixed_flows:
+                constant = constant + coef * self.fixed_flows[key]
+            else:
+                terms.append((self.flow_cols[key], coef))
+        return terms, constant
+
+    def content_values(self):
+        return {
+            unit: self.values(cols)
+            for unit, cols in self.content_cols.items()
+            }
+
+    def flow_invest_values(self):
+        return {
+            key: float(self.values(col))
+            for key, col in self.flow_invest_cols.items()
+            }
+
+    def storage_invest_values(self):
+        return {
+            unit: float(self.values(col))
+            for unit, col in self.storage_invest_cols.items()
+            }
+
+
+def build_matrix_model(es, periods, eliminate_fixed=True):
+    """Assemble the program of an oemof.solph energy system in matrix form.
+
+    The constraints follow the ones oemof.solph builds for the components
+    of `model.EnergySystem`: bus balances, converters with fixed conversion
+    factors, flows with fixed profiles, nonconvex flows with a minimum load,
+    investment flows (also nonconvex), generic storages with and without
+    investment and the variable and periodical investment cost as objective.
+
+    Parameters
+    ----------
+
+    es : oemof.solph.EnergySystem
+        Energy system with all nodes added.
+
+    periods : int
+        Number of time steps.
+
+    eliminate_fixed : bool
+        Use fixed flows (e.g. the heat demand and solar thermal units
+        without investment) as constants instead of fixed columns.
+    """
+    T = periods
+    mm = MatrixModel()
+    timeincrement = sequence_values(
+        getattr(es, 'timeincrement', None), T, 1
+        )
+
+    for (i, o), flow in es.flows().items():
+        add_flow(
+            mm, (i.label, o.label), flow, T, timeincrement, eliminate_fixed
+            )
+
+    for node in es.nodes:
+        if isinstance(node, solph.Bus):
+            add_bus(mm, node, T)
+        elif isinstance(node, solph.components.Converter):
+            add_converter(mm, node, T)
+        elif isinstance(node, solph.components.GenericStorage):
+            add_storage(mm, node, T, timeincrement)
+        elif not isinstance(node, (solph.components.Source,
+                                   solph.components.Sink)):
+            raise NotImplementedError(
+                f'Node "{node.label}" of type {type(node).__name__} is not '
+                + 'supported by the matrix backend.'
+                )
+
+    return mm
+
+
+def add_flow(mm, key, flow, T, timeincrement, eliminate_fixed=True):
+    """Add the variables and bounds of a flow and its investment."""
+    cost = sequence_values(flow.variable_costs, T, 0) * timeincrement
+    fix = sequence_values(flow.fix, T, np.nan)
+    fixed = not np.isnan(fix).all()
+    f_min = sequence_values(flow.min, T, 0)
+    f_max = sequence_values(flow.max, T, 1)
+    nonconvex = flow.nonconvex is not None
+    investment = getattr(flow, 'investment', None)
+    nominal_value = flow.nominal_value
+
+    if investment is None:
+        if nominal_value is None:
+            mm.flow_cols[key] = mm.add_variables(T, cost=cost)
+        elif fixed and eliminate_fixed:
+            mm.fixed_flows[key] = nominal_value * fix
+            mm.objective_offset += float(cost @ mm.fixed_flows[key])
+        elif fixed:
+            mm.flow_cols[key] = mm.add_variables(
+                T, lower=nominal_value * fix, upper=nominal_value * fix,
+                cost=cost
+                )
+        elif nonconvex:
+            cols = mm.add_variables(T, upper=nominal_value * f_max, cost=cost)
+            status = mm.add_variables(T, upper=1, integer=True)
+            mm.add_constraints(
+                [(cols, 1), (status, -nominal_value * f_max)], -np.inf, 0
+                )
+            mm.add_constraints(
+                [(cols, 1), (status, -nominal_value * f_min)], 0, np.inf
+                )
+            mm.flow_cols[key] = cols
+            mm.status_cols[key] = status
+        else:
+            mm.flow_cols[key] = mm.add_variables(
+                T, lower=nominal_value * f_min, upper=nominal_value * f_max,
+                cost=cost
+                )
+        return
+
+    if getattr(investment, 'nonconvex', False):
+        raise NotImplementedError(
+            f'Nonconvex investments of flow {key} are not supported by the '
+            + 'matrix backend.'
+            )
+    maximum = first_value(investment.maximum)
+    maximum = np.inf if maximum is None else maximum
+    minimum = first_value(investment.minimum) or 0
+    existing = first_value(investment.existing) or 0
+    invest = mm.add_variables(
+        1, lower=minimum, upper=maximum,
+        cost=first_value(investment.ep_costs) or 0
+        )[0]
+    cols = mm.add_variables(T, cost=cost)
+    mm.flow_cols[key] = cols
+    mm.flow_invest_cols[key] = invest
+
+    if fixed:
+        mm.add_constraints(
+            [(cols, 1), (invest, -fix)], existing * fix, existing * fix
+            )
+    elif nonconvex:
+        if not np.isfinite(maximum):
+            raise ValueError(
+                f'Nonconvex investment flow {key} requires a maximum.'
+                )
+        # Linearized product of status and invest (status_nominal)
+        status = mm.add_variables(T, upper=1, integer=True)
+        status_nominal = mm.add_variables(T)
+        mm.add_constraints(
+            [(status_nominal, 1), (status, -maximum)], -np.inf, 0
+            )
+        mm.add_constraints([(status_nominal, 1), (invest, -1)], -np.inf, 0)
+        mm.add_constraints(
+            [(status_nominal, 1), (invest, -1), (status, -maximum)],
+            -maximum, np.inf
+            )
+        mm.add_constraints(
+            [(cols, 1), (status_nominal, -f_max)], -np.inf, 0
+            )
+        mm.add_constraints(
+            [(cols, 1), (status_nominal, -f_min)], 0, np.inf
+            )
+        mm.status_cols[key] = status
+    else:
+        mm.add_constraints(
+            [(cols, 1), (invest, -f_max)], -np.inf, existing * f_max
+            )
+        if f_min.any():
+            mm.add_constraints(
+                [(cols, 1), (invest, -f_min)], existing * f_min, np.inf
+                )
+
+
+def add_bus(mm, bus, T):
+    """Balance of all inflows and outflows of a bus."""
+    terms, constant = mm.flow_terms(
+        [((i.label, bus.label), 1) for i in bus.inputs]
+        + [((bus.label, o.label), -1) for o in bus.outputs]
+        )
+    if terms:
+        mm.bus_rows[bus.label] = mm.add_constraints(
+            terms, -constant, -constant
+            )
+
+
+def add_converter(mm, converter, T):
+    """Relate each input to each output by their conversion factors."""
+    factors = {
+        node: sequence_values(factor, T, 1)
+        for node, factor in converter.conversion_factors.items()
+        }
+    for i in converter.inputs:
+        for o in converter.outputs:
+            terms, constant = mm.flow_terms([
+                ((i.label, converter.label), factors.get(o, 1)),
+                ((converter.label, o.label), -factors.get(i, 1))
+                ])
+            if terms:
+                mm.add_constraints(terms, -constant, -constant)
+
+
+def add_storage(mm, storage, T, timeincrement):
+    """Storage content, its balance and the storage investment."""
+    inflow = mm.flow_cols[(list(storage.inputs)[0].label, storage.label)]
+    outflow = mm.flow_cols[(storage.label, list(storage.outputs)[0].label)]
+    loss_rate = sequence_values(storage.loss_rate, T, 0)
+    eta_in = sequence_values(storage.inflow_conversion_factor, T, 1)
+    eta_out = sequence_values(storage.outflow_conversion_factor, T, 1)
+    losses_rel = sequence_values(storage.fixed_losses_relative, T, 0)
+    losses_abs = sequence_values(storage.fixed_losses_absolute, T, 0)
+    level_max = sequence_values(storage.max_storage_level, T + 1, 1)
+    level_min = sequence_values(storage.min_storage_level, T + 1, 0)
+    initial_level = storage.initial_storage_level
+    investment = getattr(storage, 'investment', None)
+
+    if investment is None:
+        capacity = storage.nominal_storage_capacity
+        content = mm.add_variables(
+            T + 1, lower=capacity * level_min, upper=capacity * level_max
+            )
+        if initial_level is not None:
+            mm.fix(content[0], initial_level * capacity)
+        invest_terms = []
+        losses = losses_rel * capacity
+    else:
+        existing = first_value(investment.existing) or 0
+        maximum = first_value(investment.maximum)
+        invest = mm.add_variables(
+            1, lower=first_value(investment.minimum) or 0,
+            upper=np.inf if maximum is None else maximum,
+            cost=first_value(investment.ep_costs) or 0
+            )[0]
+        content = mm.add_variables(T + 1)
+        mm.add_constraints(
+            [(content, 1), (invest, -level_max)], -np.inf,
+            existing * level_max
+            )
+        if level_min.any():
+            mm.add_constraints(
+                [(content, 1), (invest, -level_min)], existing * level_min,
+                np.inf
+                )
+        if initial_level is not None:
+            mm.add_constraints(
+                [(content[0], 1), (invest, -initial_level)],
+                initial_level * existing, initial_level * existing
+                )
+        for flow_key, relation in [
+                ((list(storage.inputs)[0].label, storage.label),
+                 storage.invest_relation_input_capacity),
+                ((storage.label, list(storage.outputs)[0].label),
+                 storage.invest_relation_output_capacity)]:
+            if relation is not None and flow_key in mm.flow_invest_cols:
+                mm.add_constraints(
+                    [(mm.flow_invest_cols[flow_key], 1), (invest, -relation)],
+                    relation * existing, relation * existing
+                    )
+        invest_terms = [(invest, losses_rel * timeincrement)]
+        losses = losses_rel * existing
+        mm.storage_invest_cols[storage.label] = invest
+
+    mm.add_constraints(
+        [
+            (content[1:], 1),
+            (content[:-1], -(1 - loss_rate) ** timeincrement),
+            (inflow, -eta_in * timeincrement),
+            (outflow, timeincrement / eta_out)
+            ] + invest_terms,
+        -(losses + losses_abs) * timeincrement,
+        -(losses + losses_abs) * timeincrement
+        )
+    if storage.balanced:
+        mm.add_constraints([(content[-1], 1), (content[0], -1)], 0, 0)
+
+    mm.content_cols[storage.label] = content
@@ -1,18 +1,54 @@
+import logging
 import os
+import warnings
+from copy import deepcopy
 
+import numpy as np
 import oemof.solph as solph
 import pandas as pd
+import pyomo.environ as po
 from oemof.solph import views
 from pyomo.contrib import appsi
+from pyomo.opt import TerminationCondition
+
+from aggregation import TimeSeriesAggregation
+from decomposition import benders
+from economics import LCOH, Economics
+from instrumentation import (
+    RunProfile, instrumented, model_size, write_run_record
+    )
+from labels import compile_label_map, relabel
+from matrix_backend import build_matrix_model
+from offload import export_model, import_solution
+from presolve import (
+    CHP_INTERNAL_MAX, identical_unit_groups, tighten_bounds, unit_signature
+    )
+from racing import race
+from result_cache import cache_key
+from solutions import WarmStartStore, load_solution_values
+from workspace import Workspace
+
+NOMINAL_PARAMS = {'tes': 'Q_N', 'sol': 'A_N'}
+
+# Parameters that can be changed without building a new model
+UPDATABLE_SERIES = ['gas_price', 'co2_price', 'el_spot_price', 'ef_om',
+                    'heat_demand']
+UPDATABLE_UNIT_PARAMS = ['op_cost_var', 'op_cost_fix', 'inv_spez', 'cap_max',
+                         'cap_min', 'Q_max', 'Q_min', 'A_max', 'A_min']
+STRUCTURAL_PARAMS = ['Solver', 'aggregation', 'rolling_horizon',
+                     'solve_strategy', 'backend']
+
+logger = logging.getLogger(__name__)
 
 
 class EnergySystem():
     """Model class that builds the energy system from parameters."""
 
-    def __init__(self, data, param_units, param_opt):
+    def __init__(self, data, param_units, param_opt, workspace=None):
         self.data = data
         self.param_units = param_units
         self.param_opt = param_opt
+        self.cache_key = cache_key(data, param_units, param_opt)
 
         self.tes_used = any(
             [u.rstrip('0123456789') == 'tes' for u in self.param_units.keys()]
@@ -28,10 +64,44 @@ class EnergySystem():
                 ])
             )
 
-        self.periods = len(data.index)
+        # Optional clustering of the input data into typical periods
+        self.tsa = None
+        self.storage_links = {}
+        self.rolling_results = None
+        self.two_stage_report = None
+        self.race_report = None
+        self.decomposition_report = None
+        aggregation = self.param_opt.get('aggregation')
+        if aggregation:
+            self.tsa = TimeSeriesAggregation(
+                data, aggregation['n_typical'],
+                period=aggregation.get('period', 'day'),
+                peak_columns=(
+                    ['heat_demand'] if aggregation.get('peaks', True) else []
+                    )
+                )
+            self.data_full = data
+            self.data = self.tsa.typical_data
+            self.aggregation_error = self.tsa.error_report()
+
+        # Presolve: tighten the capacity bounds (and big-Ms) from the data
+        self.input_units = param_units
+        self.chp_el_max = CHP_INTERNAL_MAX
+        self.presolve_report = []
+        if self.param_opt.get('tighten_bounds', True):
+            self.param_units, self.chp_el_max, self.presolve_report = (
+                tighten_bounds(data, self.param_units)
+                )
+        self.prune = self.param_opt.get('prune_model', True)
+        self.pruning_report = {}
+        self.symmetry_groups = []
+        if self.param_opt.get('symmetry_breaking', True):
+            self.symmetry_groups = identical_unit_groups(self.param_units)
+
+        self.periods = len(self.data.index)
         self.es = solph.EnergySystem(
             timeindex=pd.date_range(
-                data.index[0], periods=self.periods, freq='h'
+                self.data.index[0], periods=self.periods, freq='h'
                 ),
             infer_last_interval=True
             )
@@ -43,23 +113,95 @@ class EnergySystem():
 
         self.buses = {}
         self.comps = {}
-
+        self.solver = None
+        self.mip_gap = None
+        self.solved_optimal = None
+        self.matrix_model = None
+        self.workspace = workspace
+        self.logpath = None
+        self.progress = None
+        self.profile = RunProfile()
+
+    def weighted(self, cost):
+        """Weight variable cost with the time steps a typical step represents."""
+        if self.tsa is None:
+            return cost
+        return cost * self.tsa.weights
+
+    def report_pruning(self, pruning_pass, elements):
+        """Record the elements removed or simplified by a pruning pass."""
+        if self.prune and elements:
+            self.pruning_report.setdefault(pruning_pass, []).extend(elements)
+
+    @instrumented('generate_buses')
     def generate_buses(self):
         self.buses['gnw'] = solph.Bus(label='gas network')
         self.buses['enw'] = solph.Bus(label='electricity network')
         self.buses['hnw'] = solph.Bus(label='heat network')
-        self.buses['chp_node'] = solph.Bus(label='chp node')
+        if self.chp_used or not self.prune:
+            self.buses['chp_node'] = solph.Bus(label='chp node')
+        else:
+            self.report_pruning('unused_nodes', ['chp node'])
 
         self.es.add(*list(self.buses.values()))
 
+    def nonconvex(self, unit, unit_params):
+        """NonConvex of a unit's flow or None if its minimum load is zero."""
+        if self.prune and unit_params['Q_rel_min'] == 0:
+            self.report_pruning('convex_flows', [unit])
+            return None
+        return solph.NonConvex()
+
+    def calc_variable_costs(self):
+        """Variable cost of all flows keyed by the labels of their nodes."""
+        costs = {
+            ('gas source', 'gas network'): (
+                self.data['gas_price']
+                + (self.data['co2_price'] * self.param_opt['ef_gas'])
+                ),
+            ('electricity source', 'electricity network'): (
+                self.param_opt['elec_consumer_charges_grid']
+                - self.param_opt['elec_consumer_charges_self']
+                + self.data['el_spot_price']
+                ),
+            ('heat network', 'heat demand'): -self.param_opt['heat_price'],
+            ('chp node', 'spotmarket'): (
+                -self.data['el_spot_price'] - self.param_opt['vNNE']
+                )
+            }
+
+        for unit, unit_params in self.param_units.items():
+            unit_cat = unit.rstrip('0123456789')
+            if unit_cat in ['sol', 'exhs']:
+                costs[(unit, 'heat network')] = unit_params['op_cost_var']
+            elif unit_cat in ['ccet', 'ice']:
+                costs[(unit, 'chp node')] = unit_params['op_cost_var']
+            elif unit_cat in ['hp', 'eb']:
+                costs[(unit, 'heat network')] = (
+                    unit_params['op_cost_var']
+                    + self.param_opt['elec_consumer_charges_self']
+                    )
+            elif unit_cat == 'plb':
+                costs[(unit, 'heat network')] = (
+                    unit_params['op_cost_var']
+                    + self.param_opt['energy_tax']
+                    )
+            elif unit_cat == 'tes':
+                costs[('heat network', unit)] = unit_params['op_cost_var']
+                costs[(unit, 'heat network')] = unit_params['op_cost_var']
+
+        return costs
+
+    @instrumented('generate_sources')
     def generate_sources(self):
+        costs = self.calc_variable_costs()
+
         self.comps['gas_source'] = solph.components.Source(
             label='gas source',
             outputs={
                 self.buses['gnw']: solph.flows.Flow(
-                    variable_costs=(
-                        self.data['gas_price']
-                        + (self.data['co2_price'] * self.param_opt['ef_gas'])
+                    variable_costs=self.weighted(
+                        costs[('gas source', 'gas network')]
                         )
                     )
                 }
@@ -69,10 +211,8 @@ class EnergySystem():
             label='electricity source',
             outputs={
                 self.buses['enw']: solph.flows.Flow(
-                    variable_costs=(
-                        self.param_opt['elec_consumer_charges_grid']
-                        - self.param_opt['elec_consumer_charges_self']
-                        + self.data['el_spot_price']
+                    variable_costs=self.weighted(
+                        costs[('electricity source', 'electricity network')]
                         )
                     )
                 }
@@ -97,7 +237,9 @@ class EnergySystem():
                     label=unit,
                     outputs={
                         self.buses['hnw']: solph.flows.Flow(
-                            variable_costs=unit_params['op_cost_var'],
+                            variable_costs=self.weighted(
+                                costs[(unit, 'heat network')]
+                                ),
                             nominal_value=nominal_value,
                             fix=self.data['solar_heat_flow']
                             )
@@ -105,6 +247,10 @@ class EnergySystem():
                     )
 
                 self.es.add(self.comps[unit])
+                if not unit_params['invest_mode']:
+                    self.report_pruning(
+                        'fixed_flows', [f'{unit} -> heat network']
+                        )
 
             if unit_cat == 'exhs':
                 if unit_params['fix']:
@@ -125,7 +271,9 @@ class EnergySystem():
                     label=unit,
                     outputs={
                         self.buses['hnw']: solph.flows.Flow(
-                            variable_costs=unit_params['op_cost_var'],
+                            variable_costs=self.weighted(
+                                costs[(unit, 'heat network')]
+                                ),
                             nominal_value=nominal_value,
                             fix=fix
                             )
@@ -133,33 +281,52 @@ class EnergySystem():
                     )
 
                 self.es.add(self.comps[unit])
+                if fix is not None and not unit_params['invest_mode']:
+                    self.report_pruning(
+                        'fixed_flows', [f'{unit} -> heat network']
+                        )
 
+    @instrumented('generate_sinks')
     def generate_sinks(self):
+        costs = self.calc_variable_costs()
+
         self.comps['heat_sink'] = solph.components.Sink(
             label='heat demand',
             inputs={
                 self.buses['hnw']: solph.flows.Flow(
-                    variable_costs=-self.param_opt['heat_price'],
+                    variable_costs=self.weighted(
+                        costs[('heat network', 'heat demand')]
+                        ),
                     nominal_value=self.data['heat_demand'].max(),
                     fix=self.data['heat_demand']/self.data['heat_demand'].max()
                     )
                 }
             )
 
+        self.es.add(self.comps['heat_sink'])
+        self.report_pruning('fixed_flows', ['heat network -> heat demand'])
+
+        if 'chp_node' not in self.buses:
+            self.report_pruning('unused_nodes', ['spotmarket'])
+            return
+
         self.comps['elec_sink'] = solph.components.Sink(
             label='spotmarket',
             inputs={
                 self.buses['chp_node']: solph.flows.Flow(
-                    variable_costs=(
-                        -self.data['el_spot_price'] - self.param_opt['vNNE']
+                    variable_costs=self.weighted(
+                        costs[('chp node', 'spotmarket')]
                         )
                     )
                 }
             )
 
-        self.es.add(self.comps['heat_sink'], self.comps['elec_sink'])
+        self.es.add(self.comps['elec_sink'])
 
+    @instrumented('generate_components')
     def generate_components(self):
+        costs = self.calc_variable_costs()
+
         internal_el = False
         for unit, unit_params in self.param_units.items():
             unit_cat = unit.rstrip('0123456789')
@@ -179,13 +346,15 @@ class EnergySystem():
                     inputs={self.buses['gnw']: solph.flows.Flow()},
                     outputs={
                         self.buses['chp_node']: solph.flows.Flow(
-                            variable_costs=unit_params['op_cost_var']
+                            variable_costs=self.weighted(
+                                costs[(unit, 'chp node')]
+                                )
                             ),
                         self.buses['hnw']: solph.flows.Flow(
                             nominal_value=nominal_value,
                             max=unit_params['Q_rel_max'],
                             min=unit_params['Q_rel_min'],
-                            nonconvex=solph.NonConvex()
+                            nonconvex=self.nonconvex(unit, unit_params)
                             )
                         },
                     conversion_factors={
@@ -201,24 +370,12 @@ class EnergySystem():
                 if unit_cat == 'hp':
                     eff = 'cop'
                     input_nw = 'enw'
-                    var_cost = (
-                        unit_params['op_cost_var']
-                        + self.param_opt['elec_consumer_charges_self']
-                        )
                 elif unit_cat == 'plb':
                     eff = 'eta'
                     input_nw = 'gnw'
-                    var_cost = (
-                        unit_params['op_cost_var']
-                        + self.param_opt['energy_tax']
-                        )
                 elif unit_cat == 'eb':
                     eff = 'eta'
                     input_nw = 'enw'
-                    var_cost = (
-                        unit_params['op_cost_var']
-                        + self.param_opt['elec_consumer_charges_self']
-                        )
 
                 if unit_params['invest_mode']:
                     nominal_value = solph.Investment(
@@ -237,8 +394,10 @@ class EnergySystem():
                             nominal_value=nominal_value,
                             max=unit_params['Q_rel_max'],
                             min=unit_params['Q_rel_min'],
-                            nonconvex=solph.NonConvex(),
-                            variable_costs=var_cost
+                            nonconvex=self.nonconvex(unit, unit_params),
+                            variable_costs=self.weighted(
+                                costs[(unit, 'heat network')]
+                                )
                             )
                         },
                     conversion_factors={
@@ -257,18 +416,23 @@ class EnergySystem():
                         )
                 else:
                     nominal_storage_capacity = unit_params['Q_N']
+                level_min, level_max = self.storage_levels(unit_params)
 
                 self.comps[unit] = solph.components.GenericStorage(
                     label=unit,
                     nominal_storage_capacity=nominal_storage_capacity,
                     inputs={
                         self.buses['hnw']: solph.flows.Flow(
-                            variable_costs=unit_params['op_cost_var']
+                            variable_costs=self.weighted(
+                                costs[('heat network', unit)]
+                                )
                             )
                         },
                     outputs={
                         self.buses['hnw']: solph.flows.Flow(
-                            variable_costs=unit_params['op_cost_var']
+                            variable_costs=self.weighted(
+                                costs[(unit, 'heat network')]
+                                )
                             )
                         },
                     invest_relation_input_capacity=(
@@ -277,9 +441,16 @@ class EnergySystem():
                     invest_relation_output_capacity=(
                         unit_params['Q_out_to_cap']
                         ),
-                    initial_storage_level=unit_params['init_storage'],
                     loss_rate=unit_params['Q_rel_loss'],
-                    balanced=unit_params['balanced']
+                    min_storage_level=level_min,
+                    max_storage_level=level_max,
+                    # With typical periods, the initial level and the balance
+                    # are set by the inter-period storage states
+                    initial_storage_level=(
+                        unit_params['init_storage']
+                        if self.tsa is None else None
+                        ),
+                    balanced=unit_params['balanced'] and self.tsa is None
                     )
 
                 self.es.add(self.comps[unit])
@@ -289,7 +460,7 @@ class EnergySystem():
                 label='chp internal',
                 inputs={self.buses['chp_node']: solph.flows.Flow()},
                 outputs={self.buses['enw']: solph.flows.Flow(
-                    nominal_value=9999,
+                    nominal_value=self.chp_el_max,
                     max=1.0,
                     min=0.0
                     )},
@@ -298,22 +469,416 @@ class EnergySystem():
 
             self.es.add(self.comps['chp_internal'])
 
-    def solve_model(self):
+    @instrumented('build_model')
+    def build_model(self):
         self.model = solph.Model(self.es)
 
-        solverlogspath = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), 'solverlogs')
+        # Keep the coefficients the model is built with for in place updates
+        self.built_costs = {
+            key: self.cost_array(cost)
+            for key, cost in self.calc_variable_costs().items()
+            }
+        self.built_invest_costs = self.invest_costs()
+        self.built_invest_max = {
+            unit: unit_params.get('cap_max')
+            for unit, unit_params in self.param_units.items()
+            }
+
+        if self.tsa is not None:
+            self.link_storage_periods()
+        if self.symmetry_groups:
+            self.break_symmetry()
+
+    def storage_levels(self, unit_params):
+        """Relative bounds of the storage content over the time points.
+
+        The optional parameter 'final_storage' fixes the relative content at
+        the last time point, e.g. in the last window of a rolling horizon.
+        """
+        final_storage = unit_params.get('final_storage')
+        if final_storage is None:
+            return 0, 1
+        return (
+            [0] * self.periods + [final_storage],
+            [1] * self.periods + [final_storage]
+            )
+
+    def link_storage_periods(self):
+        """Link the storage states of typical periods over the full horizon.
+
+        The storage content of the original periods is the superposition of
+        an inter-period state and the intra-period trajectory of the assigned
+        typical period (Kotzur et al. 2018). Within a period, the storage
+        loss decays the difference between the inter-period state and the
+        content at the start of the typical period, so that the content at
+        time point t of period p is
+
+            (soc[p] - content[start]) * (1 - loss)**t + content[start + t].
+
+        The bounds of the storage content are enforced on the envelope of
+        each intra-period trajectory at both ends of the decay.
+        """
+        L = self.tsa.period_length
+        nr_periods = len(self.tsa.order)
+
+        for unit, unit_params in self.param_units.items():
+            if unit.rstrip('0123456789') != 'tes':
+                continue
+
+            storage = self.comps[unit]
+            if unit_params['invest_mode']:
+                # The content of investment storages is indexed by the end of
+                # each time step, the content before the first time step is
+                # the variable init_content. It is only bounded by the
+                # capacity, as the storage has no initial storage level.
+                block = self.model.GenericInvestmentStorageBlock
+                capacity = block.total[storage, 0]
+                content = [block.init_content[storage]] + [
+                    block.storage_content[storage, t]
+                    for t in range(self.tsa.n_typical * L)
+                    ]
+            else:
+                block = self.model.GenericStorageBlock
+                capacity = unit_params['Q_N']
+                content = [
+                    block.storage_content[storage, t]
+                    for t in range(self.tsa.n_typical * L + 1)
+                    ]
+
+            link = po.Block()
+            self.model.add_component(f'{unit}_period_link', link)
+            link.soc = po.Var(
+                range(nr_periods + 1), within=po.NonNegativeReals
+                )
+            link.content_max = po.Var(range(self.tsa.n_typical))
+            link.content_min = po.Var(range(self.tsa.n_typical))
+
+            link.envelope = po.ConstraintList()
+            for k in range(self.tsa.n_typical):
+                for t in range(k*L, (k+1)*L + 1):
+                    link.envelope.add(link.content_max[k] >= content[t])
+                    link.envelope.add(link.content_min[k] <= content[t])
+
+            decay = (1 - unit_params['Q_rel_loss'])**L
+            link.transition = po.ConstraintList()
+            link.bounds = po.ConstraintList()
+            for p, k in enumerate(self.tsa.order):
+                start = content[k*L]
+                link.transition.add(
+                    link.soc[p+1]
+                    == (link.soc[p] - start) * decay + content[(k+1)*L]
+                    )
+                for factor in [1, decay]:
+                    delta = (link.soc[p] - start) * factor
+                    link.bounds.add(delta + link.content_max[k] <= capacity)
+                    link.bounds.add(delta + link.content_min[k] >= 0)
+
+            if unit_params['balanced']:
+                link.cycle = po.Constraint(
+                    expr=link.soc[nr_periods] == link.soc[0]
+                    )
+            if unit_params['init_storage'] is not None:
+                link.initial = po.Constraint(
+                    expr=link.soc[0] == unit_params['init_storage'] * capacity
+                    )
+
+            self.storage_links[unit] = (link, content)
+
+    def symmetric_pairs(self):
+        """Consecutive pairs of identical units and their invest mode."""
+        return [
+            (first, second, self.param_units[first]['invest_mode'])
+            for group in self.symmetry_groups
+            for first, second in zip(group[:-1], group[1:])
+            ]
+
+    def break_symmetry(self):
+        """Order identical units to cut off their permutations.
+
+        Identical units in invest mode are ordered by their capacity. In
+        dispatch mode, the units have no state linking the time steps, so
+        they are ordered by status and heat output in every time step.
+        """
+        flows = self.flow_variables()
+        status = self.status_variables()
+        invest = self.invest_variables()
+
+        self.model.symmetry_breaking = po.ConstraintList()
+        for first, second, invest_mode in self.symmetric_pairs():
+            if invest_mode:
+                self.model.symmetry_breaking.add(
+                    invest[first] >= invest[second]
+                    )
+                continue
+            key_first = (first, 'heat network')
+            key_second = (second, 'heat network')
+            for t in range(self.periods):
+                # Pruned units without minimum load have no status
+                if key_first in status:
+                    self.model.symmetry_breaking.add(
+                        status[key_first][t] >= status[key_second][t]
+                        )
+                self.model.symmetry_breaking.add(
+                    flows[key_first][t] >= flows[key_second][t]
+                    )
+
+    @instrumented('solve_model')
+    def solve_model(self):
+        rolling_horizon = self.param_opt.get('rolling_horizon')
+        dispatch_only = not any(
+            unit_params['invest_mode']
+            for unit_params in self.param_units.values()
+            )
+        if rolling_horizon and dispatch_only and self.tsa is None:
+            self.solve_rolling_horizon(**rolling_horizon)
+            return
+
+        two_stage = self.param_opt.get('solve_strategy') == 'two_stage'
+        if two_stage and not dispatch_only:
+            self.solve_two_stage()
+            return
+
+        decomposition = (
+            self.param_opt.get('solve_strategy') == 'decomposition'
+            )
+        if decomposition and not dispatch_only:
+            self.solve_decomposition()
+            return
+
+        if self.param_opt.get('solve_strategy') == 'race':
+            self.build_model()
+            self.race_report = race(self)
+            return
+
+        if self.param_opt.get('backend') == 'matrix':
+            if self.tsa is None:
+                self.build_matrix_model()
+                self.run_matrix_solver()
+                return
+            warnings.warn(
+                'The matrix backend does not support typical periods. The '
+                + 'pyomo model is built instead.'
+                )
+
+        self.build_model()
+        self.run_solver(self.model)
+
+    def solve_two_stage(self):
+        """Solve the investment relaxed, then the dispatch with fixed capacities.
+
+        In the first stage, the binary status variables are relaxed and the
+        resulting linear program is solved. Only if it is solved to
+        optimality on the full time series, i.e. without aggregation and not
+        stopped by the time limit, its objective is a lower bound of the full
+        MILP. Otherwise it is reported as relaxed objective only. In the
+        second stage, the optimized capacities are fixed (optionally rounded
+        up to multiples of `param_opt['two_stage_rounding']`) and the unit
+        commitment is solved as MILP. As this is a feasible solution of the
+        full problem, its objective incl. the annualized investment is an
+        upper bound.
+        """
+        self.build_model()
+        po.TransformationFactory('core.relax_integer_vars').apply_to(
+            self.model
             )
-        if not os.path.exists(solverlogspath):
-            os.mkdir(solverlogspath)
+        self.run_solver(self.model, warm_start=False)
+        relaxed_objective = po.value(self.model.objective)
+        is_bound = self.solved_optimal and self.tsa is None
+        self.get_results()
 
-        logpath = os.path.abspath(
-            os.path.join(
-                solverlogspath, f'{self.param_opt["Solver"].lower()}_log.txt'
+        resolution = self.param_opt.get('two_stage_rounding', 0)
+        data_caps = self.data_caps.copy()
+        data_caps[data_caps.abs() < 1e-6] = 0
+        if resolution:
+            data_caps = np.ceil(data_caps / resolution) * resolution
+
+        upper_bound = self.solve_fixed_dispatch(data_caps, 'stage2')
+        self.two_stage_report = {
+            'relaxed_objective': relaxed_objective,
+            'lower_bound': relaxed_objective if is_bound else None,
+            'upper_bound': upper_bound,
+            'gap': (
+                (upper_bound - relaxed_objective) / abs(upper_bound)
+                if is_bound else None
                 )
+            }
+
+    def solve_decomposition(self):
+        """Optimize the capacities by decomposition, then the dispatch.
+
+        The capacities are optimized by Benders decomposition into monthly
+        or seasonal subproblems (see `decomposition.benders`) with the
+        settings of `param_opt['decomposition']`. Afterwards, they are fixed
+        and the dispatch of the full horizon is solved as MILP.
+        """
+        settings = self.param_opt.get('decomposition') or {}
+        caps, self.decomposition_report = benders(self, **settings)
+
+        data_caps = pd.DataFrame({
+            f'cap_{unit}': [cap] for unit, cap in caps.items()
+            })
+        # The progress keeps the convergence of the Benders iterations
+        self.decomposition_report['milp_upper_bound'] = (
+            self.solve_fixed_dispatch(data_caps, 'dispatch', progress=False)
+            )
+
+    def solve_fixed_dispatch(self, data_caps, name, progress=True):
+        """Solve the dispatch with fixed capacities and continue with it.
+
+        Returns the objective incl. the annualized investment. As the
+        dispatch is a feasible solution of the full problem, it is an upper
+        bound of the full MILP.
+
+        Parameters
+        ----------
+
+        data_caps : pandas.DataFrame
+            Capacities of the units in invest mode with the layout of
+            `get_results`.
+
+        name : str
+            Name of the sub-run in the run profile and workspace.
+
+        progress : bool
+            Report the progress of the dispatch solve through the solver
+            progress of this run, if it has one.
+        """
+        data = self.data_full if self.tsa is not None else self.data
+        # The dispatch is solved as a single MILP of the full horizon
+        param_opt = deepcopy(self.param_opt)
+        for key in ['solve_strategy', 'rolling_horizon', 'aggregation',
+                    'decomposition']:
+            param_opt[key] = None
+        dispatch = EnergySystem(
+            data, fix_capacities(self.param_units, data_caps), param_opt,
+            workspace=self.subspace(name)
+            )
+        if progress:
+            dispatch.progress = self.progress
+        dispatch.run_model()
+        self.profile.merge(dispatch.profile, name)
+
+        upper_bound = (
+            dispatch.objective_value() + self.calc_annuity(data_caps)
+            )
+
+        # Continue with the dispatch model in the postprocessing
+        for attr in ['es', 'model', 'matrix_model', 'buses', 'comps', 'data',
+                     'tsa', 'storage_links', 'param_units', 'input_units']:
+            setattr(self, attr, getattr(dispatch, attr))
+
+        return upper_bound
+
+    def solve_rolling_horizon(self, window=168, overlap=48):
+        """Solve the dispatch in consecutive windows with look-ahead.
+
+        Each window is optimized over its own length plus the overlap, but
+        only the first `window` time steps are kept. The storage content at
+        the end of the kept time steps is carried over as initial content of
+        the next window. The status of the units is not carried over, so
+        each window may start them without regard to the previous one.
+
+        Parameters
+        ----------
+
+        window : int
+            Number of time steps kept from each optimization window.
+
+        overlap : int
+            Number of additional look-ahead time steps of each window.
+        """
+        # The windows are not balanced. Instead, the content at the end of
+        # the windows reaching the end of the horizon is set to the content
+        # at the start of the first window.
+        param_units = deepcopy(self.param_units)
+        balanced = []
+        for unit, unit_params in param_units.items():
+            if unit.rstrip('0123456789') == 'tes':
+                if unit_params['balanced']:
+                    balanced.append(unit)
+                unit_params['balanced'] = False
+        start_levels = {}
+
+        param_opt = deepcopy(self.param_opt)
+        param_opt['rolling_horizon'] = None
+        # The solutions of single windows are no useful warm starts
+        param_opt['warm_start'] = False
+
+        self.rolling_results = []
+        start = 0
+        while start < self.periods:
+            stop = min(start + window + overlap, self.periods)
+            keep = min(window, self.periods - start)
+
+            window_units = param_units
+            if stop == self.periods and balanced:
+                window_units = deepcopy(param_units)
+                for unit in balanced:
+                    if start == 0:
+                        window_units[unit]['balanced'] = True
+                    else:
+                        window_units[unit]['final_storage'] = (
+                            start_levels[unit]
+                            )
+
+            horizon = EnergySystem(
+                self.data.iloc[start:stop], window_units, param_opt,
+                workspace=self.subspace(f'horizon_{start}')
+                )
+            horizon.progress = self.progress
+            horizon.run_model()
+            horizon.get_results()
+            self.profile.merge(horizon.profile, 'rolling_horizon')
+
+            if start + keep >= self.periods:
+                # Including the final time point of the storage content
+                self.rolling_results.append(horizon.data_all.iloc[:keep + 1])
+                break
+            self.rolling_results.append(horizon.data_all.iloc[:keep])
+
+            for unit, unit_params in param_units.items():
+                if unit.rstrip('0123456789') != 'tes':
+                    continue
+                content = horizon.data_all[f'storage_content_{unit}']
+                if start == 0:
+                    start_levels[unit] = relative_level(
+                        content.iloc[0], unit_params['Q_N']
+                        )
+                unit_params['init_storage'] = relative_level(
+                    content.iloc[keep], unit_params['Q_N']
+                    )
+
+            start += keep
+
+    @instrumented('run_solver')
+    def run_solver(self, model, warm_start=True):
+        """Solve the model with the solver set in the optimization parameters.
+
+        If `param_opt['warm_start']` is True and `warm_start` is not False,
+        the last solution of the same topology is used as MIP start and the
+        new solution is stored for the next run.
+        """
+        warm_start = warm_start and self.param_opt.get('warm_start', False)
+        start_values = None
+        if warm_start:
+            store = WarmStartStore()
+            start_values = store.load(self.param_units)
+            if start_values:
+                nr_assigned = load_solution_values(model, start_values)
+                logger.info(
+                    'Warm start assigned to %d variables.', nr_assigned
+                    )
+
+        if self.workspace is None:
+            self.workspace = Workspace()
+        logpath = self.workspace.file(
+            f'{self.param_opt["Solver"].lower()}_log.txt'
             )
         if os.path.exists(logpath):
             os.remove(logpath)
+        self.logpath = logpath
+        if self.progress is not None:
+            self.progress.start(logpath, self.param_opt['Solver'])
 
         if self.param_opt['Solver'] == 'Gurobi':
             options = {
@@ -322,89 +887,428 @@ class EnergySystem():
                     }
             if self.param_opt['TimeLimit'] is not None:
                 options.update({'TimeLimit': self.param_opt['TimeLimit']})
-            self.model.solve(
-                solver='gurobi', solve_kwargs={'tee': True},
+            if self.param_opt.get('Threads') is not None:
+                options.update({'Threads': self.param_opt['Threads']})
+            options.update(self.param_opt.get('solver_options') or {})
+            results = model.solve(
+                solver='gurobi',
+                solve_kwargs={'tee': True, 'warmstart': bool(start_values)},
                 cmdline_options=options
                 )
+            self.mip_gap = relative_gap(
+                results.problem.upper_bound, results.problem.lower_bound
+                )
+            self.solved_optimal = (
+                results.solver.termination_condition
+                == TerminationCondition.optimal
+                )
         elif self.param_opt['Solver'] == 'HiGHS':
-            opt = appsi.solvers.Highs()
-            opt.config.mip_gap = self.param_opt['MIPGap']
-            opt.config.logfile = logpath
-            if self.param_opt['TimeLimit'] is not None:
-                opt.config.time_limit = self.param_opt['TimeLimit']
+            opt = self.persistent_solver()
             # opt.config.stream_solver = True
             # opt.highs_options['output_flag'] = True
             # opt.highs_options['log_to_console'] = True
-            opt.solve(self.model)
+            # appsi passes the current variable values to HiGHS as start
+            if 'warmstart' in opt.config:
+                opt.config.warmstart = bool(start_values)
+            elif start_values:
+                logger.warning(
+                    'The installed pyomo cannot pass a warm start to HiGHS.'
+                    )
+            if self.progress is not None:
+                opt.set_instance(model)
+            if self.progress is not None:
+                self.progress.attach_highs(opt)
+            # appsi does not load the incumbent of a solve interrupted
+            # through the progress, so the solution is loaded here
+            opt.config.load_solution = False
+            results = opt.solve(model)
+            opt.load_vars()
+            opt.config.load_solution = True
+            objective = next(
+                model.component_data_objects(po.Objective, active=True)
+                )
+            self.mip_gap = relative_gap(
+                po.value(objective), results.best_objective_bound
+                )
+            self.solved_optimal = (
+                results.termination_condition
+                == appsi.base.TerminationCondition.optimal
+                )
+            self.solver = opt
 
-    def get_results(self):
-        self.results = solph.processing.results(self.model)
-        # breakpoint()
-        # self.meta_results = solph.processing.meta_results(self.model)
+        if warm_start:
+            store.save(self.param_units, model)
 
-        data_gnw = views.node(self.results, 'gas network')['sequences']
-        data_enw = views.node(self.results, 'electricity network')['sequences']
-        data_hnw = views.node(self.results, 'heat network')['sequences']
+    @instrumented('build_model')
+    def build_matrix_model(self):
+        """Assemble the model as sparse matrices instead of with pyomo."""
+        self.matrix_model = build_matrix_model(
+            self.es, self.periods, eliminate_fixed=self.prune
+            )
 
-        if self.chp_used:
-            data_chpnode = views.node(self.results, 'chp node')['sequences']
+        mm = self.matrix_model
+        for first, second, invest_mode in self.symmetric_pairs():
+            key_first = (first, 'heat network')
+            key_second = (second, 'heat network')
+            if invest_mode:
+                pairs = [(mm.flow_invest_cols[key_first],
+                          mm.flow_invest_cols[key_second])]
+            else:
+                pairs = [(mm.flow_cols[key_first], mm.flow_cols[key_second])]
+                if key_first in mm.status_cols:
+                    pairs.append(
+                        (mm.status_cols[key_first], mm.status_cols[key_second])
+                        )
+            for cols_first, cols_second in pairs:
+                mm.add_constraints(
+                    [(cols_first, 1), (cols_second, -1)], 0, np.inf
+                    )
 
-        try:
-            self.data_caps = (
-                views.node(self.results, 'heat network')['scalars']
+    @instrumented('run_solver')
+    def run_matrix_solver(self):
+        """Solve the matrix model through the matrix API of the solver."""
+        if self.workspace is None:
+            self.workspace = Workspace()
+        logpath = self.workspace.file(
+            f'{self.param_opt["Solver"].lower()}_log.txt'
+            )
+        if os.path.exists(logpath):
+            os.remove(logpath)
+        self.logpath = logpath
+        if self.progress is not None:
+            self.progress.start(logpath, self.param_opt['Solver'])
+
+        options = {
+            'mip_gap': self.param_opt['MIPGap'],
+            'time_limit': self.param_opt['TimeLimit'],
+            'threads': self.param_opt.get('Threads'),
+            'logfile': logpath,
+            'options': self.param_opt.get('solver_options')
+            }
+        if self.param_opt['Solver'] == 'Gurobi':
+            self.matrix_model.solve_gurobi(**options)
+        else:
+            self.matrix_model.solve_highs(**options, progress=self.progress)
+
+    def objective_value(self):
+        """Objective value of the solved model."""
+        if self.matrix_model is not None:
+            return self.matrix_model.objective_value
+        # update_objective replaces the objective of solph by a new one
+        objective = next(
+            self.model.component_data_objects(po.Objective, active=True)
+            )
+        return po.value(objective)
+
+    def calc_model_size(self):
+        """Count the size of the built model (cached in the run profile)."""
+        if self.profile.model_size is None:
+            if self.matrix_model is not None:
+                self.profile.model_size = self.matrix_model.size()
+            elif hasattr(self, 'model'):
+                self.profile.model_size = model_size(self.model)
+        return self.profile.model_size
+
+    def subspace(self, name):
+        """Workspace of a sub-run within the workspace of this run."""
+        if self.workspace is None:
+            self.workspace = Workspace()
+        return self.workspace.subspace(name)
+
+    def persistent_solver(self):
+        """Create an appsi solver configured by the optimization parameters."""
+        if self.param_opt['Solver'] == 'Gurobi':
+            opt = appsi.solvers.Gurobi()
+        else:
+            opt = appsi.solvers.Highs()
+        self.configure_solver(opt)
+        return opt
+
+    def configure_solver(self, opt):
+        opt.config.mip_gap = self.param_opt['MIPGap']
+        opt.config.logfile = self.logpath
+        opt.config.time_limit = self.param_opt['TimeLimit']
+        if self.param_opt.get('Threads') is not None:
+            if self.param_opt['Solver'] == 'Gurobi':
+                opt.gurobi_options['Threads'] = self.param_opt['Threads']
+            else:
+                opt.highs_options['threads'] = self.param_opt['Threads']
+        solver_options = self.param_opt.get('solver_options') or {}
+        if self.param_opt['Solver'] == 'Gurobi':
+            opt.gurobi_options.update(solver_options)
+        else:
+            opt.highs_options.update(solver_options)
+
+    def block_variable(self, block_name, var_name):
+        """Variable of a solph block or None if the block has no members.
+
+        oemof.solph adds all its blocks to the model, but blocks without
+        members (e.g. the investment blocks of a dispatch-only system) have
+        no variables.
+        """
+        block = getattr(self.model, block_name, None)
+        return getattr(block, var_name, None)
+
+    def flow_variables(self):
+        """Flow variables of the model keyed by the labels of their nodes."""
+        flows = {}
+        for idx, var in self.model.flow.items():
+            flows.setdefault((idx[0].label, idx[1].label), []).append(var)
+        return flows
+
+    def status_variables(self):
+        """Status variables of the nonconvex flows keyed by node labels."""
+        status = {}
+        for block_name in ['NonConvexFlowBlock', 'InvestNonConvexFlowBlock']:
+            block_status = self.block_variable(block_name, 'status')
+            for idx, var in (block_status or {}).items():
+                status.setdefault(
+                    (idx[0].label, idx[1].label), []
+                    ).append(var)
+        return status
+
+    def invest_variables(self):
+        """Investment variables of the model keyed by unit label."""
+        invest = {}
+        for block_name in ['InvestmentFlowBlock', 'InvestNonConvexFlowBlock']:
+            block_invest = self.block_variable(block_name, 'invest')
+            for idx, var in (block_invest or {}).items():
+                unit = idx[0].label
+                if (unit in self.param_units
+                        and unit.rstrip('0123456789') != 'tes'):
+                    invest[unit] = var
+
+        block_invest = self.block_variable(
+            'GenericInvestmentStorageBlock', 'invest'
+            )
+        for idx, var in (block_invest or {}).items():
+            invest[idx[0].label] = var
+
+        return invest
+
+    def cost_array(self, cost):
+        """Weighted variable cost as array with one value per time step."""
+        return np.broadcast_to(
+            np.asarray(self.weighted(cost), dtype=float), (self.periods,)
+            ).copy()
+
+    def invest_costs(self):
+        """Periodical investment cost of the units in invest mode."""
+        return {
+            unit: unit_params['inv_spez'] / self.bwsf
+            for unit, unit_params in self.param_units.items()
+            if unit_params['invest_mode']
+            }
+
+    def update_parameters(self, data=None, param_opt=None, param_units=None):
+        """Update the parameters of the built model in place.
+
+        Changed variable and investment cost are added to the objective
+        through mutable cost deltas, changed investment bounds are set on the
+        investment variables and a changed heat demand is set on the fixed
+        demand flow. This way, a persistent solver only has to update the
+        changed coefficients and bounds in `resolve`. All other changes require
+        building a new model.
+
+        Parameters
+        ----------
+
+        data : pandas.DataFrame
+            Time series to replace. Has to have the length of the input data.
+
+        param_opt : dict
+            Optimization parameters to update.
+
+        param_units : dict
+            Unit parameters to update keyed by unit label.
+        """
+        if self.matrix_model is not None:
+            raise ValueError(
+                'Models of the matrix backend cannot be updated in place.'
+                )
+        if data is not None:
+            if self.tsa is not None:
+                raise ValueError(
+                    'The time series of an aggregated model cannot be '
+                    + 'updated in place.'
+                    )
+            unsupported = [
+                col for col in data.columns if col not in UPDATABLE_SERIES
+                ]
+            if unsupported:
+                raise ValueError(
+                    f'Time series {unsupported} cannot be updated in place.'
+                    )
+            self.data = self.data.copy()
+            for col in data.columns:
+                self.data[col] = data[col].to_numpy()
+
+        if param_opt is not None:
+            structural = [
+                key for key in param_opt if key in STRUCTURAL_PARAMS
+                ]
+            if structural:
+                raise ValueError(
+                    f'Parameters {structural} require building a new model.'
+                    )
+            self.param_opt = deepcopy(self.param_opt)
+            self.param_opt.update(param_opt)
+            self.bwsf = calc_bwsf(
+                self.param_opt['capital_interest'],
+                self.param_opt['lifetime']
                 )
-        except KeyError:
-            self.data_caps = pd.Series()
 
-        if self.tes_used:
-            data_tes = None
-            for unit, unit_params in self.param_units.items():
-                if unit.rstrip('0123456789') == 'tes':
-                    next_data_tes = views.node(self.results, unit)['sequences']
-                    if unit_params['invest_mode']:
-                        next_cap_tes = (
-                            views.node(
-                                self.results, unit
-                                )['scalars'][((unit, 'None'), 'invest')]
-                            )
-                    else:
-                        next_cap_tes = unit_params['Q_N']
-                    if data_tes is None:
-                        data_tes = next_data_tes
-                    else:
-                        data_tes = pd.concat([data_tes, next_data_tes], axis=1)
-                    self.data_caps = pd.concat([
-                        self.data_caps,
-                        pd.Series(
-                            next_cap_tes, index=[((unit, 'None'), 'invest')]
-                            )
-                        ])
+        if param_units is not None:
+            self.input_units = deepcopy(self.input_units)
+            for unit, unit_params in param_units.items():
+                unsupported = [
+                    key for key in unit_params
+                    if key not in UPDATABLE_UNIT_PARAMS
+                    ]
+                if unsupported:
+                    raise ValueError(
+                        f'Parameters {unsupported} of unit "{unit}" require '
+                        + 'building a new model.'
+                        )
+                self.input_units[unit].update(unit_params)
 
-        # Combine all data and relabel the column names
-        self.data_all = pd.concat([data_gnw, data_enw, data_hnw], axis=1)
-        if self.tes_used:
-            self.data_all = pd.concat([self.data_all, data_tes], axis=1)
-        if self.chp_used:
-            self.data_all = pd.concat([self.data_all, data_chpnode], axis=1)
-        if self.data_all.iloc[-1, :].isna().values.all():
-            self.data_all.drop(self.data_all.tail(1).index, inplace=True)
+        # Identical units are ordered by the symmetry breaking constraints
+        for group in self.symmetry_groups:
+            signatures = {
+                unit_signature(self.input_units[unit]) for unit in group
+                }
+            if len(signatures) > 1:
+                raise ValueError(
+                    f'The units {group} are no longer identical, which '
+                    + 'requires building a new model.'
+                    )
+
+        # Bounds raised by the changes are checked in update_bounds
+        self.param_units = self.input_units
+        if self.param_opt.get('tighten_bounds', True):
+            self.param_units, _, self.presolve_report = tighten_bounds(
+                self.data, self.input_units
+                )
+
+        self.update_objective()
+        self.update_bounds()
+        if data is not None and 'heat_demand' in data.columns:
+            demand = self.flow_variables()[('heat network', 'heat demand')]
+            for var, value in zip(demand, self.data['heat_demand']):
+                var.fix(value)
+
+    def update_objective(self):
+        """Set the cost deltas of the objective to the current parameters."""
+        m = self.model
+        flows = self.flow_variables()
+        invest = self.invest_variables()
+
+        if not hasattr(m, 'cost_delta'):
+            self.delta_flows = [key for key in self.built_costs if key in flows]
+            self.delta_invest = [
+                unit for unit in self.built_invest_costs if unit in invest
+                ]
+            m.cost_delta = po.Param(
+                range(len(self.delta_flows)), range(self.periods),
+                mutable=True, initialize=0
+                )
+            m.invest_cost_delta = po.Param(
+                range(len(self.delta_invest)), mutable=True, initialize=0
+                )
+
+            m.objective.deactivate()
+            m.updated_objective = po.Objective(
+                expr=(
+                    m.objective.expr
+                    + po.quicksum(
+                        m.cost_delta[j, t] * flows[key][t]
+                        for j, key in enumerate(self.delta_flows)
+                        for t in range(self.periods)
+                        )
+                    + po.quicksum(
+                        m.invest_cost_delta[j] * invest[unit]
+                        for j, unit in enumerate(self.delta_invest)
+                        )
+                    ),
+                sense=po.minimize
+                )
 
-        result_labeling(self.data_all)
+        costs = self.calc_variable_costs()
+        for j, key in enumerate(self.delta_flows):
+            delta = self.cost_array(costs[key]) - self.built_costs[key]
+            for t in range(self.periods):
+                m.cost_delta[j, t] = delta[t]
+
+        invest_costs = self.invest_costs()
+        for j, unit in enumerate(self.delta_invest):
+            m.invest_cost_delta[j] = (
+                invest_costs[unit] - self.built_invest_costs[unit]
+                )
+
+    def update_bounds(self):
+        """Set the bounds of the investment variables."""
+        for unit, var in self.invest_variables().items():
+            unit_params = self.param_units[unit]
+            unit_cat = unit.rstrip('0123456789')
+            if unit_cat == 'tes':
+                lower, upper = 'Q_min', 'Q_max'
+            elif unit_cat == 'sol':
+                lower, upper = 'A_min', 'A_max'
+            else:
+                lower, upper = 'cap_min', 'cap_max'
+
+            # The built maximum is used as big-M in the nonconvex constraints
+            if (unit_cat not in ['tes', 'sol', 'exhs']
+                    and unit_params[upper] > self.built_invest_max[unit]):
+                raise ValueError(
+                    f'The maximum capacity of unit "{unit}" cannot be raised '
+                    + 'above the value the model was built with.'
+                    )
+            var.setlb(unit_params[lower])
+            var.setub(unit_params[upper])
+
+    @instrumented('run_solver')
+    def resolve(self):
+        """Solve the model again after `update_parameters`.
+
+        The appsi solver of the previous solve is reused, so that only the
+        changes of the model are passed to the solver.
+        """
+        if self.solver is None:
+            self.solver = self.persistent_solver()
+        else:
+            self.configure_solver(self.solver)
+        self.solver.solve(self.model)
+
+    @instrumented('get_results')
+    def get_results(self):
+        if self.rolling_results is not None:
+            self.stitch_results()
+            return
+
+        if self.matrix_model is not None:
+            self.data_all, self.data_caps = self.label_results(
+                self.matrix_model.flow_values(self.result_nodes()),
+                self.matrix_model.content_values(),
+                self.matrix_model.flow_invest_values(),
+                self.matrix_model.storage_invest_values()
+                )
+        elif self.param_opt.get('fast_results', True):
+            self.data_all, self.data_caps = self.extract_results()
+        else:
+            self.data_all, self.data_caps = self.process_results()
+
+        if self.tsa is not None:
+            self.data_all = self.expand_results(self.data_all)
         self.data_all = self.data_all.loc[
             :, ~self.data_all.columns.duplicated()
             ].copy()
 
-        result_labeling(self.data_caps)
-
         for unit, unit_params in self.param_units.items():
             if f'cap_{unit}' not in self.data_caps.index:
-                unit_cat = unit.rstrip('0123456789')
-                if unit_cat == 'tes':
-                    param_var = 'Q_N'
-                elif unit_cat == 'sol':
-                    param_var = 'A_N'
-                else:
-                    param_var = 'cap_N'
+                param_var = NOMINAL_PARAMS.get(
+                    unit.rstrip('0123456789'), 'cap_N'
+                    )
                 self.data_caps[f'cap_{unit}'] = unit_params[param_var]
 
         for col in self.data_all.columns:
@@ -439,125 +1343,297 @@ class EnergySystem():
         self.cost_df = pd.DataFrame()
         self.key_params = {}
 
-    def calc_econ_params(self):
-        for unit, unit_params in self.param_units.items():
-            unit_cat = unit.rstrip('0123456789')
-
-            unit_E_N = self.data_caps.loc[0, f'cap_{unit}']
-            add_cost = 0
+    def extract_results(self):
+        """Read the results directly from the pyomo variables.
+
+        Only the flows of the buses (and the chp node, if used), the storage
+        contents and the investments are read in one pass over the model's
+        variables. The results are labeled right away and have the same
+        layout as the ones of `process_results`.
+        """
+        nodes = self.result_nodes()
+        flows = {
+            (i, o): [v.value for v in variables]
+            for (i, o), variables in self.flow_variables().items()
+            if i in nodes or o in nodes
+            }
+
+        contents = {}
+        # The content of investment storages is indexed by the end of each
+        # time step. Their initial content is prepended, so that the content
+        # refers to the time points as for the other storages.
+        init_content = self.block_variable(
+            'GenericInvestmentStorageBlock', 'init_content'
+            )
+        for idx, var in (init_content or {}).items():
+            contents[idx.label] = [var.value]
+        for block_name in ['GenericStorageBlock',
+                           'GenericInvestmentStorageBlock']:
+            content = self.block_variable(block_name, 'storage_content')
+            for idx, var in (content or {}).items():
+                contents.setdefault(idx[0].label, []).append(var.value)
+
+        storage_invest = {}
+        invest = self.block_variable('GenericInvestmentStorageBlock', 'invest')
+        for idx, var in (invest or {}).items():
+            storage_invest[idx[0].label] = var.value
+
+        flow_invest = {}
+        for block_name in ['InvestmentFlowBlock', 'InvestNonConvexFlowBlock']:
+            invest = self.block_variable(block_name, 'invest')
+            for idx, var in (invest or {}).items():
+                flow_invest[(idx[0].label, idx[1].label)] = var.value
+
+        return self.label_results(
+            flows, contents, flow_invest, storage_invest
+            )
 
-            if unit_cat == 'plb':
-                add_cost = self.param_opt['energy_tax']
-                E_N_label = f'Q_{unit}'
-            elif unit_cat == 'hp':
-                E_N_label = f'Q_out_{unit}'
-            elif unit_cat == 'tes':
-                E_N_label = f'Q_in_{unit}'
-            elif unit_cat in ['ccet', 'ice']:
-                E_N_label = f'P_{unit}'
-                unit_E_N = (
-                    unit_E_N / unit_params['eta_th']
-                    * unit_params['eta_el']
-                    )
+    def result_nodes(self):
+        """Labels of the nodes whose flows are part of the results."""
+        nodes = ['gas network', 'electricity network', 'heat network']
+        if self.chp_used:
+            nodes.append('chp node')
+        nodes += [
+            unit for unit in self.param_units
+            if unit.rstrip('0123456789') == 'tes'
+            ]
+        return nodes
+
+    def label_results(self, flows, contents, flow_invest, storage_invest):
+        """Label raw result values with the layout of `process_results`.
+
+        Parameters
+        ----------
+
+        flows : dict
+            Values of the flows of the result nodes keyed by the labels of
+            their nodes.
+
+        contents : dict
+            Storage content of all time points keyed by storage label.
+
+        flow_invest : dict
+            Investment of the investment flows keyed by their node labels.
+
+        storage_invest : dict
+            Investment of the storages in invest mode keyed by their labels.
+        """
+        index = self.es.timeindex
+        label_map = self.label_map()
+
+        columns = {}
+        for key, values in flows.items():
+            label = label_map.get((key, 'flow'))
+            if label is None or label in columns:
+                continue
+            column = np.full(len(index), np.nan)
+            column[:len(values)] = values
+            columns[label] = column
+
+        data_caps = {}
+        for unit, values in contents.items():
+            column = np.full(len(index), np.nan)
+            column[:len(values)] = values[:len(index)]
+            columns[f'storage_content_{unit}'] = column
+            if unit in storage_invest:
+                data_caps[f'cap_{unit}'] = storage_invest[unit]
             else:
-                E_N_label = f'Q_{unit}'
+                data_caps[f'cap_{unit}'] = self.param_units[unit]['Q_N']
 
-            self.cost_df = calc_cost(
-                unit, unit_E_N, self.param_units, self.data_all[E_N_label],
-                self.cost_df, add_var_cost=add_cost
-                )
+        for key, value in flow_invest.items():
+            if 'heat network' in key:
+                data_caps[label_map[(key, 'invest')]] = value
 
-        # %% Primary energy and total cost calculation
-        # total unit costs
-        self.key_params['op_cost_total'] = self.cost_df.loc['op_cost'].sum()
-        self.key_params['invest_total'] = self.cost_df.loc['invest'].sum()
+        data_all = pd.DataFrame(columns, index=index)
+        if data_all.iloc[-1, :].isna().values.all():
+            data_all.drop(data_all.tail(1).index, inplace=True)
 
-        # total gas costs
-        if 'H_source' in self.data_all.columns:
-            self.key_params['cost_gas'] = (
-                self.data_all['H_source'] * (
-                    self.data['gas_price']
-                    + self.data['co2_price'] * self.param_opt['ef_gas']
-                    )
-                ).sum()
-        else:
-            self.key_params['cost_gas'] = 0
+        return data_all, pd.Series(data_caps, dtype=float)
 
-        # total electricity costs
-        if 'P_source' in self.data_all.columns:
-            self.key_params['cost_el_grid'] = (
-                self.data_all['P_source'] * (
-                    self.data['el_spot_price']
-                    + self.param_opt['elec_consumer_charges_grid']
-                    )
-                ).sum()
-        else:
-            self.key_params['cost_el_grid'] = 0
+    def label_map(self):
+        """Compiled result label map of the energy system's topology."""
+        return compile_label_map(
+            frozenset(node.label for node in self.es.nodes)
+            )
 
+    def process_results(self):
+        """Read the results through oemof.solph's result processing."""
+        self.results = solph.processing.results(self.model)
+        # breakpoint()
+        # self.meta_results = solph.processing.meta_results(self.model)
 
-        if 'P_internal' in self.data_all.columns:
-            self.key_params['cost_el_internal'] = (
-                self.data_all['P_internal']
-                * self.param_opt['elec_consumer_charges_self']
-                ).sum()
-        else:
-            self.key_params['cost_el_internal'] = 0
+        data_gnw = views.node(self.results, 'gas network')['sequences']
+        data_enw = views.node(self.results, 'electricity network')['sequences']
+        data_hnw = views.node(self.results, 'heat network')['sequences']
 
-        self.key_params['cost_el'] = (
-            self.key_params['cost_el_grid']
-            + self.key_params['cost_el_internal']
-            )
+        if self.chp_used:
+            data_chpnode = views.node(self.results, 'chp node')['sequences']
 
-        self.key_params['cost_total'] = (
-            self.key_params['op_cost_total'] + self.key_params['cost_gas']
-            + self.key_params['cost_el']
-            )
+        try:
+            data_caps = (
+                views.node(self.results, 'heat network')['scalars']
+                )
+        except KeyError:
+            data_caps = pd.Series()
 
-        # %% Revenue calculation
-        if 'P_internal' in self.data_all.columns:
-            self.key_params['revenues_spotmarket'] = (
-                self.data_all['P_spotmarket'] * (
-                    self.data['el_spot_price'] + self.param_opt['vNNE']
-                    )
-                ).sum()
-        else:
-            self.key_params['revenues_spotmarket'] = 0
+        if self.tes_used:
+            data_tes = None
+            for unit, unit_params in self.param_units.items():
+                if unit.rstrip('0123456789') == 'tes':
+                    next_data_tes = views.node(self.results, unit)['sequences']
+                    if unit_params['invest_mode']:
+                        # Shift the content from the end of the time steps
+                        # to the time points as for the other storages
+                        content = ((unit, 'None'), 'storage_content')
+                        init_content = self.block_variable(
+                            'GenericInvestmentStorageBlock', 'init_content'
+                            )[self.comps[unit]].value
+                        next_data_tes[content] = np.concatenate([
+                            [init_content],
+                            next_data_tes[content].to_numpy()[:-1]
+                            ])
+                        next_cap_tes = (
+                            views.node(
+                                self.results, unit
+                                )['scalars'][((unit, 'None'), 'invest')]
+                            )
+                    else:
+                        next_cap_tes = unit_params['Q_N']
+                    if data_tes is None:
+                        data_tes = next_data_tes
+                    else:
+                        data_tes = pd.concat([data_tes, next_data_tes], axis=1)
+                    data_caps = pd.concat([
+                        data_caps,
+                        pd.Series(
+                            next_cap_tes, index=[((unit, 'None'), 'invest')]
+                            )
+                        ])
 
-        self.key_params['revenues_heat'] = (
-            self.data_all['Q_demand'].sum() * self.param_opt['heat_price']
+        # Combine all data and relabel the column names
+        data_all = pd.concat([data_gnw, data_enw, data_hnw], axis=1)
+        if self.tes_used:
+            data_all = pd.concat([data_all, data_tes], axis=1)
+        if self.chp_used:
+            data_all = pd.concat([data_all, data_chpnode], axis=1)
+        if data_all.iloc[-1, :].isna().values.all():
+            data_all.drop(data_all.tail(1).index, inplace=True)
+
+        label_map = self.label_map()
+        result_labeling(data_all, label_map)
+        result_labeling(data_caps, label_map)
+
+        return data_all, data_caps
+
+    def stitch_results(self):
+        """Combine the results of all rolling horizon windows."""
+        self.data_all = pd.concat(self.rolling_results)
+
+        self.data_caps = pd.DataFrame({
+            f'cap_{unit}': [
+                unit_params[
+                    NOMINAL_PARAMS.get(unit.rstrip('0123456789'), 'cap_N')
+                    ]
+                ]
+            for unit, unit_params in self.param_units.items()
+            })
+        self.data_caps = self.data_caps.reindex(
+            sorted(self.data_caps.columns), axis=1
             )
 
-        self.key_params['revenues_total'] = (
-            self.key_params['revenues_spotmarket']
-            + self.key_params['revenues_heat']
-            )
+        self.cost_df = pd.DataFrame()
+        self.key_params = {}
 
-        # %% Total balance
-        self.key_params['balance_total'] = (
-            self.key_params['revenues_total'] - self.key_params['cost_total']
+    def expand_results(self, data_all):
+        """Expand results of the typical periods to the original time index.
+
+        The storage content at the start of each original hour is
+        reconstructed from the inter-period state and the intra-period
+        trajectory of the assigned typical period (see
+        `link_storage_periods`). Afterwards, the original input data is
+        restored, so that the economic and ecologic evaluation uses the full
+        time series.
+        """
+        L = self.tsa.period_length
+        expanded = self.tsa.expand(data_all)
+
+        for unit, (link, content) in self.storage_links.items():
+            content = np.array([po.value(c) for c in content])
+            soc = np.array([
+                po.value(link.soc[p]) for p in range(len(self.tsa.order))
+                ])
+            start = np.array([content[k*L] for k in self.tsa.order])
+            intra = np.array([
+                content[k*L:(k+1)*L] for k in self.tsa.order
+                ])
+            decay = (
+                (1 - self.param_units[unit]['Q_rel_loss'])**np.arange(L)
+                )
+            superposed = (soc - start)[:, None] * decay + intra
+            expanded[f'storage_content_{unit}'] = (
+                superposed.reshape(-1)[:self.tsa.n_steps]
+                )
+
+        self.data = self.data_full
+        return expanded
+
+    def validate_aggregation(self):
+        """Estimate the error of the aggregated model against the full model.
+
+        The capacities of the aggregated solution are fixed and the dispatch
+        is optimized over the full time series. As this is a feasible solution
+        of the full model, its objective (incl. the annualized investment) is
+        an upper bound of the full model's optimum.
+        """
+        objective_agg = self.objective_value()
+
+        param_opt = deepcopy(self.param_opt)
+        param_opt['aggregation'] = None
+        full = EnergySystem(
+            self.data_full, fix_capacities(self.param_units, self.data_caps),
+            param_opt, workspace=self.subspace('validation')
             )
+        full.run_model()
+        full.run_postprocessing()
 
-        # %% Meta results
-        # self.key_params['objective'] = self.meta_results['objective']
-        # self.key_params['gap'] = (
-        #     (self.meta_results['problem']['Lower bound']
-        #     - self.meta_results['objective'])
-        #     / self.meta_results['problem']['Lower bound'] * 100
-        #     )
+        objective_full = (
+            full.objective_value() + self.calc_annuity(self.data_caps)
+            )
 
-        # %% Main economic results
-        self.key_params['LCOH'] = LCOH(
-            self.key_params['invest_total'], self.key_params['cost_total'],
-            self.data_all['Q_demand'].sum(),
-            revenue=(
-                self.key_params['revenues_total']
-                - self.key_params['revenues_heat']
+        self.aggregation_validation = {
+            'objective_aggregated': objective_agg,
+            'objective_full': objective_full,
+            'objective_rel_error': (
+                abs(objective_full - objective_agg) / abs(objective_full)
                 ),
-            i=self.param_opt['capital_interest'], n=self.param_opt['lifetime']
+            'LCOH_aggregated': self.key_params['LCOH'],
+            'LCOH_full': full.key_params['LCOH'],
+            'LCOH_rel_error': (
+                abs(full.key_params['LCOH'] - self.key_params['LCOH'])
+                / abs(full.key_params['LCOH'])
+                )
+            }
+        return self.aggregation_validation
+
+    def calc_annuity(self, data_caps):
+        """Annualized investment of the units in invest mode."""
+        return sum(
+            unit_params['inv_spez'] / self.bwsf
+            * data_caps.loc[0, f'cap_{unit}']
+            for unit, unit_params in self.param_units.items()
+            if unit_params['invest_mode']
             )
 
-        self.key_params['total_heat_demand'] = self.data_all['Q_demand'].sum()
+    @instrumented('calc_econ_params')
+    def calc_econ_params(self):
+        economics = Economics(self.param_units, self.param_opt)
+        cost, key_params = economics.evaluate(
+            self.data_all, self.data_caps, self.data
+            )
+        self.cost_df = economics.cost_frame(cost)
+        self.key_params.update(key_params.iloc[0].to_dict())
 
+    @instrumented('calc_ecol_params')
     def calc_ecol_params(self):
         self.data_all['Emissions OM'] = 0
 
@@ -602,10 +1678,136 @@ class EnergySystem():
         self.generate_components()
         self.solve_model()
 
+    def offload(self, spool, fmt='mps'):
+        """Build the model and submit it to a solve spool instead of solving.
+
+        Once the job of the spool is done, its solution is loaded with
+        `import_solution` and the postprocessing runs as usual.
+
+        Parameters
+        ----------
+
+        spool : offload.SolveSpool
+            Spool the exported model is submitted to.
+
+        fmt : str
+            File format of the exported model, either 'mps' or 'lp'.
+        """
+        self.generate_buses()
+        self.generate_sources()
+        self.generate_sinks()
+        self.generate_components()
+        self.build_model()
+        return spool.submit(self, fmt=fmt)
+
+    def export_model(self, directory, fmt='mps'):
+        """Write the built model and the map of its solver names."""
+        return export_model(self.model, directory, fmt=fmt)
+
+    def import_solution(self, directory, filename='solution.sol'):
+        """Load the solution of an offloaded solve into the built model."""
+        nr_assigned, objective = import_solution(
+            self.model, directory, filename=filename
+            )
+        if nr_assigned == 0:
+            warnings.warn(
+                'The offloaded solution does not match any variable of the '
+                + 'model. Was it built from the same inputs?'
+                )
+        logger.info(
+            'Offloaded solution assigned to %d variables.', nr_assigned
+            )
+        logpath = os.path.join(
+            directory, f'{self.param_opt["Solver"].lower()}_log.txt'
+            )
+        if os.path.exists(logpath):
+            self.logpath = logpath
+        return objective
+
     def run_postprocessing(self):
         self.get_results()
         self.calc_econ_params()
         self.calc_ecol_params()
+        if self.workspace is not None:
+            write_run_record(self, self.workspace.file('run_record.json'))
+
+    def result_payload(self):
+        """Results of the postprocessing to be stored or transferred."""
+        return {
+            'data_all': self.data_all,
+            'data_caps': self.data_caps,
+            'cost_df': self.cost_df,
+            'key_params': self.key_params,
+            'profile': self.profile,
+            'two_stage_report': self.two_stage_report,
+            'race_report': self.race_report,
+            'presolve_report': self.presolve_report,
+            'pruning_report': self.pruning_report,
+            'decomposition_report': self.decomposition_report,
+            'logpath': self.logpath
+            }
+
+    def load_results(self, payload):
+        """Set the postprocessing results from a stored payload."""
+        self.data_all = payload['data_all']
+        self.data_caps = payload['data_caps']
+        self.cost_df = payload['cost_df']
+        self.key_params = payload['key_params']
+        self.profile = payload.get('profile', self.profile)
+        self.two_stage_report = payload.get('two_stage_report')
+        self.race_report = payload.get('race_report')
+        self.presolve_report = payload.get('presolve_report', [])
+        self.pruning_report = payload.get('pruning_report', {})
+        self.decomposition_report = payload.get('decomposition_report')
+        self.logpath = payload.get('logpath')
+        if self.tsa is not None:
+            self.data = self.data_full
+
+
+def fix_capacities(param_units, data_caps):
+    """Return unit parameters with optimized capacities as fixed values.
+
+    Parameters
+    ----------
+
+    param_units : dict
+        Parameters of the units in the energy system.
+
+    data_caps : pandas.DataFrame
+        Capacities of the units as returned by `EnergySystem.get_results`.
+    """
+    param_units = deepcopy(param_units)
+    for unit, unit_params in param_units.items():
+        if unit_params['invest_mode']:
+            param_var = NOMINAL_PARAMS.get(unit.rstrip('0123456789'), 'cap_N')
+            unit_params[param_var] = float(data_caps.loc[0, f'cap_{unit}'])
+            unit_params['invest_mode'] = False
+    return param_units
+
+def relative_gap(incumbent, bound):
+    """Relative gap between the incumbent and the bound of a MIP solve.
+
+    The gap is relative to the incumbent like in Gurobi and HiGHS. Returns
+    None if the solve has no finite incumbent or bound.
+    """
+    try:
+        incumbent = float(incumbent)
+        bound = float(bound)
+    except (TypeError, ValueError):
+        return None
+    if not (np.isfinite(incumbent) and np.isfinite(bound)):
+        return None
+    if incumbent == bound:
+        return 0.0
+    return abs(incumbent - bound) / max(abs(incumbent), 1e-10)
+
+
+def relative_level(content, capacity):
+    """Storage content relative to the capacity of a storage."""
+    if capacity > 0:
+        return float(content) / capacity
+    return 0.0
+
 
 def calc_bwsf(i, n):
     """Berechne Barwert Summenfaktor.
@@ -621,211 +1823,18 @@ def calc_bwsf(i, n):
     q = 1+i
     return (q**n - 1)/(q**n * (q - 1))
 
-def LCOH(invest, cost, Q, revenue=0, i=0.05, n=20):
-    """Konstantin 2013, Markus [29].
-
-    LCOH        Wärmegestehungskosten
-    invest:     Investitionsausgaben zum Zeitpunkt t=0
-    bwsf:       Barwert Summenfaktor
-    cashflow:   Differenz aller Einnahmen und Ausgaben (Zahlungsströme)
-                innerhalb des betrachteten Jahres
-    Q:          Gesamte bereitgestellte Wärmemenge pro Jahr
-    i:          Kalkulationszinssatz
-    n:          Betrachtungsdauer
-    """
-    q = 1 + i
-    bwsf = (q**n - 1)/(q**n * (q - 1))
-
-    LCOH = (invest + bwsf * (cost - revenue))/(bwsf * Q)
-    return LCOH
-
-def calc_cost(label, E_N, param, uc, cost_df, add_var_cost=None):
-    """
-    Calculate invest and operational cost for a unit.
-
-    Parameters
-    ----------
-
-    label : str
-        Label of unit to be used as column name in cost DataFrame.
-
-    E_N : float
-        Nominal rated energy that the specific cost relate to.
-
-    param : dict
-        JSON parameter file of user defined constants.
-
-    uc : pandas.DataFrame
-        DataFrame containing the units results of the unit commitment
-        optimization.
-
-    cost_df : pandas.DataFrame
-        DataFrame in which the calculated cost should be inserted.
-    """
-    cost_df.loc['invest', label] =  param[label]['inv_spez'] * E_N
-    cost_df.loc['op_cost_fix', label] = param[label]['op_cost_fix'] * E_N
-    cost_df.loc['op_cost_var', label] = (
-        param[label]['op_cost_var'] * uc.sum()
-        )
-    if add_var_cost:
-        cost_df.loc['op_cost_var', label] += add_var_cost * uc.sum()
-    cost_df.loc['op_cost', label] = (
-        cost_df.loc['op_cost_fix', label] + cost_df.loc['op_cost_var', label]
-        )
-
-    return cost_df
-
-def result_labeling(df, debug=True, **kwargs):
+def result_labeling(df, label_map=None):
     """
     Relabel the column names of oemof.solve result dataframes.
 
     Parameters
     ----------
 
-    df : pandas.DataFrame
+    df : pandas.DataFrame or pandas.Series
         DataFrame containing the results whose column names should be relabeled.
-    """
-    labeldict = {}
-    if isinstance(df, pd.DataFrame):
-        for col in df.columns:
-            if not isinstance(col, tuple):
-                if debug:
-                    print(f'Edge "{col}" was skipped while labeling.')
-                continue
-            labeldict[col] = check_column(col, debug)
-        df.rename(columns=labeldict, inplace=True)
-
-    elif isinstance(df, pd.Series):
-        for col in df.index:
-            if not isinstance(col, tuple):
-                if debug:
-                    print(f'Edge "{col}" was skipped while labeling.')
-                continue
-            labeldict[col] = check_column(col, debug)
-        df.rename(index=labeldict, inplace=True)
-
-def check_column(col, debug):
-    if col[0][1] == 'heat network':
-        if col[0][0].rstrip('0123456789') == 'hp':
-            if col[1] == 'flow':
-                return f'Q_out_{col[0][0]}'
-            elif col[1] == 'invest':
-                return f'cap_{col[0][0]}'
-            elif col[1] == 'status':
-                return f'state_{col[0][0]}'
-            elif col[1] == 'status_nominal':
-                return f'state_nom_{col[0][0]}'
-        elif col[0][0].rstrip('0123456789') == 'tes':
-            if col[1] == 'flow':
-                return f'Q_out_{col[0][0]}'
-            elif col[1] == 'invest':
-                return f'cap_out_{col[0][0]}'
-            elif col[1] == 'status':
-                return f'state_out_{col[0][0]}'
-            elif col[1] == 'status_nominal':
-                return f'state_nom_out_{col[0][0]}'
-            elif col[1] == 'total':
-                return f'total_out_{col[0][0]}'
-        else:
-            if col[1] == 'flow':
-                return f'Q_{col[0][0]}'
-            elif col[1] == 'invest':
-                return f'cap_{col[0][0]}'
-            elif col[1] == 'status':
-                return f'state_{col[0][0]}'
-            elif col[1] == 'status_nominal':
-                return f'state_nom_{col[0][0]}'
-
-    elif col[0][0] == 'heat network':
-        if col[0][1].rstrip('0123456789') == 'tes':
-            if col[1] == 'flow':
-                return f'Q_in_{col[0][1]}'
-            elif col[1] == 'invest':
-                return f'cap_in_{col[0][1]}'
-            elif col[1] == 'status':
-                return f'state_in_{col[0][1]}'
-            elif col[1] == 'status_nominal':
-                return f'state_nom_in_{col[0][1]}'
-            elif col[1] == 'total':
-                return f'total_in_{col[0][1]}'
-        elif col[0][1] == 'heat demand':
-            return 'Q_demand'
-
-    elif col[0][1] == 'chp node':
-        if col[1] == 'flow':
-            return f'P_{col[0][0]}'
-
-    elif col[0][0] == 'electricity network':
-        if col[0][1].rstrip('0123456789') == 'hp':
-            if col[1] == 'flow':
-                return f'P_in_{col[0][1]}'
-            elif col[1] == 'status':
-                return f'state_{col[0][1]}'
-        else:
-            return f'P_{col[0][1]}'
-
-    elif col[0][0] == 'gas network':
-        return f'H_{col[0][1]}'
-
-    elif col[0][0] == 'chp node':
-        if col[0][1] == 'spotmarket':
-            return 'P_spotmarket'
-        elif col[0][1] == 'chp internal':
-            return 'P_internal'
 
-    elif col[0][0] == 'chp internal':
-        if col[0][1] == 'electricity network':
-            return 'P_internal'
-
-    elif col[0][0] == 'gas source':
-        return 'H_source'
-
-    elif col[0][0] == 'electricity source':
-        return 'P_source'
-
-    elif col[0][0].rstrip('0123456789') == 'tes' and col[0][1] == 'None':
-        if col[1] == 'storage_content':
-            return f'storage_content_{col[0][0]}'
-        elif col[1] == 'invest':
-            return f'cap_{col[0][0]}'
-
-    else:
-        if debug:
-            print(f'Edge "{col}" could not be labeled.')
-
-# def result_labeling(df, labeldictpath='labeldict.csv'):
-#     """
-#     Relabel the column names of oemof.solve result dataframes.
-
-#     Parameters
-#     ----------
-
-#     df : pandas.DataFrame
-#         DataFrame containing the results whose column names should be relabeled.
-    
-#     labeldictpath : str
-#         Relative path to the labeldict csv file. Defaults to a path in the same
-#         directory.
-#     """
-#     labeldict_csv = pd.read_csv(labeldictpath, sep=';', na_filter=False)
-
-#     labeldict = dict()
-#     for idx in labeldict_csv.index:
-#         labeldict[
-#             ((labeldict_csv.loc[idx, 'name_out'],
-#               labeldict_csv.loc[idx, 'name_in']),
-#               labeldict_csv.loc[idx, 'type'])
-#             ] = labeldict_csv.loc[idx, 'label']
-
-#     if isinstance(df, pd.DataFrame):
-#         for col in df.columns:
-#             if col in labeldict.keys():
-#                 df.rename(columns={col: labeldict[col]}, inplace=True)
-#             else:
-#                 print(f'Column name "{col}" not in "{labeldictpath}".')
-#     elif isinstance(df, pd.Series):
-#         for idx in df.index:
-#             if idx in labeldict.keys():
-#                 df.rename(index={idx: labeldict[idx]}, inplace=True)
-#             else:
-#                 print(f'Column name "{idx}" not in "{labeldictpath}".')
+    label_map : dict
+        Compiled label map as returned by `labels.compile_label_map`. If None,
+        it is compiled for the nodes found in the results.
+    """
+    relabel(df, label_map=label_map)
@@ -0,0 +1,345 @@
+"""Export of built models and import of solutions of offloaded solves.
+
+Models are written to MPS or LP files together with a map of the solver
+names to the pyomo variable names. A directory spool hands the exported
+models to a worker on another machine (or a batch job) and takes back its
+solution files, so that the web server never holds the solver's memory.
+
+Examples
+--------
+
+Process the models of a spool on a compute machine::
+
+    python offload.py worker --spool /mnt/spool
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import traceback
+import uuid
+import weakref
+
+import pyomo.environ as po
+
+from solutions import load_solution_values
+from workspace import atomic_write
+
+SPOOL_ROOT = os.path.join(os.path.dirname(__file__), 'spool')
+SPOOL_STATES = ['pending', 'running', 'done', 'failed']
+
+
+def export_model(model, directory, fmt='mps'):
+    """Write a pyomo model and the map of its solver names.
+
+    Symbolic solver labels are used, so that the names are derived from the
+    pyomo names and stay the same for models built from the same inputs.
+    The map is written to 'names.json' next to the model file.
+
+    Parameters
+    ----------
+
+    model : pyomo.core.base.PyomoModel.ConcreteModel
+        Built model, e.g. an oemof.solph.Model.
+
+    directory : str
+        Directory of the model file 'model.mps' or 'model.lp'.
+
+    fmt : str
+        File format, either 'mps' or 'lp'.
+    """
+    os.makedirs(directory, exist_ok=True)
+    filepath = os.path.join(directory, f'model.{fmt}')
+    _, smap_id = model.write(
+        filepath, io_options={'symbolic_solver_labels': True}
+        )
+    symbol_map = model.solutions.symbol_map[smap_id]
+
+    names = {}
+    for symbol, obj in symbol_map.bySymbol.items():
+        if isinstance(obj, weakref.ref):
+            obj = obj()
+        if obj is not None and obj.ctype is po.Var:
+            names[symbol] = obj.name
+    atomic_write(os.path.join(directory, 'names.json'), json.dumps(names))
+    return filepath
+
+
+def read_solution(filepath):
+    """Read a Gurobi '.sol' or a HiGHS solution file.
+
+    Returns the values keyed by solver name and the objective value, which
+    is None if the file does not contain it.
+    """
+    with open(filepath, 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    if '# Primal solution values' in lines:
+        return read_highs_solution(lines)
+    return read_gurobi_solution(lines)
+
+
+def read_gurobi_solution(lines):
+    values = {}
+    objective = None
+    for line in lines:
+        if line.startswith('# Objective value'):
+            objective = float(line.split('=')[1])
+        elif line and not line.startswith('#'):
+            name, value = line.rsplit(maxsplit=1)
+            values[name] = float(value)
+    return values, objective
+
+
+def read_highs_solution(lines):
+    start = lines.index('# Primal solution values')
+    if lines[start + 1].strip() != 'Feasible':
+        raise ValueError(
+            f'The HiGHS solution is not feasible: {lines[start + 1]}'
+            )
+
+    values = {}
+    objective = None
+    position = start + 2
+    while position < len(lines):
+        line = lines[position]
+        position += 1
+        if line.startswith('Objective'):
+            objective = float(line.split()[1])
+        elif line.startswith('# Columns'):
+            nr_columns = int(line.split()[2])
+            for column in lines[position:position + nr_columns]:
+                name, value = column.rsplit(maxsplit=1)
+                values[name] = float(value)
+            break
+    return values, objective
+
+
+def import_solution(model, directory, filename='solution.sol'):
+    """Load the solution of an exported model into the model.
+
+    The model has to be built from the same inputs as the exported one.
+    Returns the number of assigned variables and the objective value.
+    """
+    with open(os.path.join(directory, 'names.json'), 'r',
+              encoding='utf-8') as file:
+        names = json.load(file)
+    values, objective = read_solution(os.path.join(directory, filename))
+    nr_assigned = load_solution_values(
+        model,
+        {names[name]: value for name, value in values.items() if name in names}
+        )
+    return nr_assigned, objective
+
+
+def solver_options(meta):
+    """Options of the solver in the spool metadata of a model."""
+    if meta['Solver'] == 'Gurobi':
+        keys = {'MIPGap': 'MIPGap', 'TimeLimit': 'TimeLimit',
+                'Threads': 'Threads'}
+    else:
+        keys = {'MIPGap': 'mip_rel_gap', 'TimeLimit': 'time_limit',
+                'Threads': 'threads'}
+    options = {
+        option: meta[key] for key, option in keys.items()
+        if meta.get(key) is not None
+        }
+    options.update(meta.get('solver_options') or {})
+    return options
+
+
+def solve_file(model_path, solution_path, solver='HiGHS', options=None,
+               logfile=None):
+    """Solve a model file with HiGHS or Gurobi and write the solution."""
+    options = options or {}
+    if solver == 'Gurobi':
+        import gurobipy as gp
+
+        with gp.Env(empty=True) as env:
+            env.setParam('LogToConsole', 0)
+            if logfile is not None:
+                env.setParam('LogFile', logfile)
+            env.start()
+            with gp.read(model_path, env=env) as model:
+                for option, value in options.items():
+                    model.setParam(option, value)
+                model.optimize()
+                if model.SolCount == 0:
+                    raise RuntimeError(
+                        f'Gurobi found no solution: status {model.Status}'
+                        )
+                model.write(solution_path)
+    else:
+        import highspy
+
+        highs = highspy.Highs()
+        highs.setOptionValue('log_to_console', False)
+        if logfile is not None:
+            highs.setOptionValue('log_file', logfile)
+        for option, value in options.items():
+            highs.setOptionValue(option, value)
+        highs.readModel(model_path)
+        highs.run()
+        if not highs.getSolution().value_valid:
+            raise RuntimeError(
+                'HiGHS found no solution: '
+                + highs.modelStatusToString(highs.getModelStatus())
+                )
+        highs.writeSolution(solution_path, 0)
+
+
+class SolveSpool():
+    """Directory queue of exported models for a separate solve worker.
+
+    A submitted model is exported into a staging directory and then moved
+    to 'pending'. A worker claims it by moving it to 'running' and moves it
+    to 'done' or 'failed' when the solve ended. As moving a directory is
+    atomic on the same file system, several workers can share a spool, e.g.
+    on a network drive.
+
+    Parameters
+    ----------
+
+    path : str
+        Directory of the spool. Defaults to 'spool' next to this module.
+    """
+
+    def __init__(self, path=None):
+        self.path = os.path.abspath(path or SPOOL_ROOT)
+        for state in SPOOL_STATES + ['incoming']:
+            os.makedirs(os.path.join(self.path, state), exist_ok=True)
+
+    def job_dir(self, job_id, state):
+        return os.path.join(self.path, state, job_id)
+
+    def state(self, job_id):
+        """State of a job or None if it is unknown."""
+        for state in SPOOL_STATES:
+            if os.path.exists(self.job_dir(job_id, state)):
+                return state
+        return None
+
+    def submit(self, energy_system, fmt='mps'):
+        """Export the model of an energy system and return the job id."""
+        job_id = uuid.uuid4().hex
+        staging = self.job_dir(job_id, 'incoming')
+        energy_system.export_model(staging, fmt=fmt)
+
+        meta = {
+            key: energy_system.param_opt.get(key)
+            for key in ['Solver', 'MIPGap', 'TimeLimit', 'Threads',
+                        'solver_options']
+            }
+        meta['model'] = f'model.{fmt}'
+        meta['submitted'] = time.time()
+        atomic_write(
+            os.path.join(staging, 'meta.json'), json.dumps(meta, indent=4)
+            )
+        os.replace(staging, self.job_dir(job_id, 'pending'))
+        return job_id
+
+    def claim(self):
+        """Move the oldest pending job to running and return its id."""
+        pending = os.path.join(self.path, 'pending')
+        entries = sorted(
+            os.scandir(pending), key=lambda entry: entry.stat().st_mtime
+            )
+        for entry in entries:
+            try:
+                os.replace(entry.path, self.job_dir(entry.name, 'running'))
+            except OSError:
+                # Claimed by another worker in the meantime
+                continue
+            return entry.name
+        return None
+
+    def process(self, job_id):
+        """Solve a claimed job and move it to done or failed."""
+        job_dir = self.job_dir(job_id, 'running')
+        with open(os.path.join(job_dir, 'meta.json'), 'r',
+                  encoding='utf-8') as file:
+            meta = json.load(file)
+
+        status = {'started': time.time()}
+        try:
+            solve_file(
+                os.path.join(job_dir, meta['model']),
+                os.path.join(job_dir, 'solution.sol'),
+                solver=meta['Solver'], options=solver_options(meta),
+                logfile=os.path.join(
+                    job_dir, f'{meta["Solver"].lower()}_log.txt'
+                    )
+                )
+        except Exception as e:
+            status.update(error=repr(e), traceback=traceback.format_exc())
+            state = 'failed'
+        else:
+            state = 'done'
+        status['finished'] = time.time()
+        atomic_write(
+            os.path.join(job_dir, 'status.json'), json.dumps(status, indent=4)
+            )
+        os.replace(job_dir, self.job_dir(job_id, state))
+        return state
+
+    def work(self, once=False, interval=2):
+        """Solve pending jobs until no job is left (if once) or forever."""
+        while True:
+            job_id = self.claim()
+            if job_id is not None:
+                print(f'Solving {job_id}...')
+                print(f'{job_id}: {self.process(job_id)}')
+            elif once:
+                return
+            else:
+                time.sleep(interval)
+
+    def status(self, job_id):
+        """Status of a job as dict with at least the key 'state'."""
+        state = self.state(job_id)
+        status = {'state': state or 'unknown'}
+        if state in ['done', 'failed']:
+            with open(os.path.join(self.job_dir(job_id, state),
+                                   'status.json'), 'r',
+                      encoding='utf-8') as file:
+                status.update(json.load(file))
+        return status
+
+    def remove(self, job_id):
+        for state in SPOOL_STATES:
+            shutil.rmtree(self.job_dir(job_id, state), ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    worker = subparsers.add_parser(
+        'worker', help='Solve the pending models of a spool.'
+        )
+    worker.add_argument('--spool', default=SPOOL_ROOT)
+    worker.add_argument(
+        '--once', action='store_true',
+        help='Stop when no model is pending instead of waiting for more.'
+        )
+    worker.add_argument('--interval', type=float, default=2)
+
+    solve = subparsers.add_parser(
+        'solve', help='Solve a single model file.'
+        )
+    solve.add_argument('model')
+    solve.add_argument('solution')
+    solve.add_argument(
+        '--solver', default='HiGHS', choices=['HiGHS', 'Gurobi']
+        )
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        SolveSpool(args.spool).work(once=args.once, interval=args.interval)
+    else:
+        solve_file(args.model, args.solution, solver=args.solver)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,8 +1,6 @@
 import datetime as dt
 import json
 import os
-import shutil
-import zipfile
 from copy import deepcopy
 
 import altair as alt
@@ -10,24 +8,8 @@ import pandas as pd
 import streamlit as st
 from streamlit import session_state as ss
 
-
-# %% MARK: Read Input Data
-@st.cache_data
-def read_input_data():
-    '''Read in input data all at once.'''
-    inputpath = os.path.abspath(os.path.join(
-        os.path.dirname(__file__), '..', 'input'
-        ))
-    all_heat_load = pd.read_csv(
-        os.path.join(inputpath, 'heat_load.csv'),
-        sep=';', index_col=0, parse_dates=True
-        )
-    eco_data = pd.read_csv(
-        os.path.join(inputpath, 'eco_data.csv'),
-        sep=';', index_col=0, parse_dates=True
-        )
-
-    return all_heat_load, eco_data
+import input_store
+from bundles import read_energy_system_bundle
 
 
 # %% MARK: Parameters
@@ -52,15 +34,6 @@ longnames = {
     'tes': 'Wärmespeicher'
 }
 
-if 'eco_data' not in ss:
-    ss.all_heat_load, ss.eco_data = read_input_data()
-
-    ss.all_el_prices = ss.eco_data['el_spot_price'].to_frame()
-    ss.all_el_emissions = ss.eco_data['ef_om'].to_frame()
-    ss.all_gas_prices = ss.eco_data['gas_price'].to_frame()
-    ss.all_co2_prices = ss.eco_data['co2_price'].to_frame()
-    ss.all_solar_heat_flow = ss.eco_data['solar_heat_flow'].to_frame()
-
 unitpath = os.path.abspath(
     os.path.join(os.path.dirname(__file__), '..', 'input', 'param_units.json')
     )
@@ -209,32 +182,12 @@ with tab1:
         help='Aktuell nicht vollständig funktionsfähig'
     )
     if esfile is not None:
-        tmppath = os.path.abspath(
-            os.path.join(
-                os.path.dirname(__file__), '..', '_tmp'
+        ss.data, ss.param_opt, ss.param_units = read_energy_system_bundle(
+            esfile
             )
-        )
-        if not os.path.exists(tmppath):
-            os.mkdir(tmppath)
-
-        zippath = os.path.join(tmppath, esfile.name.split('.')[0])
-        with zipfile.ZipFile(esfile, 'r') as z:
-            z.extractall(zippath)
-
-        tspath = os.path.join(zippath, 'data_input.csv')
-        ss.data = pd.read_csv(tspath, sep=';', index_col=0, parse_dates=True)
-
-        optpath = os.path.join(zippath, 'param_opt.json')
-        with open(optpath, 'r', encoding='utf-8') as file:
-            ss.param_opt = json.load(file)
-
-        unitpath = os.path.join(zippath, 'param_units.json')
-        with open(unitpath, 'r', encoding='utf-8') as file:
-            ss.param_units = json.load(file)
 
         ss.units = [longnames[u] for u in ss.param_units.keys()]
 
-        shutil.rmtree(tmppath)
         own_es = True
 
 # %% MARK: Unit Parameters
@@ -351,7 +304,7 @@ with tab3:
 
     dataset_name = col_sel.selectbox(
         'Wähle die Wärmelastdaten aus, die im System zu verwenden sind',
-        [*ss.all_heat_load.columns, 'Eigene Daten'],
+        [*input_store.columns('heat_load'), 'Eigene Daten'],
         placeholder='Wärmelastendaten'
     )
 
@@ -380,18 +333,15 @@ with tab3:
 
     else:
         user_file = None
-        heat_load_years = ss.all_heat_load.loc[
-            ~ss.all_heat_load[dataset_name].isna(), dataset_name
-            ].index.year.unique()
+        heat_load_years = input_store.years('heat_load', dataset_name)
         heat_load_year = col_sel.selectbox(
             'Wähle das Jahr der Wärmelastdaten aus',
             heat_load_years, index=len(heat_load_years)-1,
             placeholder='Betrachtungsjahr'
         )
-        yearmask = ss.all_heat_load.index.year == heat_load_year
-        heat_load = ss.all_heat_load.loc[
-            yearmask, dataset_name
-            ].copy().to_frame()
+        heat_load = input_store.read(
+            'heat_load', heat_load_year, [dataset_name]
+            )
 
     dates = None
     if dataset_name != 'Eigene Daten':
@@ -416,6 +366,8 @@ with tab3:
 
         scale_hl = col_sel.toggle('Daten skalieren', key='scale_hl')
         if scale_hl:
+            # The bundled data is shared read-only, so scale a copy
+            heat_load = heat_load.copy()
             scale_method_hl = col_sel.selectbox(
                 'Methode', ['Haushalte', 'Faktor', 'Erweitert'],
                 key='scale_method_hl'
@@ -484,31 +436,32 @@ with tab3:
         )
 
     if 'Solarthermie' in ss.units:
-        solar_heat_flow = ss.all_solar_heat_flow[
-            ss.all_solar_heat_flow.index.year == heat_load_year
-            ].copy()
+        solar_heat_flow = input_store.read(
+            'eco_data', heat_load_year, ['solar_heat_flow']
+            )
         if precise_dates:
             solar_heat_flow = solar_heat_flow.loc[dates[0]:dates[1], :]
         solar_heat_flow.reset_index(inplace=True)
-        solar_heat_flow['solar_heat_flow'] *= 1e6
 
         col_vis.subheader('Solathermie')
+        solar_chart = solar_heat_flow.assign(
+            solar_heat_flow=solar_heat_flow['solar_heat_flow'] * 1e6
+            )
         col_vis.altair_chart(
-            alt.Chart(solar_heat_flow).mark_line(color='#EC6707').encode(
+            alt.Chart(solar_chart).mark_line(color='#EC6707').encode(
                 y=alt.Y('solar_heat_flow',
                         title='Spezifische Einstrahlung in Wh/m²'),
                 x=alt.X('Date', title='Datum')
             ),
             use_container_width=True
         )
-        solar_heat_flow['solar_heat_flow'] *= 1e-6
 
 # %% MARK: Electricity
 with tab4:
     st.header('Elektrizitätsversorgungsdaten')
     col_elp, col_vis_el = st.columns([1, 2], gap='large')
 
-    el_prices_years = list(ss.all_el_prices.index.year.unique())
+    el_prices_years = input_store.years('eco_data')
     if heat_load_year:
         el_year_idx = el_prices_years.index(heat_load_year)
     else:
@@ -518,12 +471,10 @@ with tab4:
         el_prices_years, index=el_year_idx,
         placeholder='Betrachtungsjahr'
     )
-    el_prices = ss.all_el_prices[
-        ss.all_el_prices.index.year == el_prices_year
-        ].copy()
-    el_em = ss.all_el_emissions[
-        ss.all_el_emissions.index.year == el_prices_year
-        ].copy()
+    el_prices = input_store.read(
+        'eco_data', el_prices_year, ['el_spot_price']
+        )
+    el_em = input_store.read('eco_data', el_prices_year, ['ef_om'])
 
     precise_dates = col_elp.toggle(
         'Exakten Zeitraum wählen', key='prec_dates_el_prices'
@@ -547,6 +498,7 @@ with tab4:
 
     scale_el = col_elp.toggle('Daten skalieren', key='scale_el')
     if scale_el:
+        el_prices = el_prices.copy()
         scale_method_el = col_elp.selectbox(
             'Methode', ['Faktor', 'Erweitert'], key='scale_method_el'
             )
@@ -627,7 +579,7 @@ with tab5:
     st.header('Gasversorgungsdaten')
     col_gas, col_vis_gas = st.columns([1, 2], gap='large')
 
-    gas_prices_years = list(ss.all_el_prices.index.year.unique())
+    gas_prices_years = input_store.years('eco_data')
     if heat_load_year:
         gas_year_idx = gas_prices_years.index(heat_load_year)
     else:
@@ -637,12 +589,12 @@ with tab5:
         gas_prices_years, index=gas_year_idx,
         placeholder='Betrachtungsjahr'
     )
-    gas_prices = ss.all_gas_prices[
-        ss.all_gas_prices.index.year == gas_prices_year
-        ].copy()
-    co2_prices = ss.all_co2_prices[
-        ss.all_co2_prices.index.year == gas_prices_year
-        ].copy()
+    gas_prices = input_store.read(
+        'eco_data', gas_prices_year, ['gas_price']
+        )
+    co2_prices = input_store.read(
+        'eco_data', gas_prices_year, ['co2_price']
+        )
 
     precise_dates = col_gas.toggle(
         'Exakten Zeitraum wählen', key='prec_dates_gas_prices'
@@ -666,6 +618,7 @@ with tab5:
 
     scale_gas = col_gas.toggle('Daten skalieren', key='scale_gas')
     if scale_gas:
+        gas_prices = gas_prices.copy()
         scale_method_gas = col_gas.selectbox(
             'Methode', ['Faktor', 'Erweitert'], key='scale_method_gas'
             )
@@ -721,7 +674,7 @@ with tab5:
     ss.param_opt['ef_gas'] *= 1e-3
 
     col_vis_gas.subheader('CO₂-Preise')
-    co2_prices['co2_price'] *= ss.param_opt['ef_gas']
+    co2_prices = co2_prices * ss.param_opt['ef_gas']
     co2_prices.reset_index(inplace=True)
     col_vis_gas.altair_chart(
         alt.Chart(co2_prices).mark_line(color='#74ADC0').encode(
@@ -809,6 +762,113 @@ with tab6:
         if ss.param_opt['TimeLimit'] is not None:
             ss.param_opt['TimeLimit'] *= 60
 
+    help_strategy = (
+        'Bei der zweistufigen Lösung wird zunächst die Auslegung ohne '
+        + 'Ganzzahligkeitsbedingungen optimiert und anschließend der '
+        + 'Anlageneinsatz mit festen Kapazitäten als MILP gelöst. Die '
+        + 'Abweichung zum vollständigen MILP wird als Lücke ausgewiesen. '
+        + 'Beim Solver-Wettlauf wird das MILP parallel mit mehreren Solvern '
+        + 'und Einstellungen gelöst und die zuerst gefundene Lösung '
+        + 'übernommen. Bei der Dekomposition wird die Auslegung iterativ '
+        + 'über Teilprobleme je Monat oder Quartal optimiert, die parallel '
+        + 'gelöst werden, und anschließend der Anlageneinsatz als MILP.'
+    )
+    strategies = {
+        'Vollständiges MILP': None,
+        'Zweistufig (LP-Auslegung, MILP-Einsatz)': 'two_stage',
+        'Solver-Wettlauf': 'race',
+        'Dekomposition (Benders)': 'decomposition'
+        }
+    strategy = col_opt.selectbox(
+        'Lösungsstrategie', options=list(strategies.keys()),
+        help=help_strategy, key='solve_strategy'
+        )
+    ss.param_opt['solve_strategy'] = strategies[strategy]
+    if ss.param_opt['solve_strategy'] == 'decomposition':
+        decomposition_periods = {'Monate': 'month', 'Quartale': 'season'}
+        decomposition_period = col_opt.selectbox(
+            'Teilprobleme', options=list(decomposition_periods.keys()),
+            key='decomposition_period'
+            )
+        decomposition_gap = col_opt.number_input(
+            'Abbruchlücke der Dekomposition in %', value=1.0, min_value=0.0,
+            key='decomposition_gap'
+            )
+        ss.param_opt['decomposition'] = {
+            'period': decomposition_periods[decomposition_period],
+            'gap': decomposition_gap / 100
+            }
+
+    help_backend = (
+        'Das Modell wird direkt als dünnbesetzte Matrix aufgebaut und über '
+        + 'die Matrix-Schnittstelle an HiGHS bzw. gurobipy übergeben, statt '
+        + 'über pyomo. Das verkürzt den Modellaufbau vor allem bei langen '
+        + 'Zeitreihen. Mit der Zeitreihenaggregation wird weiterhin pyomo '
+        + 'verwendet.'
+    )
+    matrix_backend = col_opt.toggle(
+        'Matrix-Modellaufbau', key='ToggleMatrixBackend', help=help_backend
+        )
+    ss.param_opt['backend'] = 'matrix' if matrix_backend else None
+
+    help_warm_start = (
+        'Die letzte Lösung eines Energiesystems mit denselben Anlagen wird '
+        + 'als Startlösung verwendet. Das beschleunigt wiederholte '
+        + 'Optimierungen mit geänderten Preisen oder Parametern.'
+    )
+    ss.param_opt['warm_start'] = col_opt.toggle(
+        'Warmstart', key='ToggleWarmStart', help=help_warm_start
+        )
+
+    help_rh = (
+        'Ist für keine Anlage die Kapazitätsoptimierung aktiviert, wird die '
+        + 'Einsatzoptimierung in aufeinanderfolgenden Zeitfenstern mit '
+        + 'Vorausschau gelöst. Speicherstände und Anlagenzustände werden '
+        + 'dabei in das nächste Zeitfenster übernommen.'
+    )
+    ss.param_opt['rolling_horizon'] = None
+    rolling_horizon = col_opt.toggle(
+        'Rollierender Horizont', key='ToggleRollingHorizon', help=help_rh
+        )
+    if rolling_horizon:
+        rh_window = col_opt.number_input(
+            'Zeitfenster in Tagen', value=7, min_value=1, step=1,
+            key='rolling_horizon_window'
+            )
+        rh_overlap = col_opt.number_input(
+            'Vorausschau in Tagen', value=2, min_value=0, step=1,
+            key='rolling_horizon_overlap'
+            )
+        ss.param_opt['rolling_horizon'] = {
+            'window': int(rh_window) * 24,
+            'overlap': int(rh_overlap) * 24
+            }
+
+    help_agg = (
+        'Die Zeitreihen werden zu typischen Perioden zusammengefasst, was die '
+        + 'Rechenzeit der Optimierung deutlich reduziert. Die Periode mit der '
+        + 'höchsten Wärmelast wird immer beibehalten.'
+    )
+    ss.param_opt['aggregation'] = None
+    aggregation = col_opt.toggle(
+        'Zeitreihenaggregation', key='ToggleAggregation', help=help_agg
+        )
+    if aggregation:
+        agg_periods = {'Tage': 'day', 'Wochen': 'week'}
+        agg_period = col_opt.selectbox(
+            'Typperiode', options=list(agg_periods.keys()),
+            key='aggregation_period'
+            )
+        n_typical = col_opt.number_input(
+            f'Anzahl typischer {agg_period}', value=12, min_value=1,
+            step=1, key='aggregation_n_typical'
+            )
+        ss.param_opt['aggregation'] = {
+            'n_typical': int(n_typical),
+            'period': agg_periods[agg_period],
+            'peaks': True
+            }
+
     st.markdown('''---''')
 
     with st.container(border=True):
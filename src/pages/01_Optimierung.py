@@ -1,52 +1,125 @@
+import datetime as dt
 import json
 import os
-import shutil
+import time
+import uuid
 
+import altair as alt
 import pandas as pd
 import streamlit as st
 from streamlit import session_state as ss
 
+from bundles import energy_system_bundle
+from jobs import JobManager
 from model import EnergySystem
-
-
-@st.dialog('Energiesystem lokal speichern')
-def download_energy_system():
-    """Temporarely save data and zip it, then let user download zip archive."""
-    with st.spinner('Daten werden verarbeitet...'):
-        tmppath = os.path.abspath(
-            os.path.join(
-                os.path.dirname(__file__), '..', '_tmp'
+from result_cache import ResultCache
+from workspace import Workspace, cleanup_workspaces
+
+
+@st.cache_resource
+def get_result_cache():
+    """Share the on-disk result cache between all sessions."""
+    return ResultCache()
+
+
+@st.cache_resource
+def get_job_manager():
+    """Share the optimization job queue between all sessions.
+
+    Job directories and workspaces left over from earlier server runs are
+    removed once on startup.
+    """
+    jobs = JobManager()
+    jobs.cleanup()
+    cleanup_workspaces()
+    return jobs
+
+
+def render_progress(history, elapsed):
+    """Show the latest values and the convergence of a solve."""
+    col_inc, col_bnd, col_gap, col_time = st.columns(4)
+    if not history.empty:
+        latest = history.iloc[-1]
+        col_inc.metric('Beste Lösung', f'{latest["incumbent"]:,.0f}')
+        col_bnd.metric('Beste Schranke', f'{latest["bound"]:,.0f}')
+        col_gap.metric('Gap in %', f'{latest["gap"]:.2f}')
+    col_time.metric('Laufzeit in s', f'{elapsed:.0f}')
+
+    if not history.empty:
+        history = history.melt(
+            id_vars='time', value_vars=['incumbent', 'bound'],
+            var_name='Wert', value_name='Zielfunktion'
+            )
+        history['Wert'] = history['Wert'].replace({
+            'incumbent': 'Beste Lösung', 'bound': 'Beste Schranke'
+            })
+        st.altair_chart(
+            alt.Chart(history).mark_line(interpolate='step-after').encode(
+                x=alt.X('time', title='Laufzeit in s'),
+                y=alt.Y('Zielfunktion', scale=alt.Scale(zero=False)),
+                color=alt.Color('Wert', title=None)
+                ),
+            use_container_width=True
             )
-        )
-        if not os.path.exists(tmppath):
-            os.mkdir(tmppath)
 
-        zippath = os.path.join(tmppath, 'energysystem')
-        if not os.path.exists(zippath):
-            os.mkdir(zippath)
 
-        tspath = os.path.join(zippath, 'data_input.csv')
-        ss.data.to_csv(tspath, sep=';')
+@st.fragment(run_every=2)
+def show_job():
+    """Refresh the status of the running job until it has ended."""
+    jobs = get_job_manager()
+    status = jobs.status(ss.job_id)
+    if status['state'] not in ['queued', 'running']:
+        st.rerun()
 
-        optpath = os.path.join(zippath, 'param_opt.json')
-        with open(optpath, 'w', encoding='utf-8') as file:
-            json.dump(ss.param_opt, file, indent=4, sort_keys=True)
+    if status['state'] == 'queued':
+        st.info(
+            'Die Optimierung wartet auf einen freien Rechenplatz '
+            + f'(Position {status.get("position", "-")}).'
+            )
+    else:
+        st.caption('Optimierung wird durchgeführt...')
+        render_progress(
+            jobs.progress(ss.job_id), time.time() - status['started']
+            )
 
-        unitpath = os.path.join(zippath, 'param_units.json')
-        with open(unitpath, 'w', encoding='utf-8') as file:
-            json.dump(ss.param_units, file, indent=4, sort_keys=True)
+    col_stop, col_cancel = st.columns(2)
+    if status['state'] == 'running':
+        stop = col_stop.button(
+            label='⏹️ Optimierung vorzeitig beenden',
+            key='stop_button', use_container_width=True
+            )
+        if stop:
+            jobs.stop(ss.job_id)
+            st.toast('Optimierung wird mit der besten Lösung beendet')
+    cancel = col_cancel.button(
+        label='❌ Optimierung abbrechen',
+        key='cancel_button', use_container_width=True
+        )
+    if cancel:
+        jobs.cancel(ss.job_id)
+        st.rerun()
 
-        shutil.make_archive(zippath, 'zip', zippath)
 
-    with open(f'{zippath}.zip', 'rb') as file:
-        btn = st.download_button(
-            label='Speichere dein Energiesystem',
-            data=file,
-            file_name='Energiesystem',
-            mime='application/zip'
+@st.dialog('Energiesystem lokal speichern')
+def download_energy_system():
+    """Zip data and parameters in memory, then let user download it."""
+    fmt = st.radio(
+        'Dateiformat', ['arrow', 'csv'], horizontal=True,
+        format_func=lambda x: {
+            'arrow': 'Apache Arrow (komprimiert)', 'csv': 'CSV'
+            }[x]
         )
+    with st.spinner('Daten werden verarbeitet...'):
+        bundle = energy_system_bundle(
+            ss.data, ss.param_opt, ss.param_units, fmt=fmt
+            )
 
-    shutil.rmtree(tmppath)
+    btn = st.download_button(
+        label='Speichere dein Energiesystem',
+        data=bundle,
+        file_name='Energiesystem.zip',
+        mime='application/zip'
+    )
 
 shortnames = {
     'Wärmepumpe': 'hp',
@@ -59,6 +132,18 @@ shortnames = {
     'Wärmespeicher': 'tes'
 }
 
+# Reattach to a running job after the session was lost (e.g. by a refresh)
+job_id = st.query_params.get('job')
+if 'job_id' not in ss and get_job_manager().exists(job_id):
+    ss.job_id = job_id
+    ss.data, ss.param_units, ss.param_opt = (
+        get_job_manager().inputs(job_id)
+        )
+    ss.units = [
+        longname for longname, unit_cat in shortnames.items()
+        if any(u.rstrip('0123456789') == unit_cat for u in ss.param_units)
+        ]
+
 # %% MARK: Sidebar
 with st.sidebar:
     st.subheader('Offene Wärmespeicherplanung')
@@ -143,7 +228,11 @@ param_overview = pd.DataFrame.from_dict(
     ss.param_opt, orient='index', columns=['Wert']
     )
 param_overview.drop(
-    index=['MIPGap', 'TimeLimit', 'heat_price', 'TEHG_bonus'], inplace=True
+    index=[
+        'MIPGap', 'TimeLimit', 'heat_price', 'TEHG_bonus', 'aggregation',
+        'rolling_horizon', 'solve_strategy', 'backend', 'decomposition'
+        ],
+    inplace=True, errors='ignore'
     )
 param_overview.loc['ef_gas'] *= 1000
 param_overview.loc['capital_interest'] *= 100
@@ -164,13 +253,10 @@ col_over.dataframe(param_overview, use_container_width=True)
 # _, col_save, col_reset, _ = st.columns([1.05, 1, 1, 2], gap='large')
 # col_save, col_reset = col_over.columns([1, 1], gap='large')
 col_save, col_dl_es, col_reset = col_over.columns([1, 1, 1], gap='large')
-savepath = os.path.abspath(
+saveroot = os.path.abspath(
     os.path.join(os.path.dirname(__file__), '..', 'save')
     )
 
-if not os.path.exists(savepath):
-    os.mkdir(savepath)
-
 download = False
 download = col_save.button(
     label='💾 Input Daten speichern',
@@ -178,16 +264,22 @@ download = col_save.button(
     )
 
 if download:
-    tspath = os.path.join(savepath, 'data_input.csv')
-    ss.data.to_csv(tspath, sep=';')
-
-    optpath = os.path.join(savepath, 'param_opt.json')
-    with open(optpath, 'w', encoding='utf-8') as file:
-        json.dump(ss.param_opt, file, indent=4, sort_keys=True)
-
-    unitpath = os.path.join(savepath, 'param_units.json')
-    with open(unitpath, 'w', encoding='utf-8') as file:
-        json.dump(ss.param_units, file, indent=4, sort_keys=True)
+    # Every save gets a directory of its own, so that sessions saving at the
+    # same time do not overwrite each other's files
+    savespace = Workspace(
+        root=saveroot, prefix=dt.datetime.now().strftime('%Y%m%d_%H%M%S'),
+        workspace_id=uuid.uuid4().hex[:8]
+        )
+    savespace.write('data_input.csv', ss.data.to_csv(sep=';'))
+    savespace.write(
+        'param_opt.json',
+        json.dumps(ss.param_opt, indent=4, sort_keys=True)
+        )
+    savespace.write(
+        'param_units.json',
+        json.dumps(ss.param_units, indent=4, sort_keys=True)
+        )
+    st.toast(f'Input Daten sind in "{savespace.path}" gespeichert')
 
 download_es_btn = col_dl_es.button(
     label='📝 Energiesystem speichern',
@@ -204,49 +296,57 @@ reset_es = col_reset.button(
     )
 
 if reset_es:
-    keys = list(ss.keys())
-    exceptions = [
-        'all_heat_load',
-        'eco_data',
-        'all_el_prices',
-        'all_el_emissions',
-        'all_gas_prices',
-        'all_co2_prices',
-        'all_solar_heat_flow'
-        ]
-    for key in keys:
-        if key not in exceptions:
-            ss.pop(key)
+    for key in list(ss.keys()):
+        ss.pop(key)
     st.switch_page('pages/00_Energiesystem.py')
 
 with st.container(border=True):
     opt = st.button(label='🖥️**Optimierung starten**', use_container_width=True)
     if opt:
-        with st.spinner('Optimierung wird durchgeführt...'):
-            ss.energy_system = EnergySystem(
+        ss.energy_system = EnergySystem(
+            ss.data, ss.param_units, ss.param_opt
+            )
+        st.toast('Energiesystem ist initialisiert')
+
+        ss.pop('job_id', None)
+        st.query_params.pop('job', None)
+        cached_results = get_result_cache().load(ss.energy_system.cache_key)
+        if cached_results is not None:
+            ss.energy_system.load_results(cached_results)
+            st.toast('Ergebnisse sind aus dem Zwischenspeicher geladen')
+        else:
+            ss.job_id = get_job_manager().submit(
                 ss.data, ss.param_units, ss.param_opt
                 )
-            st.toast('Energiesystem ist initialisiert')
-
-            ss.energy_system.generate_buses()
-            ss.energy_system.generate_sources()
-            ss.energy_system.generate_sinks()
-            ss.energy_system.generate_components()
-            st.toast('Modell ist erzeugt')
-
-            ss.energy_system.solve_model()
-            st.toast('Optimierungsproblem ist gelöst')
-
-            ss.energy_system.get_results()
-            st.toast('Ergebnisse sind ausgelesen')
-
-            ss.energy_system.calc_econ_params()
-            ss.energy_system.calc_ecol_params()
-            st.toast('Postprocessing ist durchgeführt')
-
-            # breakpoint()
+            st.query_params['job'] = ss.job_id
+            st.toast('Optimierung ist gestartet')
+
+    run_finished = 'energy_system' in ss and 'job_id' not in ss
+    if 'job_id' in ss:
+        jobs = get_job_manager()
+        status = jobs.status(ss.job_id)
+        if status['state'] in ['queued', 'running']:
+            show_job()
+        elif status['state'] == 'finished':
+            if ss.get('job_loaded') != ss.job_id:
+                ss.energy_system = EnergySystem(
+                    ss.data, ss.param_units, ss.param_opt
+                    )
+                ss.energy_system.load_results(jobs.result(ss.job_id))
+                ss.job_loaded = ss.job_id
+            render_progress(
+                jobs.progress(ss.job_id),
+                status['finished'] - status['started']
+                )
+            run_finished = True
+        elif status['state'] == 'failed':
+            st.error(
+                f'Die Optimierung ist fehlgeschlagen: {status.get("error")}'
+                )
+        else:
+            st.warning('Die Optimierung wurde abgebrochen.')
 
-if opt:
+if run_finished:
     with st.container(border=True):
         st.page_link(
             'pages/02_Simulationsergebnisse.py',
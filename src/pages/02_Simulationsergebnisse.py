@@ -2,7 +2,6 @@ import datetime as dt
 import json
 import os
 import re
-import shutil
 
 import altair as alt
 import numpy as np
@@ -10,29 +9,20 @@ import pandas as pd
 import streamlit as st
 from streamlit import session_state as ss
 
+import input_store
+from bundles import results_bundle
+
 
 @st.dialog('Ergebnisse lokal speichern')
 def save_results():
-    """Temporarely save results and zip them, then let user download it."""
-    with st.spinner('Daten werden verarbeitet...'):
-        tmppath = os.path.abspath(
-            os.path.join(
-                os.path.dirname(__file__), '..', '_tmp'
-            )
+    """Zip the results in memory, then let user download it."""
+    fmt = st.radio(
+        'Dateiformat', ['arrow', 'csv'], horizontal=True,
+        format_func=lambda x: {
+            'arrow': 'Apache Arrow (komprimiert)', 'csv': 'CSV'
+            }[x]
         )
-        if not os.path.exists(tmppath):
-            os.mkdir(tmppath)
-
-        zippath = os.path.join(tmppath, 'results')
-        if not os.path.exists(zippath):
-            os.mkdir(zippath)
-
-        tspath = os.path.join(zippath, 'Ergebnisse_Zeitreihen.csv')
-        ss.energy_system.data_all.to_csv(tspath, sep=';')
-
-        cappath = os.path.join(zippath, 'Ergebnisse_Kapazitäten.csv')
-        ss.overview_caps.to_csv(cappath, sep=';', encoding='utf-8-sig')
-
+    with st.spinner('Daten werden verarbeitet...'):
         kpdf = pd.DataFrame.from_dict(
             {k: [v] for k, v in ss.energy_system.key_params.items()}
         )
@@ -57,20 +47,16 @@ def save_results():
         }
         kpdf.rename(columns=kprename, inplace=True)
 
-        kppath = os.path.join(zippath, 'Ergebnisse_Allgemein.csv')
-        kpdf.to_csv(kppath, sep=';', encoding='utf-8-sig', index=False)
-
-        shutil.make_archive(zippath, 'zip', zippath)
-
-    with open(f'{zippath}.zip', 'rb') as file:
-        btn = st.download_button(
-            label='Speichere deine Ergebnisse',
-            data=file,
-            file_name='Ergebnisse',
-            mime='application/zip'
-        )
+        bundle = results_bundle(
+            ss.energy_system.data_all, ss.overview_caps, kpdf, fmt=fmt
+            )
 
-    shutil.rmtree(tmppath)
+    btn = st.download_button(
+        label='Speichere deine Ergebnisse',
+        data=bundle,
+        file_name='Ergebnisse.zip',
+        mime='application/zip'
+    )
 
 # %% MARK: Parameters
 shortnames = {
@@ -303,19 +289,8 @@ with tab_ov:
             )
 
         if reset_es:
-            keys = list(ss.keys())
-            exceptions = [
-                'all_heat_load',
-                'eco_data',
-                'all_el_prices',
-                'all_el_emissions',
-                'all_gas_prices',
-                'all_co2_prices',
-                'all_solar_heat_flow'
-                ]
-            for key in keys:
-                if key not in exceptions:
-                    ss.pop(key)
+            for key in list(ss.keys()):
+                ss.pop(key)
             st.switch_page('pages/00_Energiesystem.py')
 
         save_results_btn = col_right.button(
@@ -518,9 +493,9 @@ if chp_used:
             use_container_width=True
             )
 
-        elprice = ss.all_el_prices.loc[
-            dates[0]:dates[1], 'el_spot_price'
-            ].copy().to_frame()
+        elprice = input_store.read(
+            'eco_data', dates[0].year, ['el_spot_price']
+            ).loc[dates[0]:dates[1], :]
         elprice.index.names = ['Date']
         elprice.reset_index(inplace=True)
 
@@ -604,15 +579,158 @@ if tes_used:
                     )
 
 with tab_pro:
-    with tab_pro.expander('Solver Log'):
-        logpath = os.path.abspath(
-            os.path.join(
-                os.path.dirname(__file__), '..', 'solverlogs',
-                f'{ss.param_opt["Solver"].lower()}_log.txt'
-                )
+    with tab_pro.expander('Laufzeitanalyse'):
+        profile = ss.energy_system.profile.to_frame()
+        profile.rename(
+            columns={
+                'calls': 'Aufrufe',
+                'wall_time': 'Laufzeit in s',
+                'cpu_time': 'CPU-Zeit in s',
+                'parent': 'Übergeordnete Stufe',
+                'peak_rss_mb': 'Maximaler Speicherbedarf in MB',
+                'rss_delta_mb': 'Zusätzlicher Speicherbedarf in MB'
+                },
+            inplace=True
             )
-        with open(logpath, 'r', encoding='utf-8') as file:
-            solverlog = file.read()
+        st.dataframe(profile.round(3), use_container_width=True)
+
+        totals = ss.energy_system.profile.totals()
+        met_wall, met_cpu, met_rss = st.columns(3)
+        met_wall.metric('Gesamtlaufzeit in s', round(totals['wall_time'], 2))
+        met_cpu.metric('Gesamte CPU-Zeit in s', round(totals['cpu_time'], 2))
+        if totals['peak_rss_mb'] is not None:
+            met_rss.metric(
+                'Maximaler Speicherbedarf in MB',
+                round(totals['peak_rss_mb'], 1)
+                )
+
+        size = ss.energy_system.calc_model_size()
+        if size is not None:
+            met_var, met_bin, met_con, met_nnz = st.columns(4)
+            met_var.metric('Variablen', size['variables'])
+            met_bin.metric('Binärvariablen', size['binaries'])
+            met_con.metric('Nebenbedingungen', size['constraints'])
+            met_nnz.metric('Nichtnullelemente', size['nonzeros'])
+
+    if ss.energy_system.tsa is not None:
+        with tab_pro.expander('Zeitreihenaggregation'):
+            st.dataframe(
+                ss.energy_system.aggregation_error.rename(columns={
+                    'nrmse': 'Normierter RMSE',
+                    'peak_ratio': 'Verhältnis der Maximalwerte'
+                    }),
+                use_container_width=True
+                )
+
+    if ss.energy_system.two_stage_report is not None:
+        with tab_pro.expander('Zweistufige Lösung'):
+            report = ss.energy_system.two_stage_report
+            col_lb, col_ub, col_gap = st.columns(3)
+            if report['lower_bound'] is not None:
+                col_lb.metric(
+                    'Untere Schranke (LP)', round(report['lower_bound'], 2)
+                    )
+            else:
+                col_lb.metric(
+                    'Relaxierte Zielfunktion (LP)',
+                    round(report['relaxed_objective'], 2),
+                    help=(
+                        'Keine Schranke, da die Relaxierung auf aggregierten '
+                        + 'Daten oder nicht bis zur Optimalität gelöst wurde.'
+                        )
+                    )
+            col_ub.metric('Obere Schranke (MILP)', round(report['upper_bound'], 2))
+            if report['gap'] is not None:
+                col_gap.metric('Lücke in %', round(report['gap'] * 100, 2))
+
+    if ss.energy_system.decomposition_report is not None:
+        with tab_pro.expander('Dekomposition'):
+            report = ss.energy_system.decomposition_report
+            col_est, col_ub, col_gap = st.columns(3)
+            col_est.metric(
+                'Schätzung (relaxiert)', round(report['master_estimate'], 2)
+                )
+            col_ub.metric(
+                'Obere Schranke (MILP)', round(report['milp_upper_bound'], 2)
+                )
+            col_gap.metric(
+                'Konvergenzlücke in %', round(report['gap'] * 100, 2)
+                )
+            if report.get('stopped'):
+                st.info(
+                    'Die Dekomposition wurde vorzeitig mit den besten '
+                    + 'Kapazitäten beendet.'
+                    )
+            if report['shortfall'] > 1e-6:
+                st.warning(
+                    'Die Kapazitäten der besten Iteration decken die '
+                    + 'Wärmelast nicht vollständig.'
+                    )
+            st.dataframe(
+                pd.DataFrame(report['iterations']).rename(columns={
+                    'iteration': 'Iteration',
+                    'master_estimate': 'Schätzung Masterproblem',
+                    'evaluated_estimate': 'Beste ausgewertete Schätzung',
+                    'gap': 'Konvergenzlücke',
+                    'time': 'Laufzeit in s'
+                    }),
+                use_container_width=True, hide_index=True
+                )
+
+    if ss.energy_system.race_report is not None:
+        with tab_pro.expander('Solver-Wettlauf'):
+            report = ss.energy_system.race_report
+            st.metric('Schnellste Konfiguration', report['winner'])
+            st.dataframe(
+                pd.DataFrame(report['results']).rename(columns={
+                    'name': 'Konfiguration',
+                    'state': 'Status',
+                    'time': 'Laufzeit in s',
+                    'objective': 'Zielfunktion'
+                    }).drop(columns='logpath', errors='ignore'),
+                use_container_width=True
+                )
+
+    if ss.energy_system.presolve_report:
+        with tab_pro.expander('Verschärfte Schranken'):
+            st.dataframe(
+                pd.DataFrame(ss.energy_system.presolve_report).rename(columns={
+                    'unit': 'Anlage',
+                    'parameter': 'Parameter',
+                    'old': 'Eingabe',
+                    'new': 'Verschärft',
+                    'reason': 'Begründung'
+                    }),
+                use_container_width=True
+                )
+
+    if ss.energy_system.pruning_report:
+        with tab_pro.expander('Modellvereinfachung'):
+            pruning_passes = {
+                'unused_nodes': 'Entfernte ungenutzte Knoten',
+                'convex_flows': 'Flüsse ohne Binärvariablen (Q_rel_min = 0)',
+                'fixed_flows': 'Feste Flüsse als Konstanten'
+                }
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        'Vereinfachung': pruning_passes.get(name, name),
+                        'Anzahl': len(elements),
+                        'Elemente': ', '.join(elements)
+                        }
+                    for name, elements in
+                    ss.energy_system.pruning_report.items()
+                    ]),
+                use_container_width=True, hide_index=True
+                )
+
+    with tab_pro.expander('Solver Log'):
+        logpath = ss.energy_system.logpath
+        if logpath is not None and os.path.exists(logpath):
+            with open(logpath, 'r', encoding='utf-8') as file:
+                solverlog = file.read()
+        else:
+            solverlog = 'Die Ergebnisse wurden aus dem Zwischenspeicher geladen.'
 
         st.text(solverlog)
         st.text(solverlog)
@@ -0,0 +1,155 @@
+from copy import deepcopy
+
+# Units feeding the heat network and the bounds of their capacity
+HEAT_UNITS = ['hp', 'plb', 'eb', 'ccet', 'ice', 'exhs', 'sol']
+CAPACITY_BOUNDS = {'sol': ('A_min', 'A_max'), 'tes': ('Q_min', 'Q_max')}
+
+# Nominal value of the chp internal converter without tightened bounds
+CHP_INTERNAL_MAX = 9999
+
+# Units with a nonconvex heat flow whose permutations are symmetric
+SYMMETRIC_UNITS = ['hp', 'plb', 'eb', 'ccet', 'ice']
+
+
+def capacity_bounds(unit_cat):
+    """Names of the lower and upper capacity bound of a unit category."""
+    return CAPACITY_BOUNDS.get(unit_cat, ('cap_min', 'cap_max'))
+
+
+def charge_limit(unit_params):
+    """Maximum heat flow into a thermal energy storage per time step."""
+    if unit_params['invest_mode']:
+        return unit_params['Q_in_to_cap'] * unit_params['Q_max']
+    # Without investment, the inflow is only limited by the capacity
+    return unit_params['Q_N']
+
+
+def chp_electric_max(param_units):
+    """Maximum electrical output of all chp units."""
+    el_max = 0
+    for unit, unit_params in param_units.items():
+        if unit.rstrip('0123456789') not in ['ccet', 'ice']:
+            continue
+        if unit_params['invest_mode']:
+            cap = unit_params['cap_max']
+        else:
+            cap = unit_params['cap_N']
+        el_max += (
+            cap * unit_params['Q_rel_max']
+            * unit_params['eta_el'] / unit_params['eta_th']
+            )
+    return el_max
+
+
+def tighten_bounds(data, param_units):
+    """Derive tight capacity bounds of the units from the input data.
+
+    As the heat demand is fixed and there is no excess heat sink, no heat
+    unit can deliver more than the peak heat demand plus the maximum charge
+    of all thermal energy storages. Larger capacities of units in invest
+    mode are never optimal, so their upper bound (which is also the big-M
+    of the nonconvex flows) is reduced to this value. The nominal value of
+    the chp internal converter is derived from the electrical output of the
+    chp units.
+
+    Parameters
+    ----------
+
+    data : pandas.DataFrame
+        Input time series including 'heat_demand' and 'solar_heat_flow'.
+
+    param_units : dict
+        Parameters of the units in the energy system.
+
+    Returns
+    -------
+
+    param_units : dict
+        Copy of the unit parameters with tightened bounds.
+
+    chp_el_max : float
+        Nominal value of the chp internal converter.
+
+    report : list
+        Dicts with the unit, the parameter, its old and new value and the
+        reason of each tightened bound.
+    """
+    param_units = deepcopy(param_units)
+    report = []
+
+    heat_max = float(data['heat_demand'].max()) + sum(
+        charge_limit(unit_params)
+        for unit, unit_params in param_units.items()
+        if unit.rstrip('0123456789') == 'tes'
+        )
+
+    for unit, unit_params in param_units.items():
+        unit_cat = unit.rstrip('0123456789')
+        if not unit_params['invest_mode'] or unit_cat not in HEAT_UNITS:
+            continue
+
+        lower, upper = capacity_bounds(unit_cat)
+        if unit_cat == 'sol':
+            solar_max = float(data['solar_heat_flow'].max())
+            if solar_max <= 0:
+                continue
+            bound = heat_max / solar_max
+            reason = 'peak heat demand and storage charge per solar peak'
+        elif unit_cat == 'exhs':
+            bound = heat_max
+            reason = 'peak heat demand and storage charge'
+        else:
+            if unit_params['Q_rel_max'] <= 0:
+                continue
+            bound = heat_max / unit_params['Q_rel_max']
+            reason = 'peak heat demand and storage charge per Q_rel_max'
+
+        bound = max(bound, unit_params[lower])
+        if bound < unit_params[upper]:
+            report.append({
+                'unit': unit, 'parameter': upper, 'old': unit_params[upper],
+                'new': bound, 'reason': reason
+                })
+            unit_params[upper] = bound
+
+    chp_used = any(
+        unit.rstrip('0123456789') in ['ccet', 'ice'] for unit in param_units
+        )
+    chp_el_max = chp_electric_max(param_units)
+    if chp_used and chp_el_max < CHP_INTERNAL_MAX:
+        report.append({
+            'unit': 'chp internal', 'parameter': 'nominal_value',
+            'old': CHP_INTERNAL_MAX, 'new': chp_el_max,
+            'reason': 'electrical output of the chp units'
+            })
+    else:
+        chp_el_max = CHP_INTERNAL_MAX
+
+    return param_units, chp_el_max, report
+
+
+def unit_signature(unit_params):
+    """Hashable signature of the parameters of a unit."""
+    return tuple(sorted(
+        (key, repr(value)) for key, value in unit_params.items()
+        ))
+
+
+def identical_unit_groups(param_units):
+    """Groups of at least two units of the same type and parameters.
+
+    The units of each group are sorted by their number, e.g.
+    [['hp1', 'hp2', 'hp3']].
+    """
+    groups = {}
+    for unit, unit_params in param_units.items():
+        unit_cat = unit.rstrip('0123456789')
+        if unit_cat not in SYMMETRIC_UNITS:
+            continue
+        key = (unit_cat, unit_signature(unit_params))
+        groups.setdefault(key, []).append(unit)
+
+    return [
+        sorted(units, key=lambda u: int(u[len(u.rstrip('0123456789')):] or 0))
+        for units in groups.values() if len(units) > 1
+        ]
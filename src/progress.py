@@ -0,0 +1,248 @@
+import json
+import math
+import os
+import signal
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Column positions counted from the end of the progress lines of the logs
+LOG_COLUMNS = {
+    'HiGHS': {'bound': -8, 'incumbent': -7, 'gap': -6},
+    'Gurobi': {'bound': -4, 'incumbent': -5, 'gap': -3}
+    }
+
+
+def parse_number(token):
+    """Parse a log token like '123.4', '12.3%', 'inf' or '-' as float."""
+    token = token.rstrip('%')
+    if token in ['-', 'Large']:
+        return float('nan')
+    return float(token)
+
+
+def parse_log_line(line, solver):
+    """Parse a branch and bound progress line of a HiGHS or Gurobi log.
+
+    Returns a dict with the elapsed time in seconds, the incumbent objective,
+    the best bound and the gap in percent, or None for all other lines.
+    """
+    tokens = line.split()
+    columns = LOG_COLUMNS[solver]
+    if len(tokens) < -min(columns.values()) or not tokens[-1].endswith('s'):
+        return None
+    if not tokens[columns['gap']].endswith('%'):
+        if not (solver == 'Gurobi' and tokens[columns['gap']] == '-'):
+            return None
+    try:
+        return {
+            'time': float(tokens[-1][:-1]),
+            'incumbent': parse_number(tokens[columns['incumbent']]),
+            'bound': parse_number(tokens[columns['bound']]),
+            'gap': parse_number(tokens[columns['gap']])
+            }
+    except ValueError:
+        return None
+
+
+class SolverProgress():
+    """Progress channel between a running solve and the user interface.
+
+    The progress of HiGHS is recorded through solver callbacks if the
+    installed highspy supports them, otherwise (and for Gurobi) the solver
+    log is tailed on every `poll`. An early stop keeps the current incumbent:
+    HiGHS is interrupted through its callback, Gurobi receives an interrupt
+    signal like from Ctrl+C.
+
+    To follow a solve in another process, the records are appended to a
+    JSON lines file and an early stop is requested by creating a stop file.
+    A monitor thread then polls the log and the stop file.
+
+    Parameters
+    ----------
+
+    interval : float
+        Minimum time in seconds between two records of the callback.
+
+    path : str
+        JSON lines file the records are appended to.
+
+    stop_path : str
+        File whose existence requests an early stop.
+    """
+
+    def __init__(self, interval=1.0, path=None, stop_path=None):
+        self.interval = interval
+        self.path = path
+        self.stop_path = stop_path
+        self.history = []
+        self.solver = None
+        self.logpath = None
+        self.start_time = None
+        self.done = False
+        self.error = None
+        self._offset = 0
+        self._callback = False
+        self._children = set()
+        self._stop = threading.Event()
+        self._monitor_thread = None
+
+    def start(self, logpath, solver):
+        """Reset the progress for a new solve."""
+        self.logpath = logpath
+        self.solver = solver
+        self.start_time = time.time()
+        self.history = []
+        self._offset = 0
+        self._callback = False
+        self._stop.clear()
+        if psutil is not None:
+            self._children = {
+                p.pid for p in psutil.Process().children(recursive=True)
+                }
+        if self.path is not None:
+            open(self.path, 'w').close()
+        if ((self.path is not None or self.stop_path is not None)
+                and self._monitor_thread is None):
+            self._monitor_thread = threading.Thread(
+                target=self._monitor, daemon=True
+                )
+            self._monitor_thread.start()
+
+    def _monitor(self):
+        while not self.done:
+            self.poll()
+            if (self.stop_path is not None and not self._stop.is_set()
+                    and os.path.exists(self.stop_path)):
+                self.request_stop()
+            time.sleep(self.interval)
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+
+    def record(self, incumbent, bound, gap, elapsed=None):
+        if elapsed is None:
+            elapsed = time.time() - self.start_time
+        self._append({
+            'time': elapsed, 'incumbent': incumbent, 'bound': bound,
+            'gap': gap
+            })
+
+    def _append(self, entry):
+        self.history.append(entry)
+        if self.path is not None:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry) + '\n')
+
+    def attach_highs(self, opt):
+        """Register the progress callback at a HiGHS instance.
+
+        Either an appsi HiGHS instance set up with the model beforehand or a
+        `highspy.Highs` object. Returns whether the callback could be
+        registered.
+        """
+        try:
+            import highspy
+            highs = getattr(opt, '_solver_model', opt)
+            if hasattr(highs, 'cbMipInterrupt'):
+                highs.cbMipInterrupt.subscribe(
+                    lambda e: self._highs_callback(e.data_out, e.data_in)
+                    )
+            else:
+                highs.setCallback(
+                    lambda _type, _msg, data_out, data_in, _data: (
+                        self._highs_callback(data_out, data_in)
+                        ),
+                    None
+                    )
+                highs.startCallback(
+                    highspy.cb.HighsCallbackType.kCallbackMipInterrupt
+                    )
+        except (AttributeError, ImportError) as e:
+            print(f'Progress callback could not be passed to HiGHS: {e}')
+            return False
+        self._callback = True
+        return True
+
+    def _highs_callback(self, data_out, data_in):
+        # Only interrupt once there is an incumbent to continue with
+        if self._stop.is_set() and math.isfinite(data_out.mip_primal_bound):
+            data_in.user_interrupt = True
+        last = self.history[-1]['time'] if self.history else -self.interval
+        if data_out.running_time - last >= self.interval:
+            self.record(
+                data_out.mip_primal_bound, data_out.mip_dual_bound,
+                data_out.mip_gap * 100, elapsed=data_out.running_time
+                )
+
+    def poll(self):
+        """Read new progress lines of the log and return the latest record."""
+        if (not self._callback and self.logpath is not None
+                and os.path.exists(self.logpath)):
+            with open(self.logpath, 'rb') as file:
+                file.seek(self._offset)
+                content = file.read()
+            # Keep an incomplete last line for the next poll
+            complete = content.rfind(b'\n') + 1
+            self._offset += complete
+            for line in content[:complete].decode(
+                    'utf-8', errors='replace').splitlines():
+                entry = parse_log_line(line, self.solver)
+                if entry is not None:
+                    self._append(entry)
+        return self.history[-1] if self.history else None
+
+    @property
+    def elapsed(self):
+        if self.start_time is None:
+            return 0
+        return time.time() - self.start_time
+
+    @property
+    def can_stop(self):
+        return self._callback or (
+            self.solver == 'Gurobi' and psutil is not None
+            and hasattr(signal, 'SIGINT')
+            )
+
+    @property
+    def stop_requested(self):
+        return self._stop.is_set()
+
+    def request_stop(self):
+        """Stop the solve early and keep the current incumbent."""
+        self._stop.set()
+        if self.solver == 'Gurobi' and psutil is not None:
+            for child in psutil.Process().children(recursive=True):
+                if child.pid in self._children:
+                    continue
+                try:
+                    child.send_signal(signal.SIGINT)
+                except (psutil.Error, ValueError) as e:
+                    print(f'Solver could not be interrupted: {e}')
+
+    def to_frame(self):
+        return pd.DataFrame(
+            self.history, columns=['time', 'incumbent', 'bound', 'gap']
+            )
+
+
+def read_progress(path):
+    """Read the records of a progress file written by `SolverProgress`."""
+    history = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    # Line is still being written
+                    break
+    return pd.DataFrame(history, columns=['time', 'incumbent', 'bound', 'gap'])
@@ -0,0 +1,255 @@
+import multiprocessing
+import os
+import queue
+import time
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as po
+
+from progress import SolverProgress, read_progress
+from solutions import load_solution_values, solution_values
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Solver configurations raced against each other by default
+RACE_CONFIGS = [
+    {'name': 'highs_default', 'Solver': 'HiGHS', 'options': {}},
+    {'name': 'highs_no_presolve', 'Solver': 'HiGHS',
+     'options': {'presolve': 'off'}},
+    {'name': 'highs_heuristics', 'Solver': 'HiGHS',
+     'options': {'mip_heuristic_effort': 0.3}},
+    {'name': 'highs_parallel', 'Solver': 'HiGHS',
+     'options': {'parallel': 'on'}},
+    {'name': 'gurobi_default', 'Solver': 'Gurobi', 'options': {}},
+    {'name': 'gurobi_feasibility', 'Solver': 'Gurobi',
+     'options': {'MIPFocus': 1}},
+    {'name': 'gurobi_bound', 'Solver': 'Gurobi',
+     'options': {'MIPFocus': 3}}
+    ]
+
+
+def available_configs(configs=RACE_CONFIGS):
+    """Drop the configurations of solvers without installation or license."""
+    solver = po.SolverFactory('gurobi')
+    gurobi = (
+        solver.available(exception_flag=False) and solver.license_is_valid()
+        )
+    return [
+        config for config in configs
+        if config['Solver'] != 'Gurobi' or gurobi
+        ]
+
+
+def race_worker(config, data, param_units, param_opt, workdir, results,
+                stop_path=None):
+    """Build and solve the energy system with a single configuration.
+
+    The solver progress is written to 'progress.jsonl' in the working
+    directory and the solve stops early with its incumbent once the file
+    `stop_path` exists.
+    """
+    # Imported here to avoid a circular import with model
+    from model import EnergySystem
+    from workspace import Workspace
+
+    param_opt = deepcopy(param_opt)
+    param_opt['Solver'] = config['Solver']
+    param_opt['solver_options'] = config['options']
+    param_opt['solve_strategy'] = None
+    # The solution is loaded into the pyomo model of the energy system
+    param_opt['backend'] = None
+
+    progress = SolverProgress(
+        path=os.path.join(workdir, 'progress.jsonl'), stop_path=stop_path
+        )
+    start = time.perf_counter()
+    try:
+        energy_system = EnergySystem(
+            data, param_units, param_opt, workspace=Workspace(path=workdir)
+            )
+        energy_system.progress = progress
+        energy_system.run_model()
+        results.put({
+            'name': config['name'],
+            'state': 'finished',
+            'time': time.perf_counter() - start,
+            'objective': energy_system.objective_value(),
+            'gap': energy_system.mip_gap,
+            'logpath': energy_system.logpath,
+            'values': solution_values(energy_system.model)
+            })
+    except Exception as e:
+        results.put({
+            'name': config['name'],
+            'state': 'failed',
+            'time': time.perf_counter() - start,
+            'error': repr(e)
+            })
+    finally:
+        progress.finish()
+
+
+def within_gap(result, mip_gap):
+    """Whether a worker proved its solution to be within the MIP gap."""
+    return (
+        result['state'] == 'finished' and result.get('gap') is not None
+        and result['gap'] <= mip_gap + 1e-9
+        )
+
+
+def follow_workers(progress, workdirs, stop_path):
+    """Record the best incumbent and bound of all workers so far.
+
+    A stop requested through the progress is passed on to the workers by
+    creating the file `stop_path`.
+    """
+    if progress.stop_requested and not os.path.exists(stop_path):
+        open(stop_path, 'w').close()
+
+    latest = []
+    for workdir in workdirs:
+        history = read_progress(os.path.join(workdir, 'progress.jsonl'))
+        if not history.empty:
+            latest.append(history.iloc[-1])
+    if not latest:
+        return
+    latest = pd.DataFrame(latest)
+    incumbent = latest['incumbent'].min()
+    bound = latest['bound'].max()
+    gap = (
+        (incumbent - bound) / abs(incumbent) * 100
+        if np.isfinite(incumbent) and np.isfinite(bound) and incumbent != 0
+        else float('nan')
+        )
+    progress.record(incumbent, bound, gap)
+
+
+def terminate(process):
+    """Terminate a worker process including its solver subprocesses."""
+    if psutil is not None:
+        try:
+            for child in psutil.Process(process.pid).children(recursive=True):
+                child.kill()
+        except psutil.Error:
+            pass
+    process.terminate()
+    process.join()
+
+
+def race(energy_system, configs=None, workers=None):
+    """Solve the model of an energy system with several racing solvers.
+
+    Each configuration builds and solves the model in a worker process with
+    the same `MIPGap` and `TimeLimit`. The race is decided by the first
+    worker whose solution is within the `MIPGap`, all other workers are
+    terminated then. Solutions with a larger gap, e.g. after the time limit,
+    do not decide the race, but the best of them is used if no worker
+    reaches the gap. The chosen solution is loaded into the model of the
+    energy system.
+
+    If the energy system has a solver progress, the best incumbent and
+    bound of all workers are recorded in it and an early stop requested
+    through it stops all workers with their incumbents.
+
+    Parameters
+    ----------
+
+    energy_system : model.EnergySystem
+        Energy system with a built model.
+
+    configs : list
+        Dicts with the 'name', the 'Solver' and additional solver 'options'
+        of each configuration. Defaults to the available configurations of
+        `RACE_CONFIGS`.
+
+    workers : int
+        Maximum number of racing processes. Defaults to the number of cores.
+
+    Returns
+    -------
+
+    report : dict
+        Name of the winning configuration and the results (incl. the
+        objective and the gap) of all workers that ended before the race was
+        decided.
+    """
+    if configs is None:
+        configs = available_configs()
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = cpu_count
+    configs = configs[:max(1, workers)]
+
+    param_opt = deepcopy(energy_system.param_opt)
+    param_opt['Threads'] = max(1, cpu_count // len(configs))
+
+    workdirs = [
+        energy_system.subspace(config['name']).path for config in configs
+        ]
+    stop_path = energy_system.workspace.file('race_stop')
+    if os.path.exists(stop_path):
+        os.remove(stop_path)
+    progress = energy_system.progress
+    if progress is not None:
+        progress.start(None, 'Race')
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = {}
+    for config, workdir in zip(configs, workdirs):
+        process = context.Process(
+            target=race_worker,
+            args=(
+                config, energy_system.data, energy_system.param_units,
+                param_opt, workdir, results, stop_path
+                ),
+            daemon=True
+            )
+        process.start()
+        processes[config['name']] = process
+
+    report = {'winner': None, 'results': []}
+    best = None
+    try:
+        while len(report['results']) < len(processes):
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if progress is not None:
+                    follow_workers(progress, workdirs, stop_path)
+                if not any(p.is_alive() for p in processes.values()):
+                    break
+                continue
+
+            values = result.pop('values', None)
+            report['results'].append(result)
+            if result['state'] != 'finished':
+                continue
+            if best is None or result['objective'] < best[0]['objective']:
+                best = (result, values)
+            if within_gap(result, param_opt['MIPGap']):
+                break
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                terminate(process)
+
+    if best is not None:
+        result, values = best
+        report['winner'] = result['name']
+        load_solution_values(energy_system.model, values)
+        energy_system.logpath = result['logpath']
+        energy_system.mip_gap = result['gap']
+
+    if report['winner'] is None:
+        errors = '; '.join(
+            f'{r["name"]}: {r.get("error")}' for r in report['results']
+            )
+        raise RuntimeError(f'No racing solver found a solution. {errors}')
+
+    return report
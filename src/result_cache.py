@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from workspace import atomic_write
+
+# Increase to invalidate all cached results after changes of the model
+CACHE_VERSION = 1
+
+# Optimization parameters that only tune the solver, e.g. set by the job
+# manager depending on its number of workers
+SOLVER_ONLY_PARAMS = ['Threads', 'warm_start']
+
+
+def cache_key(data, param_units, param_opt, solver_options=None):
+    """Stable hash of all inputs that determine the results of a run.
+
+    Parameters
+    ----------
+
+    data : pandas.DataFrame
+        Input time series of the energy system.
+
+    param_units : dict
+        Parameters of the units in the energy system.
+
+    param_opt : dict
+        Optimization parameters. The parameters in `SOLVER_ONLY_PARAMS` are
+        not part of the key.
+
+    solver_options : dict
+        Additional solver options not included in `param_opt`.
+    """
+    digest = hashlib.sha256()
+    digest.update(str(CACHE_VERSION).encode('utf-8'))
+    digest.update(
+        pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes()
+        )
+    digest.update(
+        json.dumps(
+            {
+                'columns': [str(col) for col in data.columns],
+                'param_units': param_units,
+                'param_opt': {
+                    key: value for key, value in param_opt.items()
+                    if key not in SOLVER_ONLY_PARAMS
+                    },
+                'solver_options': solver_options
+                },
+            sort_keys=True, default=str
+            ).encode('utf-8')
+        )
+    return digest.hexdigest()
+
+
+class ResultCache():
+    """Size bounded on-disk cache of optimization results.
+
+    Each entry is a single pickle file named by its key. Entries are written
+    to a temporary file and atomically moved into place, so that concurrent
+    readers never see partial entries. Reading an entry updates its
+    modification time, which is used for the least recently used eviction.
+
+    Parameters
+    ----------
+
+    path : str
+        Directory of the cache. Defaults to 'cache' next to this module.
+
+    max_size : int
+        Maximum total size of all entries in bytes.
+    """
+
+    def __init__(self, path=None, max_size=2 * 1024**3):
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), 'cache')
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path, exist_ok=True)
+
+    def filepath(self, key):
+        return os.path.join(self.path, f'{key}.pkl')
+
+    def load(self, key):
+        """Return the cached results of the key or None."""
+        filepath = self.filepath(key)
+        try:
+            with open(filepath, 'rb') as file:
+                payload = pickle.load(file)
+            os.utime(filepath)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return payload
+
+    def store(self, key, payload):
+        """Add the results of a run to the cache and evict old entries."""
+        atomic_write(
+            self.filepath(key),
+            pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+            )
+
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries beyond the maximum size."""
+        entries = []
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.pkl'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, filepath in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(filepath)
+            except OSError:
+                # Already evicted by another process or still opened
+                continue
+            total_size -= size
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+import pyomo.environ as po
+
+from workspace import atomic_write
+
+SOLUTION_VARS = ['flow', 'status', 'status_nominal', 'invest', 'total',
+                 'storage_content']
+
+# Unit parameters that change the variables of a unit in the model
+STRUCTURAL_UNIT_PARAMS = ['invest_mode']
+
+logger = logging.getLogger(__name__)
+
+
+def solution_values(model, components=SOLUTION_VARS):
+    """Collect the values of the model's variables by their names.
+
+    Parameters
+    ----------
+
+    model : pyomo.core.base.PyomoModel.ConcreteModel
+        Solved model, e.g. an oemof.solph.Model.
+
+    components : list
+        Local names of the variable components to collect. If None, all
+        variables are collected.
+    """
+    values = {}
+    for var in model.component_data_objects(po.Var, descend_into=True):
+        if var.value is None:
+            continue
+        if (components is None
+                or var.parent_component().local_name in components):
+            values[var.name] = var.value
+    return values
+
+
+def load_solution_values(model, values, tol=1e-6):
+    """Assign variable values by name and return the number of assignments.
+
+    Variables of the model without a value in `values` stay untouched, so
+    that solutions of slightly different models can be mapped onto each
+    other. Fixed variables and values outside the bounds of a variable (e.g.
+    after a change of the units' capacities) are skipped as well.
+    """
+    nr_assigned = 0
+    for var in model.component_data_objects(po.Var, descend_into=True):
+        value = values.get(var.name)
+        if value is None or var.fixed:
+            continue
+        if var.lb is not None and value < var.lb - tol:
+            continue
+        if var.ub is not None and value > var.ub + tol:
+            continue
+        var.set_value(value, skip_validation=True)
+        nr_assigned += 1
+    return nr_assigned
+
+
+class WarmStartStore():
+    """Persist the last solution of each energy system topology.
+
+    The topology is identified by the unit labels and their structural
+    parameters, so that re-runs with changed prices, demands or bounds start
+    from the last solution. Stored values that are infeasible for the new
+    model are skipped by `load_solution_values`. Solutions are stored as
+    gzipped JSON mapping variable names to their values.
+
+    Parameters
+    ----------
+
+    path : str
+        Directory of the stored solutions. Defaults to 'warmstart' next to
+        this module.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(os.path.dirname(__file__), 'warmstart')
+        self.path = os.path.abspath(path)
+
+    def filepath(self, param_units):
+        topology = json.dumps(
+            {
+                unit: {
+                    param: unit_params.get(param)
+                    for param in STRUCTURAL_UNIT_PARAMS
+                    }
+                for unit, unit_params in param_units.items()
+                },
+            sort_keys=True
+            )
+        key = hashlib.sha256(topology.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.path, f'{key}.json.gz')
+
+    def load(self, param_units):
+        """Return the stored solution of the topology or None."""
+        filepath = self.filepath(param_units)
+        if not os.path.exists(filepath):
+            return None
+        try:
+            with gzip.open(filepath, 'rt', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning('Warm start could not be read: %s', e)
+            return None
+
+    def save(self, param_units, model):
+        """Store the solution of the model for its topology."""
+        values = solution_values(model)
+        if not values:
+            return
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path, exist_ok=True)
+
+        atomic_write(
+            self.filepath(param_units),
+            gzip.compress(json.dumps(values).encode('utf-8'))
+            )
@@ -0,0 +1,175 @@
+import itertools
+import numbers
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+
+import pandas as pd
+
+from model import EnergySystem
+from workspace import Workspace
+
+
+def scenario_grid(param_opt=None, param_units=None, data=None):
+    """Build all combinations of parameter overrides.
+
+    Parameters
+    ----------
+
+    param_opt : dict
+        Lists of values per optimization parameter, e.g.
+        {'heat_price': [70, 80]}.
+
+    param_units : dict
+        Lists of values per unit parameter keyed by unit label, e.g.
+        {'hp1': {'cop': [3.0, 3.5]}, 'tes1': {'Q_N': [2000, 5000]}}.
+
+    data : dict
+        Lists of scaling factors or replacement series per input time series,
+        e.g. {'co2_price': [1.0, 1.5, 2.0]}.
+
+    Returns
+    -------
+
+    scenarios : list
+        One dict of overrides per combination as expected by `run_sweep`.
+    """
+    axes = []
+    for key, values in (param_opt or {}).items():
+        axes.append((('param_opt', key), values))
+    for unit, unit_params in (param_units or {}).items():
+        for key, values in unit_params.items():
+            axes.append((('param_units', unit, key), values))
+    for key, values in (data or {}).items():
+        axes.append((('data', key), values))
+
+    scenarios = []
+    for combination in itertools.product(*[values for _, values in axes]):
+        scenario = {'param_opt': {}, 'param_units': {}, 'data': {}}
+        for (path, _), value in zip(axes, combination):
+            if path[0] == 'param_units':
+                scenario['param_units'].setdefault(path[1], {})[path[2]] = (
+                    value
+                    )
+            else:
+                scenario[path[0]][path[1]] = value
+        scenarios.append(scenario)
+
+    return scenarios
+
+
+def apply_scenario(data, param_units, param_opt, scenario):
+    """Return copies of the input parameters with the overrides applied.
+
+    Scalar overrides of time series are applied as scaling factor, all other
+    overrides replace the series.
+    """
+    data = data.copy()
+    for col, value in scenario.get('data', {}).items():
+        if isinstance(value, numbers.Real):
+            data[col] = data[col] * value
+        else:
+            data[col] = pd.Series(value, index=data.index)
+
+    param_units = deepcopy(param_units)
+    for unit, unit_params in scenario.get('param_units', {}).items():
+        param_units[unit].update(unit_params)
+
+    param_opt = deepcopy(param_opt)
+    param_opt.update(scenario.get('param_opt', {}))
+
+    return data, param_units, param_opt
+
+
+def scenario_labels(scenario):
+    """Flatten the overrides of a scenario into table columns."""
+    labels = {}
+    for key, value in scenario.get('param_opt', {}).items():
+        labels[f'param_opt.{key}'] = value
+    for unit, unit_params in scenario.get('param_units', {}).items():
+        for key, value in unit_params.items():
+            labels[f'param_units.{unit}.{key}'] = value
+    for key, value in scenario.get('data', {}).items():
+        labels[f'data.{key}'] = (
+            value if isinstance(value, numbers.Real) else 'custom'
+            )
+    return labels
+
+
+def run_scenario(nr, data, param_units, param_opt, scenario):
+    """Optimize a single scenario and return its key results as dict."""
+    row = {'scenario': nr, **scenario_labels(scenario)}
+    try:
+        with Workspace(prefix='scenario') as workspace:
+            energy_system = EnergySystem(
+                *apply_scenario(data, param_units, param_opt, scenario),
+                workspace=workspace
+                )
+            energy_system.run_model()
+            energy_system.run_postprocessing()
+    except Exception as e:
+        row['error'] = repr(e)
+        return row
+
+    row.update(energy_system.key_params)
+    row.update(energy_system.data_caps.iloc[0].to_dict())
+    return row
+
+
+def run_sweep(data, param_units, param_opt, scenarios, workers=None):
+    """Optimize a list of scenarios in parallel processes.
+
+    The solver threads of each run are limited, so that the worker processes
+    share the available cores instead of competing for them.
+
+    Parameters
+    ----------
+
+    data : pandas.DataFrame
+        Input time series of the base scenario.
+
+    param_units : dict
+        Unit parameters of the base scenario.
+
+    param_opt : dict
+        Optimization parameters of the base scenario.
+
+    scenarios : list
+        Overrides of each scenario, e.g. as returned by `scenario_grid`.
+
+    workers : int
+        Number of worker processes. Defaults to the number of cores.
+
+    Returns
+    -------
+
+    results : pandas.DataFrame
+        One row per scenario with its overrides, the key parameters and the
+        unit capacities. Failed runs hold the exception in column 'error'.
+    """
+    if not scenarios:
+        return pd.DataFrame(index=pd.Index([], name='scenario'))
+
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = cpu_count
+    workers = max(1, min(workers, len(scenarios)))
+
+    param_opt = deepcopy(param_opt)
+    param_opt.setdefault('Threads', max(1, cpu_count // workers))
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                run_scenario, nr, data, param_units, param_opt, scenario
+                )
+            for nr, scenario in enumerate(scenarios)
+            ]
+        for future in as_completed(futures):
+            rows.append(future.result())
+
+    results = pd.DataFrame(rows)
+    results.sort_values('scenario', inplace=True)
+    results.set_index('scenario', inplace=True)
+    return results
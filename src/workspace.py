@@ -0,0 +1,101 @@
+import os
+import shutil
+import time
+import uuid
+
+WORKSPACE_ROOT = os.path.join(os.path.dirname(__file__), 'workspaces')
+
+
+def atomic_write(filepath, content):
+    """Write text or bytes to a temporary file and move it into place.
+
+    Readers of the file either see the previous or the complete new content,
+    never a partially written file.
+    """
+    tmppath = f'{filepath}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp'
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    encoding = None if isinstance(content, bytes) else 'utf-8'
+    try:
+        with open(tmppath, mode, encoding=encoding) as file:
+            file.write(content)
+        os.replace(tmppath, filepath)
+    finally:
+        if os.path.exists(tmppath):
+            os.remove(tmppath)
+
+
+class Workspace():
+    """Working directory of a single run or session.
+
+    Each workspace is a directory with a unique id, so that concurrent runs
+    and sessions never write to the same files. Workspaces are removed with
+    `cleanup` or, if forgotten, by `cleanup_workspaces` after some time.
+
+    Parameters
+    ----------
+
+    path : str
+        Existing or new directory to use as workspace. If None, a new
+        directory is created below `root`.
+
+    root : str
+        Parent directory of new workspaces. Defaults to 'workspaces' next to
+        this module.
+
+    prefix : str
+        Prefix of the directory name of new workspaces, e.g. 'run'.
+
+    workspace_id : str
+        Id of the workspace. Defaults to a random unique id.
+    """
+
+    def __init__(self, path=None, root=None, prefix='run', workspace_id=None):
+        if path is None:
+            if workspace_id is None:
+                workspace_id = uuid.uuid4().hex
+            path = os.path.join(
+                root or WORKSPACE_ROOT, f'{prefix}_{workspace_id}'
+                )
+        self.path = os.path.abspath(path)
+        self.id = os.path.basename(self.path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def file(self, name):
+        """Absolute path of a file in the workspace."""
+        return os.path.join(self.path, name)
+
+    def write(self, name, content):
+        """Atomically write text or bytes to a file of the workspace."""
+        filepath = self.file(name)
+        atomic_write(filepath, content)
+        return filepath
+
+    def subspace(self, name):
+        """Workspace in a subdirectory, e.g. for a sub-run."""
+        return Workspace(path=self.file(name))
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+def cleanup_workspaces(root=None, max_age=24*3600):
+    """Delete workspaces that have not been modified for max_age seconds."""
+    root = root or WORKSPACE_ROOT
+    if not os.path.exists(root):
+        return
+    now = time.time()
+    for entry in os.scandir(root):
+        if not entry.is_dir():
+            continue
+        try:
+            mtime = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if now - mtime > max_age:
+            shutil.rmtree(entry.path, ignore_errors=True)
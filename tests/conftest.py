@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model import EnergySystem  # noqa: E402
+from sample_inputs import (  # noqa: E402
+    sample_data, sample_param_opt, sample_units
+    )
+from workspace import Workspace  # noqa: E402
+
+
+@pytest.fixture
+def build_energy_system(tmp_path):
+    """Factory of energy systems of sample units on sample data.
+
+    The optimization parameters are those of `sample_param_opt`, e.g. with
+    warm starts disabled, updated by additional keyword arguments. Solver
+    logs are written to a temporary workspace.
+    """
+    def build(unit_cats, invest=False, hours=48, param_units=None, data=None,
+              **options):
+        return EnergySystem(
+            sample_data(hours) if data is None else data,
+            param_units or sample_units(unit_cats, invest=invest),
+            sample_param_opt(**options),
+            workspace=Workspace(path=str(tmp_path / 'workspace'))
+            )
+    return build
+
+
+@pytest.fixture
+def run_energy_system(build_energy_system):
+    """Factory of solved and postprocessed energy systems."""
+    def run(unit_cats, **kwargs):
+        energy_system = build_energy_system(unit_cats, **kwargs)
+        energy_system.run_model()
+        energy_system.run_postprocessing()
+        return energy_system
+    return run
@@ -0,0 +1,100 @@
+"""Inputs of the energy systems used by the tests.
+
+The inputs are independent of the benchmark suite, so that changes of its
+cases or defaults do not change the tested systems. All optimization
+options the model reads are set explicitly.
+"""
+import json
+import os
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+INPUT_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'input')
+
+
+def sample_data(hours, seed=42, start='2023-01-01'):
+    """Hourly input data with seasonal and daily patterns."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(hours)
+    day = 2 * np.pi * (t % 24) / 24
+    year = 2 * np.pi * t / 8760
+
+    heat_demand = (
+        150 + 90 * np.cos(year) + 20 * np.sin(day - np.pi / 2)
+        + rng.normal(0, 5, hours)
+        ).clip(min=20)
+    el_spot_price = (
+        80 + 30 * np.sin(day - np.pi / 2) + rng.normal(0, 15, hours)
+        )
+    solar_heat_flow = (
+        np.sin(day - np.pi / 2).clip(min=0) * (0.6 - 0.4 * np.cos(year))
+        * 5e-4
+        )
+
+    return pd.DataFrame(
+        {
+            'heat_demand': heat_demand,
+            'el_spot_price': el_spot_price,
+            'ef_om': 0.4 + 0.1 * np.sin(day) + rng.normal(0, 0.02, hours),
+            'gas_price': 40 + rng.normal(0, 2, hours),
+            'co2_price': np.full(hours, 80.0),
+            'solar_heat_flow': solar_heat_flow
+            },
+        index=pd.date_range(start, periods=hours, freq='h')
+        )
+
+
+def sample_units(unit_cats, invest=False):
+    """Unit parameters from the shipped unit type templates.
+
+    Units of the same type are numbered consecutively.
+    """
+    with open(os.path.join(INPUT_PATH, 'param_units.json'), 'r',
+              encoding='utf-8') as file:
+        templates = json.load(file)
+
+    param_units = {}
+    counts = {}
+    for unit_cat in unit_cats:
+        counts[unit_cat] = counts.get(unit_cat, 0) + 1
+        unit_params = deepcopy(templates[unit_cat])
+        unit_params['invest_mode'] = invest
+        param_units[f'{unit_cat}{counts[unit_cat]}'] = unit_params
+    return param_units
+
+
+def sample_param_opt(**options):
+    """Optimization parameters solved to a tight gap with HiGHS.
+
+    Keyword arguments update the parameters.
+    """
+    param_opt = {
+        'Solver': 'HiGHS',
+        'MIPGap': 1e-6,
+        'TimeLimit': 600,
+        'solver_options': None,
+        'ef_gas': 0.2012,
+        'elec_consumer_charges_grid': 52.52,
+        'elec_consumer_charges_self': 20.50,
+        'heat_price': 76.74,
+        'energy_tax': 5.50,
+        'TEHG_bonus': 3.0,
+        'vNNE': 7.0,
+        'capital_interest': 0.05,
+        'lifetime': 20,
+        'warm_start': False,
+        'tighten_bounds': True,
+        'symmetry_breaking': True,
+        'prune_model': True,
+        'fast_results': True,
+        'backend': None,
+        'solve_strategy': None,
+        'two_stage_rounding': 0,
+        'aggregation': None,
+        'rolling_horizon': None,
+        'decomposition': None
+        }
+    param_opt.update(options)
+    return param_opt
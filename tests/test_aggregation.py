@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from sample_inputs import sample_units
+
+HOURS = 24 * 14
+
+
+@pytest.mark.parametrize('invest', [False, True])
+def test_aggregated_storage(run_energy_system, invest):
+    energy_system = run_energy_system(
+        ['hp', 'plb', 'tes'], invest=invest, hours=HOURS,
+        aggregation={'n_typical': 3, 'period': 'day'}
+        )
+
+    content = energy_system.data_all['storage_content_tes1']
+    capacity = energy_system.data_caps['cap_tes1'].iloc[0]
+    assert len(content) == HOURS
+    assert content.min() >= -1e-6
+    assert content.max() <= capacity + 1e-6
+
+    validation = energy_system.validate_aggregation()
+    assert math.isfinite(validation['objective_rel_error'])
+
+
+@pytest.mark.parametrize('invest', [False, True])
+def test_aggregated_storage_loss(run_energy_system, invest):
+    loss = 0.01
+    param_units = sample_units(['hp', 'plb', 'tes'], invest=invest)
+    param_units['tes1']['Q_rel_loss'] = loss
+    # A charged storage at the start carries content over the periods
+    param_units['tes1']['init_storage'] = 0.5
+    param_units['tes1']['balanced'] = False
+    energy_system = run_energy_system(
+        ['hp', 'plb', 'tes'], param_units=param_units, hours=HOURS,
+        aggregation={'n_typical': 3, 'period': 'day'}
+        )
+
+    # The expanded content follows the storage balance of every hour,
+    # including the transitions between the periods
+    data = energy_system.data_all
+    content = data['storage_content_tes1'].to_numpy()
+    balance = (
+        content[:-1] * (1 - loss)
+        + data['Q_in_tes1'].to_numpy()[:-1]
+        - data['Q_out_tes1'].to_numpy()[:-1]
+        )
+    assert content[1:] == pytest.approx(balance, abs=1e-4)
+
+    capacity = energy_system.data_caps['cap_tes1'].iloc[0]
+    assert content.min() >= -1e-6
+    assert content.max() <= capacity + 1e-6
+
+
+@pytest.mark.parametrize('backend', [None, 'matrix'])
+def test_storage_content_time_points(run_energy_system, backend):
+    # The content refers to the time points in dispatch and invest mode
+    dispatch = run_energy_system(['hp', 'plb', 'tes'], backend=backend)
+    invest = run_energy_system(
+        ['hp', 'plb', 'tes'], invest=True, backend=backend
+        )
+    for energy_system in [dispatch, invest]:
+        data = energy_system.data_all
+        content = data['storage_content_tes1'].to_numpy()
+        loss = energy_system.param_units['tes1']['Q_rel_loss']
+        balance = (
+            content[:-1] * (1 - loss)
+            + data['Q_in_tes1'].to_numpy()[:-1]
+            - data['Q_out_tes1'].to_numpy()[:-1]
+            )
+        assert len(data) == 49
+        assert content[1:] == pytest.approx(balance, abs=1e-4)
@@ -0,0 +1,65 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from bundles import (RESULT_FILES, arrow_to_frame, energy_system_bundle,
+                     frame_to_arrow, read_bundle_frame,
+                     read_energy_system_bundle, results_bundle)
+from sample_inputs import sample_data, sample_param_opt, sample_units
+
+
+@pytest.mark.parametrize('fmt', ['arrow', 'csv'])
+def test_energy_system_round_trip(fmt):
+    data = sample_data(48)
+    param_opt = sample_param_opt()
+    param_units = sample_units(['hp', 'plb', 'tes'], invest=True)
+
+    bundle = energy_system_bundle(data, param_opt, param_units, fmt=fmt)
+    read_data, read_opt, read_units = read_energy_system_bundle(
+        io.BytesIO(bundle)
+        )
+
+    pd.testing.assert_frame_equal(read_data, data, check_freq=False)
+    assert read_opt == param_opt
+    assert read_units == param_units
+
+
+def test_results_round_trip(run_energy_system):
+    energy_system = run_energy_system(['hp', 'plb', 'tes'], invest=True)
+    key_params = pd.DataFrame(energy_system.key_params, index=[0])
+
+    bundle = results_bundle(
+        energy_system.data_all, energy_system.data_caps, key_params
+        )
+    with zipfile.ZipFile(io.BytesIO(bundle), 'r') as z:
+        assert sorted(z.namelist()) == sorted(
+            f'{name}.arrow' for name in RESULT_FILES.values()
+            )
+        data_all = read_bundle_frame(z, RESULT_FILES['data_all'])
+        caps = read_bundle_frame(z, RESULT_FILES['caps'])
+        read_params = read_bundle_frame(z, RESULT_FILES['key_params'])
+
+    pd.testing.assert_frame_equal(
+        data_all, energy_system.data_all, check_freq=False
+        )
+    pd.testing.assert_frame_equal(caps, energy_system.data_caps)
+    pd.testing.assert_frame_equal(read_params, key_params)
+
+
+def test_arrow_frame_from_file(tmp_path):
+    data = sample_data(24)
+    path = tmp_path / 'data.arrow'
+    path.write_bytes(frame_to_arrow(data, compression=None).to_pybytes())
+
+    pd.testing.assert_frame_equal(
+        arrow_to_frame(str(path)), data, check_freq=False
+        )
+
+
+def test_missing_frame():
+    bundle = energy_system_bundle(sample_data(24), {}, {})
+    with zipfile.ZipFile(io.BytesIO(bundle), 'r') as z:
+        with pytest.raises(KeyError):
+            read_bundle_frame(z, 'data_output')
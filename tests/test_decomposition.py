@@ -0,0 +1,53 @@
+from progress import SolverProgress
+
+HOURS = 24 * 59
+
+
+def run_benders(build_energy_system, progress):
+    energy_system = build_energy_system(
+        ['hp', 'plb'], invest=True, hours=HOURS,
+        solve_strategy='decomposition',
+        decomposition={'period': 'month', 'gap': 1e-4, 'workers': 2}
+        )
+    energy_system.progress = progress
+    energy_system.run_model()
+    energy_system.run_postprocessing()
+    return energy_system
+
+
+def test_benders_progress(build_energy_system):
+    progress = SolverProgress()
+    energy_system = run_benders(build_energy_system, progress)
+
+    report = energy_system.decomposition_report
+    assert not report['stopped']
+    assert len(progress.history) == len(report['iterations'])
+    assert progress.history[-1]['gap'] == report['gap'] * 100
+    assert energy_system.profile.stages['benders_master']['calls'] == len(
+        report['iterations']
+        )
+
+
+def test_benders_stop(build_energy_system, tmp_path):
+    stop_path = tmp_path / 'stop'
+    stop_path.touch()
+    progress = SolverProgress(interval=0.1, stop_path=str(stop_path))
+    energy_system = run_benders(build_energy_system, progress)
+
+    # The first iteration is completed to have capacities to continue with
+    report = energy_system.decomposition_report
+    assert report['stopped']
+    assert len(report['iterations']) == 1
+    progress.finish()
+
+
+def test_benders_estimates(build_energy_system):
+    energy_system = run_benders(build_energy_system, None)
+    report = energy_system.decomposition_report
+    assert report['gap'] <= 1e-4
+    assert report['evaluated_estimate'] >= report['master_estimate'] - 1e-6
+
+    # Only the MILP dispatch at the capacities bounds the full problem
+    full = build_energy_system(['hp', 'plb'], invest=True, hours=HOURS)
+    full.run_model()
+    assert report['milp_upper_bound'] >= full.objective_value() - 1e-6
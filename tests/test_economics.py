@@ -0,0 +1,125 @@
+import pandas as pd
+import pytest
+
+from economics import LCOH, Economics
+
+
+def reference_econ_params(energy_system):
+    """Key parameters as calculated cell by cell before Economics."""
+    data_all = energy_system.data_all
+    data = energy_system.data
+    param_opt = energy_system.param_opt
+
+    cost_df = pd.DataFrame()
+    for unit, unit_params in energy_system.param_units.items():
+        unit_cat = unit.rstrip('0123456789')
+        E_N = energy_system.data_caps.loc[0, f'cap_{unit}']
+        add_cost = 0
+        if unit_cat == 'plb':
+            add_cost = param_opt['energy_tax']
+            label = f'Q_{unit}'
+        elif unit_cat == 'hp':
+            label = f'Q_out_{unit}'
+        elif unit_cat == 'tes':
+            label = f'Q_in_{unit}'
+        elif unit_cat in ['ccet', 'ice']:
+            label = f'P_{unit}'
+            E_N = E_N / unit_params['eta_th'] * unit_params['eta_el']
+        else:
+            label = f'Q_{unit}'
+
+        cost_df.loc['invest', unit] = unit_params['inv_spez'] * E_N
+        cost_df.loc['op_cost_fix', unit] = unit_params['op_cost_fix'] * E_N
+        cost_df.loc['op_cost_var', unit] = (
+            (unit_params['op_cost_var'] + add_cost) * data_all[label].sum()
+            )
+        cost_df.loc['op_cost', unit] = (
+            cost_df.loc['op_cost_fix', unit]
+            + cost_df.loc['op_cost_var', unit]
+            )
+
+    def total(column, price):
+        if column not in data_all.columns:
+            return 0
+        return (data_all[column] * price).sum()
+
+    key_params = {
+        'op_cost_total': cost_df.loc['op_cost'].sum(),
+        'invest_total': cost_df.loc['invest'].sum(),
+        'cost_gas': total(
+            'H_source',
+            data['gas_price'] + data['co2_price'] * param_opt['ef_gas']
+            ),
+        'cost_el_grid': total(
+            'P_source',
+            data['el_spot_price'] + param_opt['elec_consumer_charges_grid']
+            ),
+        'cost_el_internal': total(
+            'P_internal', param_opt['elec_consumer_charges_self']
+            ),
+        'revenues_spotmarket': total(
+            'P_spotmarket', data['el_spot_price'] + param_opt['vNNE']
+            ),
+        'total_heat_demand': data_all['Q_demand'].sum()
+        }
+    key_params['cost_el'] = (
+        key_params['cost_el_grid'] + key_params['cost_el_internal']
+        )
+    key_params['cost_total'] = (
+        key_params['op_cost_total'] + key_params['cost_gas']
+        + key_params['cost_el']
+        )
+    key_params['revenues_heat'] = (
+        key_params['total_heat_demand'] * param_opt['heat_price']
+        )
+    key_params['revenues_total'] = (
+        key_params['revenues_spotmarket'] + key_params['revenues_heat']
+        )
+    key_params['balance_total'] = (
+        key_params['revenues_total'] - key_params['cost_total']
+        )
+    key_params['LCOH'] = LCOH(
+        key_params['invest_total'], key_params['cost_total'],
+        key_params['total_heat_demand'],
+        revenue=key_params['revenues_spotmarket'],
+        i=param_opt['capital_interest'], n=param_opt['lifetime']
+        )
+    return cost_df, key_params
+
+
+@pytest.mark.parametrize('unit_cats, invest', [
+    (['hp', 'plb', 'tes'], False),
+    (['ccet', 'hp', 'plb', 'tes'], True),
+    (['ice', 'eb', 'sol', 'exhs'], True)
+    ])
+def test_econ_params_match_reference(run_energy_system, unit_cats, invest):
+    energy_system = run_energy_system(unit_cats, invest=invest)
+    cost_df, key_params = reference_econ_params(energy_system)
+
+    pd.testing.assert_frame_equal(
+        energy_system.cost_df, cost_df, check_exact=False, rtol=1e-9
+        )
+    for key, value in key_params.items():
+        assert energy_system.key_params[key] == pytest.approx(
+            value, rel=1e-9, abs=1e-9
+            ), key
+
+
+def test_evaluate_stacked_runs(run_energy_system):
+    runs = [
+        run_energy_system(['hp', 'plb', 'tes'], invest=True, hours=hours)
+        for hours in [24, 24]
+        ]
+    runs[1].data_all['Q_plb1'] *= 2
+    economics = Economics(runs[0].param_units, runs[0].param_opt)
+
+    _, stacked = economics.evaluate(
+        [run.data_all for run in runs], [run.data_caps for run in runs],
+        runs[0].data
+        )
+    for nr, run in enumerate(runs):
+        _, single = economics.evaluate(run.data_all, run.data_caps, run.data)
+        pd.testing.assert_series_equal(
+            stacked.iloc[nr], single.iloc[0], check_names=False
+            )
+    assert stacked.loc[1, 'op_cost_total'] > stacked.loc[0, 'op_cost_total']
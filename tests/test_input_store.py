@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import input_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Input store on a small two year dataset in a temporary directory."""
+    input_path = tmp_path / 'input'
+    input_path.mkdir()
+    index = pd.date_range('2022-12-31', periods=48, freq='h', name='Zeit')
+    data = pd.DataFrame(
+        {'Stadt A': range(48), 'Stadt B': [float(x) / 2 for x in range(48)]},
+        index=index
+        )
+    data.loc[data.index.year == 2022, 'Stadt B'] = float('nan')
+    data.to_csv(input_path / 'heat_load.csv', sep=';')
+
+    monkeypatch.setattr(input_store, 'INPUT_PATH', str(input_path))
+    monkeypatch.setattr(
+        input_store, 'STORE_PATH', str(tmp_path / 'input_store')
+        )
+    monkeypatch.setattr(
+        input_store, 'DATASETS', {'heat_load': 'heat_load.csv'}
+        )
+    monkeypatch.setattr(input_store, '_MANIFESTS', {})
+    monkeypatch.setattr(input_store, '_TABLES', {})
+    return data
+
+
+def test_year_partitions(store):
+    input_store.ensure_store()
+
+    assert input_store.columns('heat_load') == ['Stadt A', 'Stadt B']
+    assert input_store.years('heat_load') == [2022, 2023]
+    assert input_store.years('heat_load', 'Stadt B') == [2023]
+    for year in [2022, 2023]:
+        assert os.path.exists(input_store.partition_path('heat_load', year))
+
+    heat_load = input_store.read('heat_load', 2023, ['Stadt B'])
+    expected = store.loc[store.index.year == 2023, ['Stadt B']]
+    pd.testing.assert_frame_equal(heat_load, expected, check_freq=False)
+
+
+def test_rebuild_on_source_change(store):
+    input_store.read('heat_load', 2022)
+
+    store['Stadt A'] *= 10
+    store['Stadt C'] = 1.0
+    filepath = os.path.join(input_store.INPUT_PATH, 'heat_load.csv')
+    store.to_csv(filepath, sep=';')
+    stat = os.stat(filepath)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert input_store.columns('heat_load')[-1] == 'Stadt C'
+    heat_load = input_store.read('heat_load', 2022, ['Stadt A'])
+    assert list(heat_load['Stadt A']) == list(range(0, 240, 10))
+
+
+def test_shared_read_only_views(store):
+    first = input_store.read('heat_load', 2023)
+    second = input_store.read('heat_load', 2023, ['Stadt A'])
+
+    assert first is not second
+    assert np.shares_memory(
+        first['Stadt A'].to_numpy(), second['Stadt A'].to_numpy()
+        )
+    table = input_store.partition_table('heat_load', 2023)
+    assert np.shares_memory(
+        first['Stadt B'].to_numpy(), table.column('Stadt B').to_numpy()
+        )
+    with pytest.raises(ValueError):
+        first['Stadt A'].to_numpy()[0] = 1
+
+    scaled = second.copy()
+    scaled['Stadt A'] *= 2
+    assert scaled['Stadt A'].iloc[1] == 2 * first['Stadt A'].iloc[1]
+    assert list(input_store.read('heat_load', 2023)['Stadt A']) == (
+        list(range(24, 48))
+        )
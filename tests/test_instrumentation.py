@@ -0,0 +1,70 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from instrumentation import RunProfile, current_rss
+
+
+def test_nested_stages():
+    profile = RunProfile()
+    with profile.stage('solve_model'):
+        with profile.stage('build_model'):
+            time.sleep(0.05)
+        with profile.stage('run_solver'):
+            time.sleep(0.05)
+    with profile.stage('get_results'):
+        time.sleep(0.05)
+
+    stages = profile.stages
+    assert stages['solve_model']['parent'] is None
+    assert stages['build_model']['parent'] == 'solve_model'
+    assert stages['run_solver']['parent'] == 'solve_model'
+    totals = profile.totals()
+    assert totals['wall_time'] == pytest.approx(
+        stages['solve_model']['wall_time'] + stages['get_results']['wall_time']
+        )
+
+
+def test_merged_stages_are_children():
+    sub_run = RunProfile()
+    with sub_run.stage('solve_model'):
+        with sub_run.stage('run_solver'):
+            pass
+
+    profile = RunProfile()
+    with profile.stage('solve_model'):
+        profile.merge(sub_run, 'dispatch')
+
+    stages = profile.stages
+    assert stages['dispatch.solve_model']['parent'] == 'solve_model'
+    assert stages['dispatch.run_solver']['parent'] == 'dispatch.solve_model'
+    assert profile.totals()['wall_time'] == stages['solve_model']['wall_time']
+
+
+@pytest.mark.skipif(current_rss() is None, reason='RSS is not available')
+def test_stage_memory_delta():
+    profile = RunProfile()
+    with profile.stage('small'):
+        pass
+    with profile.stage('large'):
+        array = np.ones(50 * 1024**2 // 8)
+        time.sleep(0.05)
+        del array
+
+    stages = profile.stages
+    assert stages['large']['rss_delta_mb'] > 40
+    assert stages['small']['rss_delta_mb'] < 40
+
+
+def test_in_process_run_record(run_energy_system):
+    energy_system = run_energy_system(['hp', 'plb'], hours=24)
+    filepath = energy_system.workspace.file('run_record.json')
+    with open(filepath, 'r', encoding='utf-8') as file:
+        record = json.load(file)
+
+    assert record['units'] == ['hp1', 'plb1']
+    assert record['stages']['run_solver']['parent'] == 'solve_model'
+    assert record['totals']['wall_time'] > 0
+    assert record['model_size']['variables'] > 0
@@ -0,0 +1,57 @@
+import os
+import time
+
+from jobs import JobManager, write_status
+from result_cache import cache_key
+from sample_inputs import sample_data, sample_param_opt, sample_units
+
+
+def wait_for_state(jobs, job_id, states, timeout=60):
+    start = time.time()
+    while time.time() - start < timeout:
+        status = jobs.status(job_id)
+        if status['state'] in states:
+            return status
+        time.sleep(0.1)
+    return jobs.status(job_id)
+
+
+def test_cancel_running_job(tmp_path):
+    jobs = JobManager(path=str(tmp_path / 'jobs'), max_workers=1)
+    data = sample_data(24 * 365)
+    param_units = sample_units(['hp', 'hp', 'plb', 'tes'], invest=True)
+    param_opt = sample_param_opt()
+    job_id = jobs.submit(data, param_units, param_opt)
+
+    # The job manager sets the threads of the solver of each worker
+    inputs = jobs.inputs(job_id)
+    assert 'Threads' not in param_opt
+    assert 'Threads' in inputs[2]
+    assert cache_key(*inputs) == cache_key(data, param_units, param_opt)
+
+    assert wait_for_state(jobs, job_id, ['running'])['state'] == 'running'
+    process = jobs._processes[job_id]
+    jobs.cancel(job_id)
+    assert not process.is_alive()
+    assert jobs.status(job_id)['state'] == 'cancelled'
+
+
+def test_orphaned_jobs_fail_on_startup(tmp_path):
+    path = tmp_path / 'jobs'
+    states = {
+        'a' * 32: {'state': 'queued'},
+        'b' * 32: {'state': 'running', 'pid': 2**22 + 1},
+        'c' * 32: {'state': 'running', 'pid': os.getpid()},
+        'd' * 32: {'state': 'finished', 'finished': time.time()}
+        }
+    for job_id, status in states.items():
+        os.makedirs(path / job_id)
+        write_status(str(path / job_id), **status)
+
+    # A new manager, e.g. after a restart of the server
+    jobs = JobManager(path=str(path), max_workers=1)
+    assert jobs.status('a' * 32)['state'] == 'failed'
+    assert jobs.status('b' * 32)['state'] == 'failed'
+    # The worker of this job still exists
+    assert jobs.status('c' * 32)['state'] == 'running'
+    assert jobs.status('d' * 32)['state'] == 'finished'
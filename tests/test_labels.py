@@ -0,0 +1,126 @@
+import pytest
+from oemof.solph import processing, views
+
+from labels import compile_label_map
+
+ALL_UNITS = ['hp', 'hp', 'ccet', 'ice', 'plb', 'eb', 'sol', 'exhs', 'tes']
+
+
+def check_column(col):
+    """Label of a result key as assigned before the compiled label map."""
+    if col[0][1] == 'heat network':
+        if col[0][0].rstrip('0123456789') == 'hp':
+            if col[1] == 'flow':
+                return f'Q_out_{col[0][0]}'
+            elif col[1] == 'invest':
+                return f'cap_{col[0][0]}'
+            elif col[1] == 'status':
+                return f'state_{col[0][0]}'
+            elif col[1] == 'status_nominal':
+                return f'state_nom_{col[0][0]}'
+        elif col[0][0].rstrip('0123456789') == 'tes':
+            if col[1] == 'flow':
+                return f'Q_out_{col[0][0]}'
+            elif col[1] == 'invest':
+                return f'cap_out_{col[0][0]}'
+            elif col[1] == 'status':
+                return f'state_out_{col[0][0]}'
+            elif col[1] == 'status_nominal':
+                return f'state_nom_out_{col[0][0]}'
+            elif col[1] == 'total':
+                return f'total_out_{col[0][0]}'
+        else:
+            if col[1] == 'flow':
+                return f'Q_{col[0][0]}'
+            elif col[1] == 'invest':
+                return f'cap_{col[0][0]}'
+            elif col[1] == 'status':
+                return f'state_{col[0][0]}'
+            elif col[1] == 'status_nominal':
+                return f'state_nom_{col[0][0]}'
+    elif col[0][0] == 'heat network':
+        if col[0][1].rstrip('0123456789') == 'tes':
+            if col[1] == 'flow':
+                return f'Q_in_{col[0][1]}'
+            elif col[1] == 'invest':
+                return f'cap_in_{col[0][1]}'
+            elif col[1] == 'status':
+                return f'state_in_{col[0][1]}'
+            elif col[1] == 'status_nominal':
+                return f'state_nom_in_{col[0][1]}'
+            elif col[1] == 'total':
+                return f'total_in_{col[0][1]}'
+        elif col[0][1] == 'heat demand':
+            return 'Q_demand'
+    elif col[0][1] == 'chp node':
+        if col[1] == 'flow':
+            return f'P_{col[0][0]}'
+    elif col[0][0] == 'electricity network':
+        if col[0][1].rstrip('0123456789') == 'hp':
+            if col[1] == 'flow':
+                return f'P_in_{col[0][1]}'
+            elif col[1] == 'status':
+                return f'state_{col[0][1]}'
+        else:
+            return f'P_{col[0][1]}'
+    elif col[0][0] == 'gas network':
+        return f'H_{col[0][1]}'
+    elif col[0][0] == 'chp node':
+        if col[0][1] == 'spotmarket':
+            return 'P_spotmarket'
+        elif col[0][1] == 'chp internal':
+            return 'P_internal'
+    elif col[0][0] == 'chp internal':
+        if col[0][1] == 'electricity network':
+            return 'P_internal'
+    elif col[0][0] == 'gas source':
+        return 'H_source'
+    elif col[0][0] == 'electricity source':
+        return 'P_source'
+    elif col[0][0].rstrip('0123456789') == 'tes' and col[0][1] == 'None':
+        if col[1] == 'storage_content':
+            return f'storage_content_{col[0][0]}'
+        elif col[1] == 'invest':
+            return f'cap_{col[0][0]}'
+    return None
+
+
+def result_keys(energy_system):
+    """Keys of the results of the nodes labeled in the postprocessing."""
+    results = processing.results(energy_system.model)
+    keys = set()
+    for node in energy_system.result_nodes():
+        node_results = views.node(results, node)
+        keys.update(node_results['sequences'].columns)
+        if 'scalars' in node_results:
+            keys.update(node_results['scalars'].index)
+    return keys
+
+
+@pytest.mark.parametrize('invest', [False, True])
+def test_label_map_matches_check_column(build_energy_system, invest):
+    energy_system = build_energy_system(
+        ALL_UNITS, invest=invest, hours=24, prune_model=False,
+        symmetry_breaking=False
+        )
+    energy_system.run_model()
+
+    label_map = energy_system.label_map()
+    keys = result_keys(energy_system)
+    assert keys
+    for key in keys:
+        assert label_map.get(key) == check_column(key), key
+
+
+def test_label_map_expands_unit_side():
+    label_map = compile_label_map(frozenset([
+        'gas network', 'electricity network', 'heat network', 'plb1',
+        'hp1', 'hp2', 'eb1', 'tes1'
+        ]))
+
+    assert label_map[(('gas network', 'plb1'), 'flow')] == 'H_plb1'
+    assert label_map[(('electricity network', 'hp2'), 'flow')] == 'P_in_hp2'
+    assert label_map[(('electricity network', 'eb1'), 'flow')] == 'P_eb1'
+    assert label_map[(('heat network', 'tes1'), 'flow')] == 'Q_in_tes1'
+    assert label_map[(('heat network', 'tes1'), 'invest')] == 'cap_in_tes1'
+    assert not any('network' in label for label in label_map.values())
@@ -0,0 +1,33 @@
+import pytest
+from pandas.testing import assert_frame_equal
+
+
+@pytest.mark.parametrize('unit_cats, invest', [
+    (['hp', 'plb', 'tes'], False),
+    (['hp', 'plb', 'tes'], True),
+    (['ccet', 'sol', 'eb'], True)
+    ])
+def test_matrix_backend_matches_pyomo(run_energy_system, unit_cats, invest):
+    pyomo = run_energy_system(unit_cats, invest=invest)
+    matrix = run_energy_system(unit_cats, invest=invest, backend='matrix')
+
+    assert matrix.matrix_model is not None
+    assert matrix.objective_value() == pytest.approx(
+        pyomo.objective_value(), rel=1e-5
+        )
+    assert matrix.key_params['LCOH'] == pytest.approx(
+        pyomo.key_params['LCOH'], rel=1e-5
+        )
+    assert_frame_equal(
+        matrix.data_caps, pyomo.data_caps, check_dtype=False, rtol=1e-4
+        )
+
+
+def test_matrix_backend_falls_back_with_aggregation(run_energy_system):
+    with pytest.warns(UserWarning, match='typical periods'):
+        energy_system = run_energy_system(
+            ['hp', 'plb', 'tes'], hours=96, backend='matrix',
+            aggregation={'n_typical': 2, 'period': 'day'}
+            )
+    assert energy_system.matrix_model is None
+    assert energy_system.model is not None
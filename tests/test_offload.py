@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+from offload import SolveSpool
+
+
+def test_offload_round_trip(build_energy_system, run_energy_system, tmp_path,
+                            caplog):
+    caplog.set_level('INFO', logger='model')
+    solved = run_energy_system(['hp', 'plb', 'tes'], hours=24)
+
+    spool = SolveSpool(path=str(tmp_path / 'spool'))
+    energy_system = build_energy_system(['hp', 'plb', 'tes'], hours=24)
+    job_id = energy_system.offload(spool)
+    assert spool.state(job_id) == 'pending'
+    meta_path = os.path.join(spool.job_dir(job_id, 'pending'), 'meta.json')
+    with open(meta_path, 'r', encoding='utf-8') as file:
+        assert json.load(file)['Solver'] == 'HiGHS'
+
+    spool.work(once=True)
+    assert spool.status(job_id)['state'] == 'done'
+
+    objective = energy_system.import_solution(spool.job_dir(job_id, 'done'))
+    assert 'Offloaded solution assigned' in caplog.text
+    assert objective == pytest.approx(solved.objective_value(), rel=1e-6)
+    assert energy_system.objective_value() == pytest.approx(
+        solved.objective_value(), rel=1e-6
+        )
+
+    energy_system.run_postprocessing()
+    assert energy_system.key_params['LCOH'] == pytest.approx(
+        solved.key_params['LCOH'], rel=1e-6
+        )
+
+
+def test_offload_solution_without_names(build_energy_system, tmp_path):
+    spool = SolveSpool(path=str(tmp_path / 'spool'))
+    energy_system = build_energy_system(['hp', 'plb'], hours=24)
+    job_id = energy_system.offload(spool)
+    spool.work(once=True)
+
+    # The solver names of the solution match none of the model
+    job_dir = spool.job_dir(job_id, 'done')
+    with open(os.path.join(job_dir, 'names.json'), 'w',
+              encoding='utf-8') as file:
+        json.dump({}, file)
+    with pytest.warns(UserWarning, match='does not match'):
+        energy_system.import_solution(job_dir)
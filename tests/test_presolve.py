@@ -0,0 +1,54 @@
+import pytest
+
+from presolve import CHP_INTERNAL_MAX, chp_electric_max, tighten_bounds
+from sample_inputs import sample_data, sample_units
+
+
+def test_tighten_bounds_report():
+    data = sample_data(48)
+    param_units = sample_units(['hp', 'plb'], invest=True)
+    tightened, chp_el_max, report = tighten_bounds(data, param_units)
+
+    heat_max = data['heat_demand'].max()
+    assert [entry['unit'] for entry in report] == ['hp1', 'plb1']
+    for entry in report:
+        unit_params = param_units[entry['unit']]
+        assert entry['old'] == unit_params['cap_max']
+        assert entry['new'] == pytest.approx(
+            heat_max / unit_params['Q_rel_max']
+            )
+        assert tightened[entry['unit']]['cap_max'] == entry['new']
+
+    # Without chp units, the chp internal converter is not tightened
+    assert chp_el_max == CHP_INTERNAL_MAX
+    # The input parameters stay untouched
+    assert param_units['hp1']['cap_max'] == report[0]['old']
+
+
+def test_tighten_chp_internal():
+    param_units = sample_units(['ccet', 'plb'], invest=True)
+    tightened, chp_el_max, report = tighten_bounds(
+        sample_data(48), param_units
+        )
+
+    assert chp_el_max == pytest.approx(chp_electric_max(tightened))
+    assert chp_el_max < chp_electric_max(param_units)
+    assert report[-1]['unit'] == 'chp internal'
+    assert report[-1]['new'] == chp_el_max
+
+
+@pytest.mark.parametrize('unit_cats', [
+    ['hp', 'plb'],
+    ['hp', 'plb', 'tes'],
+    ['ccet', 'eb', 'plb']
+    ])
+def test_tightened_objective(run_energy_system, unit_cats):
+    tightened = run_energy_system(unit_cats, invest=True)
+    original = run_energy_system(
+        unit_cats, invest=True, tighten_bounds=False
+        )
+
+    assert original.presolve_report == []
+    assert tightened.objective_value() == pytest.approx(
+        original.objective_value(), rel=1e-5
+        )
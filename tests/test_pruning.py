@@ -0,0 +1,68 @@
+import pyomo.environ as pyo
+import pytest
+
+from sample_inputs import sample_units
+
+
+def nr_binaries(energy_system):
+    return sum(
+        1 for var in energy_system.model.component_data_objects(pyo.Var)
+        if var.is_binary()
+        )
+
+
+@pytest.mark.parametrize('unit_cats', [
+    ['hp', 'plb', 'tes', 'sol'],
+    ['ccet', 'plb', 'tes'],
+    ['eb', 'plb', 'exhs']
+    ])
+@pytest.mark.parametrize('invest', [False, True])
+def test_pruning_keeps_objective(run_energy_system, unit_cats, invest):
+    param_units = sample_units(unit_cats, invest=invest)
+    param_units['plb1']['Q_rel_min'] = 0
+
+    pruned = run_energy_system(
+        unit_cats, invest=invest, hours=24, param_units=param_units
+        )
+    original = run_energy_system(
+        unit_cats, invest=invest, hours=24, param_units=param_units,
+        prune_model=False
+        )
+
+    assert original.pruning_report == {}
+    assert pruned.pruning_report['convex_flows'] == ['plb1']
+    assert nr_binaries(pruned) < nr_binaries(original)
+    assert pruned.objective_value() == pytest.approx(
+        original.objective_value(), rel=1e-5
+        )
+    assert pruned.key_params['LCOH'] == pytest.approx(
+        original.key_params['LCOH'], rel=1e-5
+        )
+
+
+def test_unused_chp_nodes_pruned(run_energy_system):
+    pruned = run_energy_system(['hp', 'plb'], hours=24)
+    original = run_energy_system(['hp', 'plb'], hours=24, prune_model=False)
+
+    assert pruned.pruning_report['unused_nodes'] == ['chp node', 'spotmarket']
+    labels = {str(node.label) for node in pruned.es.nodes}
+    assert not {'chp node', 'spotmarket'} & labels
+    assert pruned.objective_value() == pytest.approx(
+        original.objective_value(), rel=1e-5
+        )
+
+
+@pytest.mark.parametrize('invest', [False, True])
+def test_pruned_matrix_backend(run_energy_system, invest):
+    unit_cats = ['hp', 'plb', 'tes', 'sol']
+    pruned = run_energy_system(
+        unit_cats, invest=invest, hours=24, backend='matrix'
+        )
+    original = run_energy_system(
+        unit_cats, invest=invest, hours=24, backend='matrix',
+        prune_model=False
+        )
+
+    assert pruned.objective_value() == pytest.approx(
+        original.objective_value(), rel=1e-5
+        )
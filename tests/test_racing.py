@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+import racing
+from progress import SolverProgress
+
+CONFIGS = [
+    {'name': 'highs_default', 'Solver': 'HiGHS', 'options': {}},
+    {'name': 'highs_no_presolve', 'Solver': 'HiGHS',
+     'options': {'presolve': 'off'}}
+    ]
+
+
+def test_race(build_energy_system, run_energy_system):
+    reference = run_energy_system(['hp', 'plb', 'tes'], invest=True)
+
+    energy_system = build_energy_system(['hp', 'plb', 'tes'], invest=True)
+    energy_system.generate_buses()
+    energy_system.generate_sources()
+    energy_system.generate_sinks()
+    energy_system.generate_components()
+    energy_system.build_model()
+    energy_system.progress = SolverProgress()
+    report = racing.race(energy_system, configs=CONFIGS, workers=2)
+    # The workers write their progress into their workspaces
+    workdir = energy_system.subspace(report['winner']).path
+    assert os.path.exists(os.path.join(workdir, 'progress.jsonl'))
+
+    assert report['winner'] in [config['name'] for config in CONFIGS]
+    winner = next(
+        result for result in report['results']
+        if result['name'] == report['winner']
+        )
+    assert racing.within_gap(winner, energy_system.param_opt['MIPGap'])
+
+    energy_system.run_postprocessing()
+    assert energy_system.key_params['LCOH'] == pytest.approx(
+        reference.key_params['LCOH'], rel=1e-4
+        )
+
+
+def test_within_gap():
+    assert racing.within_gap({'state': 'finished', 'gap': 0.01}, 0.01)
+    # E.g. stopped on the time limit
+    assert not racing.within_gap({'state': 'finished', 'gap': 0.05}, 0.01)
+    assert not racing.within_gap({'state': 'finished', 'gap': None}, 0.01)
+    assert not racing.within_gap({'state': 'failed'}, 0.01)
+
+
+def test_unlicensed_gurobi_is_not_raced(monkeypatch):
+    class Unlicensed():
+        def available(self, exception_flag=True):
+            return True
+
+        def license_is_valid(self):
+            return False
+
+    monkeypatch.setattr(racing.po, 'SolverFactory', lambda name: Unlicensed())
+    configs = racing.available_configs()
+    assert configs
+    assert all(config['Solver'] == 'HiGHS' for config in configs)
+
+
+def test_follow_workers(tmp_path):
+    records = {
+        'first': {'time': 1, 'incumbent': 110.0, 'bound': 90.0, 'gap': 18.2},
+        'second': {'time': 1, 'incumbent': 100.0, 'bound': 80.0, 'gap': 20.0}
+        }
+    workdirs = []
+    for name, record in records.items():
+        workdir = tmp_path / name
+        workdir.mkdir()
+        with open(workdir / 'progress.jsonl', 'w', encoding='utf-8') as file:
+            file.write(json.dumps(record) + '\n')
+        workdirs.append(str(workdir))
+
+    progress = SolverProgress()
+    progress.start(None, 'Race')
+    stop_path = str(tmp_path / 'stop')
+    racing.follow_workers(progress, workdirs, stop_path)
+    assert progress.history[-1]['incumbent'] == 100.0
+    assert progress.history[-1]['bound'] == 90.0
+    assert progress.history[-1]['gap'] == pytest.approx(10.0)
+    assert not os.path.exists(stop_path)
+
+    # A stop request is passed on to the workers
+    progress.request_stop()
+    racing.follow_workers(progress, workdirs, stop_path)
+    assert os.path.exists(stop_path)
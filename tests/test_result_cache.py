@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from result_cache import ResultCache, cache_key
+
+
+def test_cache_round_trip(run_energy_system, build_energy_system, tmp_path):
+    cache = ResultCache(path=str(tmp_path / 'cache'))
+    solved = run_energy_system(['hp', 'plb', 'tes'], hours=24)
+    cache.store(solved.cache_key, solved.result_payload())
+    assert os.listdir(cache.path) == [f'{solved.cache_key}.pkl']
+
+    energy_system = build_energy_system(['hp', 'plb', 'tes'], hours=24)
+    assert energy_system.cache_key == solved.cache_key
+    energy_system.load_results(cache.load(energy_system.cache_key))
+
+    assert_frame_equal(energy_system.data_all, solved.data_all)
+    assert_frame_equal(energy_system.data_caps, solved.data_caps)
+    assert energy_system.key_params == solved.key_params
+
+
+def test_cache_key():
+    data = pd.DataFrame({'heat_demand': [1.0, 2.0]})
+    key = cache_key(data, {'hp1': {'Q_N': 1}}, {'MIPGap': 0.01})
+    assert key == cache_key(data, {'hp1': {'Q_N': 1}}, {'MIPGap': 0.01})
+    assert key != cache_key(data * 2, {'hp1': {'Q_N': 1}}, {'MIPGap': 0.01})
+    assert key != cache_key(data, {'hp1': {'Q_N': 2}}, {'MIPGap': 0.01})
+
+
+def test_cache_eviction(tmp_path):
+    cache = ResultCache(path=str(tmp_path / 'cache'), max_size=1500)
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.store(key, b'x' * 600)
+        os.utime(cache.filepath(key), (i, i))
+
+    assert cache.load('a') is None
+    assert cache.load('c') == b'x' * 600
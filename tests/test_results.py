@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+
+def compare_result_paths(energy_system):
+    """Assert that both result paths of a solved system yield the same."""
+    energy_system.param_opt['fast_results'] = True
+    energy_system.get_results()
+    fast = energy_system.data_all.copy(), energy_system.data_caps.copy()
+
+    energy_system.param_opt['fast_results'] = False
+    energy_system.get_results()
+    pd.testing.assert_frame_equal(fast[0], energy_system.data_all)
+    pd.testing.assert_frame_equal(
+        fast[1], energy_system.data_caps, check_dtype=False
+        )
+
+
+@pytest.mark.parametrize('unit_cats, invest', [
+    (['hp', 'plb'], False),
+    (['hp', 'plb', 'tes'], False),
+    (['hp', 'plb', 'tes'], True),
+    (['ccet', 'sol', 'exhs', 'eb'], True)
+    ])
+def test_fast_results_match_solph_processing(build_energy_system, unit_cats,
+                                             invest):
+    energy_system = build_energy_system(unit_cats, invest=invest)
+    energy_system.run_model()
+    compare_result_paths(energy_system)
+
+
+@pytest.mark.parametrize('invest', [False, True])
+def test_run_postprocessing(run_energy_system, invest):
+    energy_system = run_energy_system(['hp', 'plb', 'tes'], invest=invest)
+
+    # The storage content has an additional final time point
+    assert energy_system.data_all['Q_demand'].count() == 48
+    assert energy_system.data_all['Q_demand'].sum() > 0
+    assert energy_system.key_params['LCOH'] > 0
@@ -0,0 +1,95 @@
+import pyomo.environ as po
+import pytest
+
+import model
+from sample_inputs import sample_data
+from solutions import WarmStartStore, load_solution_values, solution_values
+
+
+@pytest.fixture
+def solved_system(run_energy_system):
+    return run_energy_system(['hp', 'plb', 'tes'], hours=24)
+
+
+def test_warm_start_round_trip(solved_system, build_energy_system, tmp_path):
+    store = WarmStartStore(path=str(tmp_path / 'warmstart'))
+    param_units = solved_system.param_units
+
+    store.save(param_units, solved_system.model)
+    values = store.load(param_units)
+    assert values == solution_values(solved_system.model)
+
+    energy_system = build_energy_system(['hp', 'plb', 'tes'], hours=24)
+    energy_system.generate_buses()
+    energy_system.generate_sources()
+    energy_system.generate_sinks()
+    energy_system.generate_components()
+    energy_system.build_model()
+    # Fixed variables, e.g. the heat demand, keep their values
+    free = [
+        var for var in energy_system.model.component_data_objects(po.Var)
+        if not var.fixed and var.name in values
+        ]
+    assert load_solution_values(energy_system.model, values) == len(free)
+    for var in free:
+        assert var.value == values[var.name]
+
+
+def test_warm_started_run(run_energy_system, monkeypatch, tmp_path, caplog):
+    caplog.set_level('INFO', logger='model')
+    store = WarmStartStore(path=str(tmp_path / 'warmstart'))
+    monkeypatch.setattr(model, 'WarmStartStore', lambda: store)
+
+    first = run_energy_system(
+        ['hp', 'plb', 'tes'], hours=24, warm_start=True
+        )
+    assert 'Warm start assigned' not in caplog.text
+    # Re-run with a changed gas price
+    data = sample_data(24)
+    data['gas_price'] *= 1.2
+    second = run_energy_system(
+        ['hp', 'plb', 'tes'], hours=24, data=data, warm_start=True
+        )
+    assert 'Warm start assigned' in caplog.text
+    with open(second.logpath, 'r', encoding='utf-8') as file:
+        assert 'start solution' in file.read().lower()
+    assert second.objective_value() > first.objective_value()
+
+
+def test_warm_start_keyed_on_topology(solved_system, tmp_path):
+    store = WarmStartStore(path=str(tmp_path / 'warmstart'))
+    param_units = solved_system.param_units
+    store.save(param_units, solved_system.model)
+
+    changed = {unit: dict(params) for unit, params in param_units.items()}
+    changed['plb1']['op_cost_var'] += 10
+    assert store.load(changed) is not None
+
+    changed['plb1']['invest_mode'] = not changed['plb1']['invest_mode']
+    assert store.load(changed) is None
+
+
+def test_warm_start_is_opt_in(build_energy_system, monkeypatch, tmp_path):
+    store = WarmStartStore(path=str(tmp_path / 'warmstart'))
+    monkeypatch.setattr(model, 'WarmStartStore', lambda: store)
+
+    energy_system = build_energy_system(['hp', 'plb'], hours=24)
+    del energy_system.param_opt['warm_start']
+    energy_system.run_model()
+    assert not (tmp_path / 'warmstart').exists()
+
+
+def test_load_skips_fixed_and_out_of_bounds():
+    model = po.ConcreteModel()
+    model.x = po.Var(bounds=(0, 10))
+    model.y = po.Var(bounds=(0, 10))
+    model.z = po.Var(bounds=(0, 10))
+    model.x.fix(1)
+
+    nr_assigned = load_solution_values(
+        model, {'x': 5, 'y': 20, 'z': 10 + 1e-9}
+        )
+    assert nr_assigned == 1
+    assert model.x.value == 1
+    assert model.y.value is None
+    assert model.z.value == pytest.approx(10)
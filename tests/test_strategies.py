@@ -0,0 +1,103 @@
+import pytest
+
+import model
+from progress import SolverProgress
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'rolling_horizon': {'window': 24, 'overlap': 12}},
+    {'aggregation': {'n_typical': 2, 'period': 'day'}}
+    ])
+def test_two_stage(run_energy_system, options):
+    energy_system = run_energy_system(
+        ['hp', 'plb', 'tes'], invest=True, hours=96,
+        solve_strategy='two_stage', **options
+        )
+
+    # The dispatch of the second stage is a single model of the full horizon
+    assert energy_system.model is not None
+    assert energy_system.tsa is None
+    assert len(energy_system.data_all.dropna()) == 96
+
+    # The relaxation only bounds the MILP if solved on the full time series
+    report = energy_system.two_stage_report
+    if 'aggregation' in options:
+        assert report['lower_bound'] is None
+        assert report['gap'] is None
+    else:
+        assert report['lower_bound'] == report['relaxed_objective']
+        assert report['gap'] is not None
+
+
+def test_two_stage_time_limit(run_energy_system, monkeypatch):
+    run_solver = model.EnergySystem.run_solver
+
+    def stopped_run_solver(self, *args, **kwargs):
+        run_solver(self, *args, **kwargs)
+        # As if the relaxation was stopped by the time limit
+        self.solved_optimal = False
+
+    monkeypatch.setattr(model.EnergySystem, 'run_solver', stopped_run_solver)
+    energy_system = run_energy_system(
+        ['hp', 'plb', 'tes'], invest=True, hours=96,
+        solve_strategy='two_stage'
+        )
+
+    report = energy_system.two_stage_report
+    assert report['lower_bound'] is None
+    assert report['gap'] is None
+    assert report['relaxed_objective'] is not None
+
+
+def test_rolling_horizon_dispatch(run_energy_system):
+    full = run_energy_system(['hp', 'plb', 'tes'], hours=96)
+    rolling = run_energy_system(
+        ['hp', 'plb', 'tes'], hours=96,
+        rolling_horizon={'window': 24, 'overlap': 12}
+        )
+
+    assert len(rolling.rolling_results) == 4
+    assert rolling.data_all.index.equals(full.data_all.index)
+
+    # The storage is balanced over the full horizon as in the full model
+    content = rolling.data_all['storage_content_tes1']
+    assert content.iloc[-1] == pytest.approx(content.iloc[0], abs=1e-6)
+
+    # The windows only see part of the horizon, which costs some optimality
+    assert rolling.key_params['LCOH'] >= full.key_params['LCOH'] * (1 - 1e-6)
+    assert rolling.key_params['LCOH'] == pytest.approx(
+        full.key_params['LCOH'], rel=0.05
+        )
+
+
+@pytest.mark.parametrize('options, subspace', [
+    ({'solve_strategy': 'two_stage', 'invest': True}, 'stage2'),
+    ({'rolling_horizon': {'window': 24, 'overlap': 12}}, 'horizon_24')
+    ])
+def test_sub_runs_report_progress(build_energy_system, options, subspace):
+    energy_system = build_energy_system(['hp', 'plb', 'tes'], **options)
+    energy_system.progress = SolverProgress()
+    energy_system.run_model()
+
+    # The progress follows the solve of the last sub-run
+    progress = energy_system.progress
+    assert progress.solver == 'HiGHS'
+    assert subspace in progress.logpath
+
+
+def test_rolling_horizon_stop(build_energy_system, tmp_path):
+    stop_path = tmp_path / 'stop'
+    stop_path.touch()
+    energy_system = build_energy_system(
+        ['hp', 'plb', 'tes'], hours=96,
+        rolling_horizon={'window': 24, 'overlap': 12}
+        )
+    energy_system.progress = SolverProgress(
+        interval=0.1, stop_path=str(stop_path)
+        )
+    # Each window stops early, but only with an incumbent to continue with
+    energy_system.run_model()
+    energy_system.get_results()
+    energy_system.progress.finish()
+    assert len(energy_system.data_all) == 97
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from sample_inputs import sample_data, sample_param_opt, sample_units
+from sweep import apply_scenario, run_sweep, scenario_grid, scenario_labels
+
+
+def test_two_scenario_sweep():
+    data = sample_data(24)
+    param_units = sample_units(['hp', 'plb'])
+    param_opt = sample_param_opt()
+    scenarios = scenario_grid(data={'gas_price': [1.0, 1.5]})
+
+    results = run_sweep(data, param_units, param_opt, scenarios, workers=2)
+    assert list(results.index) == [0, 1]
+    assert 'error' not in results.columns
+    assert list(results['data.gas_price']) == [1.0, 1.5]
+    assert results.loc[1, 'LCOH'] > results.loc[0, 'LCOH']
+
+
+def test_empty_sweep():
+    results = run_sweep(pd.DataFrame(), {}, {}, [])
+    assert results.empty
+    assert results.index.name == 'scenario'
+
+
+def test_numpy_scalar_overrides():
+    data = pd.DataFrame({'gas_price': [10.0, 20.0]})
+    scenario = {'data': {'gas_price': np.int64(2)}}
+
+    scaled, _, _ = apply_scenario(data, {}, {}, scenario)
+    assert list(scaled['gas_price']) == [20.0, 40.0]
+    assert scenario_labels(scenario) == {'data.gas_price': 2}
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    'unit_cats', [['hp', 'hp'], ['hp', 'hp', 'plb', 'tes']]
+    )
+@pytest.mark.parametrize('invest', [False, True])
+def test_identical_units_default_run(run_energy_system, unit_cats, invest):
+    energy_system = run_energy_system(unit_cats, invest=invest)
+
+    assert energy_system.symmetry_groups == [['hp1', 'hp2']]
+    assert len(energy_system.model.symmetry_breaking) > 0
+    if invest:
+        caps = energy_system.data_caps
+        assert caps.loc[0, 'cap_hp1'] >= caps.loc[0, 'cap_hp2'] - 1e-6
+    else:
+        data_all = energy_system.data_all
+        diff = (data_all['Q_out_hp1'] - data_all['Q_out_hp2']).dropna()
+        assert (diff >= -1e-6).all()
+
+
+@pytest.mark.parametrize('unit_cats, invest', [
+    (['hp', 'hp', 'plb'], False),
+    (['hp', 'hp', 'plb'], True),
+    (['ccet', 'ccet', 'plb', 'tes'], False),
+    (['eb', 'eb', 'eb', 'plb'], True)
+    ])
+def test_symmetry_breaking_keeps_objective(run_energy_system, unit_cats,
+                                           invest):
+    broken = run_energy_system(unit_cats, invest=invest, hours=24)
+    original = run_energy_system(
+        unit_cats, invest=invest, hours=24, symmetry_breaking=False
+        )
+
+    assert broken.symmetry_groups
+    assert not original.symmetry_groups
+    assert broken.objective_value() == pytest.approx(
+        original.objective_value(), rel=1e-5
+        )
+    assert broken.key_params['LCOH'] == pytest.approx(
+        original.key_params['LCOH'], rel=1e-5
+        )
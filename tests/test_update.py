@@ -0,0 +1,32 @@
+import pytest
+
+from sample_inputs import sample_units
+
+
+@pytest.mark.parametrize('invest', [False, True])
+def test_update_matches_fresh_build(build_energy_system, invest):
+    param_units = sample_units(['hp', 'plb', 'tes'], invest=invest)
+    energy_system = build_energy_system(
+        None, param_units=param_units, hours=24
+        )
+    energy_system.run_model()
+    objective_before = energy_system.objective_value()
+
+    data = energy_system.data[['gas_price', 'heat_demand']] * 1.3
+    energy_system.update_parameters(
+        data=data, param_units={'plb1': {'op_cost_var': 5.0}}
+        )
+    energy_system.resolve()
+
+    updated_units = sample_units(['hp', 'plb', 'tes'], invest=invest)
+    updated_units['plb1']['op_cost_var'] = 5.0
+    updated_data = energy_system.data.copy()
+    fresh = build_energy_system(
+        None, param_units=updated_units, hours=24, data=updated_data
+        )
+    fresh.run_model()
+
+    assert energy_system.objective_value() != pytest.approx(objective_before)
+    assert energy_system.objective_value() == pytest.approx(
+        fresh.objective_value(), rel=1e-5
+        )
@@ -0,0 +1,65 @@
+import os
+import time
+
+from model import EnergySystem
+from sample_inputs import sample_data, sample_param_opt, sample_units
+from workspace import Workspace, atomic_write, cleanup_workspaces
+
+
+def test_unique_workspaces(tmp_path):
+    first = Workspace(root=str(tmp_path))
+    second = Workspace(root=str(tmp_path))
+    assert first.path != second.path
+    assert os.path.isdir(first.path) and os.path.isdir(second.path)
+
+    sub = first.subspace('horizon_0')
+    assert os.path.dirname(sub.path) == first.path
+
+    with Workspace(root=str(tmp_path), prefix='export') as workspace:
+        workspace.write('data.csv', 'a;b\n')
+        assert workspace.id.startswith('export_')
+    assert not os.path.exists(workspace.path)
+
+
+def test_atomic_write(tmp_path):
+    filepath = str(tmp_path / 'result.json')
+    atomic_write(filepath, '{"a": 1}')
+    atomic_write(filepath, b'{"a": 2}')
+
+    with open(filepath, 'r', encoding='utf-8') as file:
+        assert file.read() == '{"a": 2}'
+    assert os.listdir(tmp_path) == ['result.json']
+
+
+def test_cleanup_stale_workspaces(tmp_path):
+    stale = Workspace(root=str(tmp_path))
+    fresh = Workspace(root=str(tmp_path))
+    past = time.time() - 2*24*3600
+    os.utime(stale.path, (past, past))
+
+    cleanup_workspaces(root=str(tmp_path))
+    assert not os.path.exists(stale.path)
+    assert os.path.exists(fresh.path)
+
+
+def test_runs_write_separate_logs(tmp_path):
+    runs = []
+    for seed in [1, 2]:
+        energy_system = EnergySystem(
+            sample_data(24, seed=seed), sample_units(['hp', 'plb']),
+            sample_param_opt(),
+            workspace=Workspace(root=str(tmp_path))
+            )
+        energy_system.run_model()
+        energy_system.run_postprocessing()
+        runs.append(energy_system)
+
+    assert runs[0].logpath != runs[1].logpath
+    for energy_system in runs:
+        assert os.path.dirname(energy_system.logpath) == (
+            energy_system.workspace.path
+            )
+        assert os.path.getsize(energy_system.logpath) > 0
+        assert os.path.exists(
+            energy_system.workspace.file('run_record.json')
+            )